@@ -0,0 +1,62 @@
+import threading
+
+import cv2
+
+import cartoonify_filters as filters
+
+# Per-image store of derived data. The face rating, the age estimate and every
+# filter used to convert the same image to grayscale (and run their own Haar
+# detection) independently; now each intermediate is computed once, on first
+# use, and shared. Build a new ImageArtifacts whenever the source image changes.
+
+
+class ImageArtifacts:
+    """Lazily computed intermediates of a single BGR image"""
+
+    def __init__(self, image, face_detector=None):
+        self.image = image
+        self.face_detector = face_detector  # cartoonify_faces.FaceDetector
+        self._values = {}
+        # Filters may read artifacts from worker threads while the Tk thread
+        # asks for faces, so each value is built exactly once under its own
+        # lock: reading the face boxes never waits for a person mask
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _get(self, name, compute):
+        value = self._values.get(name)
+        if value is not None:
+            return value
+        with self._locks_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._values:
+                self._values[name] = compute()
+            return self._values[name]
+
+    @property
+    def gray(self):
+        return self._get("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def faces(self):
+        """Face boxes (x, y, w, h) from one detection pass"""
+        return self.faces_at(None)
+
+    def faces_at(self, scale_factor):
+        """Face boxes from one detection pass with the given cascade scale step"""
+        def detect():
+            if self.face_detector is None:
+                return ()
+            return self.face_detector.detect(self.gray, scale_factor)
+        return self._get(("faces", scale_factor), detect)
+
+    @property
+    def edge_mask(self):
+        """Adaptive-threshold outline mask used by the cartoon filter"""
+        return self._get("edge_mask", lambda: filters.edge_mask(self.gray, report=None))
+
+    @property
+    def person_mask(self):
+        """Soft person mask used by the clone filter"""
+        return self._get("person_mask", lambda: filters.person_mask(self.gray, report=None))
@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from PIL import Image, ImageDraw, ImageTk
+
+import cartoonify_trace as trace
+
+# Icon assets for the GUI. Every icon is decoded, resized and (for the filter
+# buttons) masked to a circle once per process, however many times the main
+# screen is rebuilt; the Tk PhotoImages made from them are cached as well, so a
+# rebuild only creates widgets. The source photos are large (the sketch icon is
+# 1341x1326), so JPEG sources are decoded at a reduced scale (PIL's draft mode)
+# before the final LANCZOS resize.
+#
+# `python cartoonify_assets.py` packs the finished icons into one PNG atlas
+# with a JSON index next to it. When the atlas is present and its index still
+# matches the icon table and the source files, icons are cut from it instead of
+# decoding the sources. A missing or stale atlas just means decoding the
+# sources, as without one.
+
+ICON_DIR = "images"
+ATLAS_FILE = os.path.join(ICON_DIR, "icon_atlas.png")
+ATLAS_VERSION = 1
+
+# name -> (source file, side in pixels, masked to a circle)
+ICONS = {
+    "camera": ("camera_icon.png", 30, False),
+    "cartoon": ("CartoonFilter.jpg", 60, True),
+    "sketch": ("SketchFilter.jpg", 60, True),
+    "winx": ("WinxFilter.png", 60, True),
+    "clone": ("CloneFilter.jpg", 60, True),
+}
+
+_lock = threading.Lock()
+_images = {}   # name -> RGBA PIL image, or the exception loading it raised
+_photos = {}   # (id of the Tk root, name) -> PhotoImage
+_atlas = None  # name -> RGBA PIL image cut from the atlas, {} when there is none
+
+
+def _source_path(name):
+    return os.path.join(ICON_DIR, ICONS[name][0])
+
+
+def _source_stamp(name):
+    # By content, not mtime, so a fresh checkout doesn't invalidate the atlas
+    with open(_source_path(name), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+def circle_mask(side):
+    mask = Image.new("L", (side, side), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, side, side), fill=255)
+    return mask
+
+
+def render_icon(name):
+    """Decode, resize and mask one icon from its source file"""
+    _, side, round_icon = ICONS[name]
+    with trace.span("assets.decode", icon=name):
+        image = Image.open(_source_path(name))
+        if image.format == "JPEG":
+            # Let the decoder scale down by up to 8x; LANCZOS does the rest
+            image.draft("RGB", (side * 2, side * 2))
+        image = image.convert("RGBA").resize((side, side), Image.LANCZOS)
+    if round_icon:
+        icon = Image.new("RGBA", image.size)
+        icon.paste(image, (0, 0), circle_mask(side))
+        image = icon
+    return image
+
+
+def _index_path(atlas_path):
+    return os.path.splitext(atlas_path)[0] + ".json"
+
+
+def _load_atlas(atlas_path):
+    try:
+        with open(_index_path(atlas_path)) as f:
+            index = json.load(f)
+        if index.get("version") != ATLAS_VERSION:
+            return {}
+        sheet = None
+        icons = {}
+        for name, (filename, side, round_icon) in ICONS.items():
+            entry = index["icons"].get(name)
+            if (entry is None or entry["source"] != filename or entry["side"] != side
+                    or entry["round"] != round_icon or entry["stamp"] != _source_stamp(name)):
+                continue  # Changed since the atlas was built; decoded from its source
+            if sheet is None:
+                sheet = Image.open(atlas_path)
+                sheet.load()
+            x, y = entry["at"]
+            icons[name] = sheet.crop((x, y, x + side, y + side)).convert("RGBA")
+        return icons
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Icon atlas not used: {e}")
+        return {}
+
+
+def icon(name, atlas_path=ATLAS_FILE):
+    """RGBA PIL image of a named icon, made once per process; raises OSError if it can't be loaded"""
+    global _atlas
+    with _lock:
+        if name not in _images:
+            if _atlas is None:
+                _atlas = _load_atlas(atlas_path) if os.path.exists(atlas_path) else {}
+            try:
+                _images[name] = _atlas.get(name) or render_icon(name)
+            except OSError as e:
+                _images[name] = e  # Not retried on every rebuild
+        image = _images[name]
+    if isinstance(image, Exception):
+        raise image
+    return image
+
+
+def photo(root, name):
+    """Cached ImageTk.PhotoImage of an icon for root; call on the Tk thread"""
+    key = (id(root), name)
+    cached = _photos.get(key)
+    if cached is None:
+        cached = _photos[key] = ImageTk.PhotoImage(icon(name), master=root)
+    return cached
+
+
+def preload(names=None):
+    """Load icons ahead of time, e.g. on a warm-up thread; returns the names that failed"""
+    failed = []
+    for name in names or ICONS:
+        try:
+            icon(name)
+        except OSError:
+            failed.append(name)
+    return failed
+
+
+def build_atlas(atlas_path=ATLAS_FILE):
+    """Render every icon from its source and pack them side by side into atlas_path"""
+    icons = {name: render_icon(name) for name in ICONS}
+    width = sum(image.width for image in icons.values())
+    height = max(image.height for image in icons.values())
+    sheet = Image.new("RGBA", (width, height))
+    entries = {}
+    x = 0
+    for name, image in icons.items():
+        filename, side, round_icon = ICONS[name]
+        sheet.paste(image, (x, 0))
+        entries[name] = {"source": filename, "side": side, "round": round_icon,
+                         "stamp": _source_stamp(name), "at": [x, 0]}
+        x += image.width
+    sheet.save(atlas_path, optimize=True)
+    with open(_index_path(atlas_path), "w") as f:
+        json.dump({"version": ATLAS_VERSION, "icons": entries}, f, indent=1)
+    return atlas_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the GUI icon atlas and time icon loading.")
+    parser.add_argument("--atlas", default=ATLAS_FILE, help="atlas to write (default: %(default)s)")
+    parser.add_argument("--time", action="store_true",
+                        help="compare decoding the sources with cutting icons from the atlas")
+    args = parser.parse_args(argv)
+
+    if not args.time:
+        print(f"wrote {build_atlas(args.atlas)} and {_index_path(args.atlas)}")
+        return 0
+    start = time.perf_counter()
+    for name in ICONS:
+        render_icon(name)
+    from_sources = time.perf_counter() - start
+    print(f"from sources: {from_sources * 1000:.1f} ms for {len(ICONS)} icons")
+    if os.path.exists(args.atlas):
+        start = time.perf_counter()
+        icons = _load_atlas(args.atlas)
+        print(f"from atlas:   {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({len(icons)} of {len(ICONS)} icons current)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+import argparse
+import ctypes
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import cartoonify_filters as filters
+import cartoonify_pipeline as pipeline
+
+# Reproducible benchmark for the filters. Runs every filter (and every cartoon
+# quality tier) on synthetic and fixture images at standard resolutions,
+# reports megapixels per second, per-stage timings and peak memory, and can
+# compare against a saved baseline, exiting non-zero on a regression. Needs
+# nothing beyond OpenCV and numpy, so it runs on headless CPU-only machines.
+#
+# Peak memory is how far the process's resident set grows during one run, so it
+# counts OpenCV's and numpy's C allocations, which tracemalloc doesn't see. On
+# Linux the kernel's high-water mark (VmHWM) is reset before the run and read
+# after it; elsewhere RSS is sampled every millisecond with psutil, when it is
+# installed, which can miss very short-lived buffers. Without either, the
+# column shows n/a and memory isn't compared against the baseline.
+
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "12mp": (4000, 3000),
+}
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+FIXTURES = ("CartoonFilter.jpg", "SketchFilter.jpg")
+
+
+def synthetic_image(width, height, seed=0):
+    """Deterministic photo-like test image: gradients, shapes and sensor noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:, :, 0] = 255 * x / width
+    image[:, :, 1] = 255 * y / height
+    image[:, :, 2] = 128 + 100 * np.sin(x / 37.0) * np.cos(y / 53.0)
+    image = image.astype(np.uint8)
+    scale = min(width, height)
+    for _ in range(60):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(scale // 40, scale // 6)), int(rng.integers(scale // 40, scale // 6)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.ellipse(image, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1)
+    noise = rng.normal(0, 6, image.shape).astype(np.int16)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def fixture_image(name, width, height):
+    image = cv2.imread(os.path.join(FIXTURE_DIR, name))
+    if image is None:
+        return None
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def test_images(resolution_names, use_fixtures=True):
+    """(image name, resolution name, image) for every requested combination"""
+    for res_name in resolution_names:
+        width, height = RESOLUTIONS[res_name]
+        yield "synthetic", res_name, synthetic_image(width, height)
+        if use_fixtures:
+            for fixture in FIXTURES:
+                image = fixture_image(fixture, width, height)
+                if image is not None:
+                    yield os.path.splitext(fixture)[0], res_name, image
+
+
+def benchmark_cases(filter_names):
+    """(case name, filter name, params): every filter plus each cartoon tier"""
+    for name in filter_names:
+        if name == "cartoon":
+            for quality in filters.QUALITY_TIERS:
+                yield f"cartoon[{quality}]", name, {"quality": quality}
+        elif name == "clone":
+            yield name, name, {"seed": 0}
+        else:
+            yield name, name, {}
+
+
+def time_stages(filter_name, image, params):
+    """Run a filter once; returns (result, total seconds, {stage: seconds})"""
+    stages = {}
+    last = [time.perf_counter()]
+
+    def on_stage(stage_name):
+        now = time.perf_counter()
+        stages[stage_name] = stages.get(stage_name, 0.0) + now - last[0]
+        last[0] = now
+
+    start = last[0]
+    with filters.progress_listener(on_stage):
+        result = pipeline.render(filter_name, image, **params)
+    return result, time.perf_counter() - start, stages
+
+
+def _status_kib(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"no {field} in /proc/self/status")
+
+
+def _trim_heap():
+    # glibc keeps freed heap pages resident and reuses them, which would hide
+    # buffers that fit in memory an earlier run left behind
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _peak_rss_linux(run):
+    _trim_heap()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # Resets VmHWM to the current RSS
+    before = _status_kib("VmRSS")
+    run()
+    return (_status_kib("VmHWM") - before) * 1024
+
+
+def _peak_rss_sampled(run, interval=0.001):
+    import psutil
+    process = psutil.Process()
+    before = peak = process.memory_info().rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        run()
+    finally:
+        done.set()
+        sampler.join()
+    peak = max(peak, process.memory_info().rss)
+    return peak - before
+
+
+def peak_memory(filter_name, image, params):
+    """Bytes the process's resident set grew by during one run, or None if it can't be measured"""
+    def run():
+        pipeline.render(filter_name, image, **params)
+
+    try:
+        return _peak_rss_linux(run)
+    except OSError:
+        pass
+    try:
+        return _peak_rss_sampled(run)
+    except ImportError:
+        return None
+
+
+def run_benchmark(resolution_names, filter_names, repeats=3, use_fixtures=True, log=print):
+    results = []
+    for image_name, res_name, image in test_images(resolution_names, use_fixtures):
+        megapixels = image.shape[0] * image.shape[1] / 1e6
+        exact = None
+        for case, filter_name, params in benchmark_cases(filter_names):
+            times = []
+            stage_runs = []
+            for _ in range(repeats):
+                result, elapsed, stages = time_stages(filter_name, image, params)
+                times.append(elapsed)
+                stage_runs.append(stages)
+            median = statistics.median(times)
+            stage_medians = {stage: statistics.median(run.get(stage, 0.0) for run in stage_runs)
+                             for stage in stage_runs[0]}
+            entry = {
+                "key": f"{case}/{res_name}/{image_name}",
+                "case": case,
+                "resolution": res_name,
+                "image": image_name,
+                "megapixels": megapixels,
+                "median_s": median,
+                "min_s": min(times),
+                "mpix_per_s": megapixels / median if median else 0.0,
+                "peak_bytes": peak_memory(filter_name, image, params),
+                "stages_s": stage_medians,
+            }
+            # Error of each cheaper cartoon tier against the exact output
+            if case == "cartoon[exact]":
+                exact = result
+            elif case.startswith("cartoon[") and exact is not None:
+                error = np.abs(result.astype(np.int16) - exact)
+                entry["mean_error"] = float(error.mean())
+                entry["p99_error"] = float(np.percentile(error, 99))
+            results.append(entry)
+            log(format_entry(entry))
+    return results
+
+
+def format_entry(entry):
+    peak = entry["peak_bytes"]
+    memory = f"{peak / 2**20:8.1f} MiB" if peak is not None else "     n/a MiB"
+    line = (f"{entry['key']:<42} {entry['median_s'] * 1000:9.1f} ms "
+            f"{entry['mpix_per_s']:8.1f} MP/s {memory}")
+    if "mean_error" in entry:
+        line += f"  err mean {entry['mean_error']:.2f} p99 {entry['p99_error']:.0f}"
+    stages = ", ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in entry["stages_s"].items())
+    return f"{line}\n    stages (ms): {stages}"
+
+
+def compare(results, baseline, threshold):
+    """Entries that got slower or hungrier than baseline by more than threshold"""
+    previous = {entry["key"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry["key"])
+        if old is None:
+            continue
+        for metric in ("median_s", "peak_bytes"):
+            new = entry[metric]
+            if old.get(metric) and new is not None and new > old[metric] * (1 + threshold):
+                regressions.append((entry["key"], metric, old[metric], new))
+    return regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Cartoonify filters.")
+    parser.add_argument("-r", "--resolutions", default=",".join(RESOLUTIONS),
+                        help="comma-separated subset of: %(default)s")
+    parser.add_argument("-f", "--filters", default=",".join(filters.FILTERS),
+                        help="comma-separated subset of: %(default)s; chains such as "
+                             "cartoon>winxclub are benchmarked as one pipeline")
+    parser.add_argument("-n", "--repeats", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--synthetic-only", action="store_true", help="skip the fixture images")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="OpenCV thread count (default: OpenCV's own choice)")
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown or growth in peak RSS versus baseline (default: 15%%)")
+    args = parser.parse_args(argv)
+
+    resolution_names = [name.strip() for name in args.resolutions.split(",") if name.strip()]
+    filter_names = [name.strip() for name in args.filters.split(",") if name.strip()]
+    unknown = [name for name in resolution_names if name not in RESOLUTIONS]
+    for name in filter_names:
+        try:
+            pipeline.stages(name)
+        except ValueError:
+            unknown.append(name)
+    if unknown:
+        parser.error(f"unknown resolution or filter: {', '.join(unknown)}")
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    results = run_benchmark(resolution_names, filter_names, repeats=args.repeats,
+                            use_fixtures=not args.synthetic_only)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.4g} -> {new:.4g} ({new / old - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
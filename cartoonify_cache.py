@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bounded LRU cache of filter results. Keys combine a digest of the source
+# image with the filter name and its parameters, so the same effect on the same
+# pixels is only ever computed once while it stays in the cache.
+
+
+def image_digest(img):
+    """Content hash of a numpy image, including its shape and dtype"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((img.shape, img.dtype.str)).encode())
+    h.update(memoryview(img if img.flags.c_contiguous else img.copy()).cast("B"))
+    return h.hexdigest()
+
+
+def _freeze(params):
+    # Pipelines nest one parameter dict per filter
+    return tuple(sorted((name, _freeze(value) if isinstance(value, dict) else value)
+                        for name, value in params.items()))
+
+
+def make_key(digest, filter_name, params=None):
+    return (digest, filter_name, _freeze(params or {}))
+
+
+class FilterCache:
+    """LRU cache of numpy results bounded by total bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        size = result.nbytes
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        # Cached arrays are shared between callers, so guard them against edits
+        result.flags.writeable = False
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.nbytes
+            self.entries[key] = result
+            self.current_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self.entries:
+            _, old = self.entries.popitem(last=False)
+            self.current_bytes -= old.nbytes
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
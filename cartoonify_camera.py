@@ -0,0 +1,136 @@
+import threading
+import time
+
+import cv2
+
+from cartoonify_live import open_source
+
+# Camera capture on its own thread. The thread keeps the driver drained and
+# publishes only the newest frame, so the Tk loop never blocks in cap.read()
+# and never renders a frame that has been sitting in the driver's queue.
+# A source that stops delivering frames is retried with backoff and then given
+# up on (error says why), rather than spinning on failed reads.
+
+MAX_READ_FAILURES = 50  # Consecutive failed camera reads before the stream stops
+MAX_RETRY_DELAY = 0.1   # Seconds between read attempts at most (about 5 s to give up)
+
+
+class CameraStream:
+    """Background capture into a single latest-frame slot"""
+
+    def __init__(self, source=0, width=640, height=480):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.cap = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.frame = None
+        self.timestamp = None
+        self.sequence = 0            # Increments for every published frame
+        self.frames_captured = 0
+        self.frames_dropped = 0      # Published but replaced before anyone read them
+        self.read_failures = 0
+        self.error = None            # Why the capture thread stopped on its own, if it did
+        self._last_read_sequence = 0
+
+    @property
+    def is_file(self):
+        return not isinstance(self.source, int)
+
+    def start(self):
+        """Open the source and start the capture thread; False if it cannot be opened"""
+        self.cap = open_source(self.source)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self.cap = None
+            return False
+        if not self.is_file:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            # Ask the driver not to queue stale frames (ignored by some backends)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.stop_event.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="cartoonify-camera", daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        # A recorded video is played back at its own frame rate and looped
+        interval = 0.0
+        if self.is_file:
+            interval = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30)
+        next_frame = time.perf_counter()
+        try:
+            self._capture_loop(interval, next_frame)
+        finally:
+            # Released here, not in stop(), so a read still blocked in the
+            # driver never races the release
+            self.cap.release()
+
+    def _capture_loop(self, interval, next_frame):
+        failures = 0  # Consecutive failed reads
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                failures += 1
+                self.read_failures += 1
+                if self.is_file:
+                    if failures == 1:
+                        # End of the video: loop back to the start
+                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    # Not even the first frame reads: empty or unreadable file
+                    self.error = f"no readable frames in {self.source}"
+                    break
+                if failures >= MAX_READ_FAILURES:
+                    self.error = f"camera {self.source} stopped delivering frames"
+                    break
+                self.stop_event.wait(min(MAX_RETRY_DELAY, 0.01 * 2 ** (failures - 1)))
+                continue
+            failures = 0
+
+            timestamp = time.perf_counter()
+            with self.lock:
+                if self.sequence != self._last_read_sequence:
+                    self.frames_dropped += 1
+                # cap.read() returns a new array each time, so publishing the
+                # reference hands ownership to readers without copying
+                self.frame = frame
+                self.timestamp = timestamp
+                self.sequence += 1
+                self.frames_captured += 1
+
+            if interval:
+                next_frame += interval
+                self.stop_event.wait(max(0.0, next_frame - time.perf_counter()))
+
+    def read_latest(self):
+        """(frame, capture timestamp, sequence) of the newest frame, frame None if none yet
+
+        The frame is shared, not copied; treat it as read-only.
+        """
+        with self.lock:
+            self._last_read_sequence = self.sequence
+            return self.frame, self.timestamp, self.sequence
+
+    def stats(self):
+        with self.lock:
+            return {
+                "frames_captured": self.frames_captured,
+                "frames_dropped": self.frames_dropped,
+                "read_failures": self.read_failures,
+            }
+
+    def stop(self, timeout=1.0):
+        """Stop the capture thread, which releases the device on its way out"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
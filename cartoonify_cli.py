@@ -0,0 +1,136 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+import cartoonify_trace as trace
+import cartoonify_pipeline as pipeline
+from cartoonify_filters import FILTERS, QUALITY_TIERS
+from cartoonify_io import load_image, save_image
+from cartoonify_tiles import apply_tiled
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def find_images(inputs):
+    """Expand files and directories on the command line into image paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _, filenames in os.walk(item):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(dirpath, filename))
+        else:
+            paths.append(item)
+    return paths
+
+
+def output_path_for(path, output_dir, filter_name, ext):
+    name = os.path.splitext(os.path.basename(path))[0]
+    # ">" between chained filters is not allowed in Windows file names
+    return os.path.join(output_dir, f"{name}_{filter_name.replace(pipeline.SEPARATOR, '+')}{ext}")
+
+
+def process_one(job):
+    """Worker entry point: read, filter and write a single image"""
+    try:
+        return convert(job)
+    finally:
+        trace.flush_all()
+
+
+def convert(job):
+    path, out_path, filter_name, params, tile_budget, tile_workers = job
+    with trace.span("image.decode"):
+        image = load_image(path)
+    if image is None:
+        return path, "could not read image"
+    try:
+        if tile_budget:
+            result = apply_tiled(filter_name, image, tile_budget, tile_workers, **params)
+        else:
+            result = pipeline.render(filter_name, image, **params)
+    except cv2.error as e:
+        return path, f"filter failed: {e}"
+    with trace.span("image.encode"):
+        written = save_image(out_path, result)
+    if not written:
+        return path, f"could not write {out_path}"
+    return path, None
+
+
+def init_worker(trace_path):
+    # Each worker runs OpenCV single-threaded so the pool, not OpenCV, owns the cores
+    cv2.setNumThreads(1)
+    trace.configure(trace_path, per_process=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Cartoonify images or whole directories without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="image files or directories")
+    parser.add_argument("-o", "--output", default="cartoonified",
+                        help="output directory (default: %(default)s)")
+    parser.add_argument("-f", "--filter", default="cartoon",
+                        help=f"effect to apply, or several chained with '>', e.g. "
+                             f"'cartoon>winxclub' (one of: {', '.join(sorted(FILTERS))}; "
+                             f"default: %(default)s)")
+    parser.add_argument("-q", "--quality", default="exact", choices=list(QUALITY_TIERS),
+                        help="bilateral-filter quality tier for the cartoon effect "
+                             "(default: %(default)s)")
+    parser.add_argument("--ext", default=".png",
+                        help="output file extension (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--trace", default=os.environ.get("CARTOONIFY_TRACE"),
+                        help="write stage timings to this .jsonl or Prometheus .prom file "
+                             "(.prom files get one file per worker)")
+    parser.add_argument("--tile-memory", type=int, default=256, metavar="MB",
+                        help="working memory per worker; larger images are filtered in "
+                             "overlapping tiles (default: %(default)s, 0 disables tiling)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        pipeline.stages(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+    paths = find_images(args.inputs)
+    if not paths:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output, exist_ok=True)
+    params = pipeline.stage_params(args.filter, "cartoon", {"quality": args.quality})
+    failures = 0
+    workers = max(1, args.workers or 1)
+    # Cores not needed for one process per image go to tiles within each image
+    processes = min(workers, len(paths))
+    tile_workers = max(1, workers // processes)
+    tile_budget = args.tile_memory * 2**20
+    jobs = [(path, output_path_for(path, args.output, args.filter, args.ext), args.filter, params,
+             tile_budget, tile_workers)
+            for path in paths]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(args.trace,)) as pool:
+        chunksize = max(1, len(jobs) // (workers * 8))
+        for done, (path, error) in enumerate(pool.map(process_one, jobs, chunksize=chunksize), 1):
+            if error:
+                failures += 1
+                print(f"[{done}/{len(jobs)}] {path}: {error}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(jobs)}] {path}")
+
+    print(f"Processed {len(jobs) - failures} of {len(jobs)} images into {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+import argparse
+import difflib
+import re
+import sys
+import time
+
+# Voice command grammar. Every intent the assistant understands is listed once
+# in GRAMMAR with the phrases that express it. compile_grammar turns it into a
+# dict from lookup keys to intents, so resolving an utterance is a fixed number
+# of dict lookups (one per key form of each word window of the utterance) no
+# matter how large the vocabulary grows. Keys, tried best first:
+#
+#   exact     the normalised phrase ("hey pixie")
+#   phonetic  the Soundex code of each word, after folding spellings that
+#             sound alike ("wings" sounds like "winx", "chair" like "share")
+#   fuzzy     every spelling one deletion away (SymSpell style), matching
+#             a typo-like error at edit distance one or two
+#
+# Each form is also tried on the words run together, for words the
+# recognizer splits ("up load", "cart tune"), one step below the same form
+# on the words as heard.
+#
+# A key that two intents share is ambiguous and maps to both; it only
+# resolves when the caller narrows the intents it is expecting.
+#
+# Soundex keeps only consonants, so everyday words land on the codes of short
+# commands ("sure" on "share", "clean" on "clone"). For the intents in
+# CAREFUL_INTENTS a phonetic or fuzzy match also needs the first vowel of the
+# words heard to be the first vowel of a phrase giving that key: "chair" still
+# means share, "sure" means nothing.
+
+GRAMMAR = {
+    "wake": ("hey pixie", "hey pics", "hey piss", "hey pixy", "hi pixie", "okay pixie"),
+    "upload": ("upload", "open image", "open a picture", "choose image", "choose a photo"),
+    "camera": ("camera", "take a photo", "take a picture", "selfie"),
+    "cartoon": ("cartoon", "cartoonify"),
+    "sketch": ("sketch", "pencil", "drawing"),
+    "winxclub": ("winx", "winx club", "fairy"),
+    "clone": ("clone", "copies"),
+    "warm": ("warm", "golden"),
+    "noir": ("noir", "black and white"),
+    "pastel": ("pastel",),
+    "save": ("save", "download", "keep it"),
+    "share": ("share", "post it", "send it"),
+    "reset": ("reset", "start over", "start again"),
+}
+
+# Words that carry no command, dropped before matching
+FILLER_WORDS = frozenset("please the a an to filter effect apply use with can you now i want".split())
+MAX_WORDS = 12        # Longest utterance considered; bounds the work per resolve
+MIN_FUZZY_LENGTH = 4  # Shorter words have too many one-deletion neighbours
+# Saving and sharing act outside the app, and clone sounds like common words
+CAREFUL_INTENTS = frozenset(("save", "share", "clone"))
+
+# Match quality, best first
+EXACT, EXACT_JOINED, PHONETIC, PHONETIC_JOINED, FUZZY, FUZZY_JOINED = range(6)
+TIER_NAMES = ("exact", "exact joined", "phonetic", "phonetic joined", "fuzzy", "fuzzy joined")
+
+# Spellings folded together before Soundex, which only looks at single letters
+_PHONETIC_FOLDS = (("ph", "f"), ("ck", "k"), ("sch", "s"), ("sh", "s"), ("ch", "s"),
+                   ("wr", "r"), ("kn", "n"), ("x", "ks"))
+_SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ("aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for letter in letters}
+
+
+def normalize(text):
+    return re.sub(r"[^a-z ]+", " ", text.lower().replace("'", "")).split()
+
+
+def soundex(word):
+    """Four-character Soundex code: words that sound alike share it"""
+    for spelling, sound in _PHONETIC_FOLDS:
+        word = word.replace(spelling, sound)
+    first = word[0]
+    code = first.upper()
+    previous = _SOUNDEX_CODES.get(first, "")
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != "0" and digit != previous:
+            code += digit
+        if letter not in "hw":  # h and w don't separate repeated codes
+            previous = digit
+    return (code + "000")[:4]
+
+
+def first_vowel(words):
+    return next((letter for letter in "".join(words) if letter in "aeiou"), "")
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))} | {word}
+
+
+def _forms(words):
+    """(kind, key) lookup keys of a word sequence, best first"""
+    phrase = " ".join(words)
+    yield EXACT, phrase
+    yield PHONETIC, " ".join(soundex(word) for word in words)
+    if len(words) == 1 and len(phrase) >= MIN_FUZZY_LENGTH:
+        for variant in _deletes(phrase):
+            yield FUZZY, variant
+
+
+def _keys(words):
+    """(tier, (kind, key)) for a word window in tier order: each form as heard, then run together"""
+    if len(words) == 1:
+        return [(kind, (kind, key)) for kind, key in _forms(words)]
+    joined = "".join(words)
+    keys = [(EXACT, (EXACT, " ".join(words))), (EXACT_JOINED, (EXACT, joined)),
+            (PHONETIC, (PHONETIC, " ".join(soundex(word) for word in words))),
+            (PHONETIC_JOINED, (PHONETIC, soundex(joined)))]
+    if len(joined) >= MIN_FUZZY_LENGTH:
+        keys += [(FUZZY_JOINED, (FUZZY, variant)) for variant in _deletes(joined)]
+    return keys
+
+
+class Match:
+    def __init__(self, intent, tier, words):
+        self.intent = intent
+        self.tier = tier
+        self.words = words  # The words of the utterance that matched
+
+    def __repr__(self):
+        return f"Match({self.intent!r}, {TIER_NAMES[self.tier]}, {' '.join(self.words)!r})"
+
+
+class CommandIndex:
+    """A compiled grammar: (kind, key) -> intents"""
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.index = {}
+        self.vowels = {}  # (key, careful intent) -> first vowels of the phrases giving it
+        self.max_phrase_words = 1
+        for intent, phrases in grammar.items():
+            for phrase in phrases:
+                words = [word for word in normalize(phrase) if word not in FILLER_WORDS] \
+                    or normalize(phrase)
+                self.max_phrase_words = max(self.max_phrase_words, len(words))
+                forms = list(_forms(words))
+                if len(words) > 1:
+                    # "winks club" heard as "winksclub" also finds "winx club"
+                    forms += _forms(["".join(words)])
+                for key in forms:
+                    self.index.setdefault(key, set()).add(intent)
+                    if intent in CAREFUL_INTENTS:
+                        self.vowels.setdefault((key, intent), set()).add(first_vowel(words))
+        self.index = {key: frozenset(intents) for key, intents in self.index.items()}
+
+    def _confident(self, key, intent, words):
+        # Exact keys, and intents that are harmless to mishear, need no check
+        if key[0] == EXACT or intent not in CAREFUL_INTENTS:
+            return True
+        return first_vowel(words) in self.vowels[(key, intent)]
+
+    def keywords(self, intents=None):
+        """Phrases for the given intents (all by default), e.g. for a keyword spotter"""
+        return tuple(phrase for intent, phrases in self.grammar.items()
+                     if intents is None or intent in intents for phrase in phrases)
+
+    def resolve(self, utterance, intents=None):
+        """Best Match for utterance among intents (all by default), or None
+
+        The best match has the lowest tier, then the most words, then comes
+        first in the utterance.
+        """
+        words = [word for word in normalize(utterance) if word not in FILLER_WORDS][:MAX_WORDS]
+        best = None
+        for size in range(min(self.max_phrase_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                window = words[start:start + size]
+                for tier, key in _keys(window):
+                    if best is not None and (tier, -size) >= (best.tier, -len(best.words)):
+                        break  # Can't beat the match we have
+                    candidates = self.index.get(key)
+                    if candidates and intents is not None:
+                        candidates = candidates & intents
+                    if candidates and len(candidates) == 1:
+                        intent = next(iter(candidates))
+                        if self._confident(key, intent, window):
+                            best = Match(intent, tier, window)
+                            break
+        return best
+
+    def intent(self, utterance, intents=None):
+        match = self.resolve(utterance, frozenset(intents) if intents is not None else None)
+        return match.intent if match else None
+
+
+COMMANDS = CommandIndex(GRAMMAR)
+
+
+def compile_grammar(grammar=None):
+    return COMMANDS if grammar is None else CommandIndex(grammar)
+
+
+# Utterances as speech recognizers have returned them, with the intent meant
+# (None: not a command). Used by the benchmark to check accuracy.
+MISHEARINGS = (
+    ("hey pixie", "wake"),
+    ("hey pics", "wake"),
+    ("hey pixy", "wake"),
+    ("hey pixi", "wake"),
+    ("hey pixel", "wake"),
+    ("a pixie", None),
+    ("upload", "upload"),
+    ("up load", "upload"),
+    ("upload please", "upload"),
+    ("uplod", "upload"),
+    ("open an image", "upload"),
+    ("camera", "camera"),
+    ("camara", "camera"),
+    ("open the camera", "camera"),
+    ("take a picture", "camera"),
+    ("cartoon", "cartoon"),
+    ("carton", "cartoon"),
+    ("cart tune", "cartoon"),
+    ("cartoonify it", "cartoon"),
+    ("sketch", "sketch"),
+    ("sketchy", "sketch"),
+    ("sketch filter please", "sketch"),
+    ("winx", "winxclub"),
+    ("wings", "winxclub"),
+    ("win x", "winxclub"),
+    ("winks club", "winxclub"),
+    ("clone", "clone"),
+    ("clown", "clone"),
+    ("clean up", None),
+    ("noir", "noir"),
+    ("black and white", "noir"),
+    ("pastel", "pastel"),
+    ("pastille", "pastel"),
+    ("warm", "warm"),
+    ("worm", "warm"),
+    ("save", "save"),
+    ("save it", "save"),
+    ("safe", "save"),
+    ("share", "share"),
+    ("share it", "share"),
+    ("chair", "share"),
+    ("sure", None),
+    ("keep going", None),
+    ("keep it", "save"),
+    ("reset", "reset"),
+    ("re set", "reset"),
+    ("start over", "reset"),
+    ("what's the weather", None),
+    ("hello there", None),
+    ("clear the screen", None),
+    ("what time is it", None),
+    ("", None),
+)
+
+
+def legacy_intent(utterance, intents=None):
+    """The matcher this module replaced: substring checks, then difflib against every phrase"""
+    phrases = {phrase: intent for intent, entries in GRAMMAR.items()
+               if intents is None or intent in intents for phrase in entries}
+    for phrase, intent in phrases.items():
+        if phrase in utterance:
+            return intent
+    matches = difflib.get_close_matches(utterance, list(phrases), n=1, cutoff=0.6)
+    return phrases[matches[0]] if matches else None
+
+
+def check_corpus(matcher, corpus=MISHEARINGS):
+    """(utterance, expected, got) for every corpus entry matcher gets wrong"""
+    return [(heard, expected, got) for heard, expected in corpus
+            for got in [matcher(heard)] if got != expected]
+
+
+def time_matcher(matcher, corpus=MISHEARINGS, repeats=200):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for heard, _ in corpus:
+            matcher(heard)
+    return (time.perf_counter() - start) / (repeats * len(corpus))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the voice command grammar against known mis-hearings and time it.")
+    parser.add_argument("-n", "--repeats", type=int, default=200, help="timed passes over the corpus")
+    parser.add_argument("utterances", nargs="*", help="resolve these instead of running the benchmark")
+    args = parser.parse_args(argv)
+
+    if args.utterances:
+        for utterance in args.utterances:
+            print(f"{utterance!r}: {COMMANDS.resolve(utterance)}")
+        return 0
+
+    start = time.perf_counter()
+    CommandIndex(GRAMMAR)
+    print(f"grammar: {sum(map(len, GRAMMAR.values()))} phrases, {len(COMMANDS.index)} keys, "
+          f"compiled in {(time.perf_counter() - start) * 1000:.1f} ms")
+    failures = 0
+    for name, matcher in (("grammar", COMMANDS.intent), ("legacy", legacy_intent)):
+        wrong = check_corpus(matcher)
+        per_call = time_matcher(matcher, repeats=args.repeats)
+        print(f"{name}: {len(MISHEARINGS) - len(wrong)}/{len(MISHEARINGS)} correct, "
+              f"{per_call * 1e6:.1f} us per utterance")
+        for heard, expected, got in wrong:
+            print(f"  {heard!r}: expected {expected}, got {got}")
+        if name == "grammar":
+            failures = len(wrong)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import cartoonify_trace as trace
+
+# Face detection service. Haar detection cost grows with pixel count, so the
+# search runs on a downscaled copy and boxes are mapped back to full
+# resolution. For video and the live camera preview, update() runs full
+# detection only every few frames and follows faces by template matching in a
+# small window in between. With no face in view it keeps the same cadence, and
+# only a track lost since the last frame brings the next detection forward.
+#
+# The smallest face found is the cascade's own 24 px window at detection scale,
+# as with the old full-resolution calls: the same faces on images up to
+# detect_size, and proportionally larger ones beyond. min_face_px asks for an
+# absolute floor in full-resolution pixels instead, detecting at a larger scale
+# where that needs it.
+
+CASCADE_FILE = "haarcascade_frontalface_default.xml"
+CASCADE_WINDOW = 24  # Smallest face the frontal cascade can see, in pixels
+# Longest side of the detection image. At 640 the portrait in
+# ZisandaNodali_Candidate_Pic.jpg gains a second, false box at scale 1.1
+DETECT_SIZE = 800
+
+# Cascade scale steps of the calls the callers made before sharing a detector:
+# the age estimate searched 1.1, the quality rating the coarser 1.3 and took
+# the first box. Each keeps its own step; the benchmark checks both
+AGE_SCALE_FACTOR = 1.1
+RATING_SCALE_FACTOR = 1.3
+
+
+def load_default_cascade():
+    return cv2.CascadeClassifier(cv2.data.haarcascades + CASCADE_FILE)
+
+
+class FaceDetector:
+    """Downscaled Haar face detection with cheap tracking between detections
+
+    min_face_px is the smallest face to find, in full-resolution pixels (None:
+    whatever the cascade window covers at detect_size). max_face is a size
+    hint as a fraction of the shorter image side that keeps the cascade from
+    scanning scales where no face is expected.
+    """
+
+    def __init__(self, cascade=None, detect_size=DETECT_SIZE, min_face_px=None, max_face=1.0,
+                 scale_factor=AGE_SCALE_FACTOR, min_neighbors=5, redetect_every=10, track_threshold=0.5):
+        self.cascade = cascade if cascade is not None else load_default_cascade()
+        self.detect_size = detect_size
+        self.min_face_px = min_face_px
+        self.max_face = max_face
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.redetect_every = redetect_every
+        self.track_threshold = track_threshold
+        self.reset_tracking()
+
+    def reset_tracking(self):
+        self.frame_index = 0  # Frames since the last full detection
+        self.tracks = []  # (box at detection scale, template) per face
+        self.track_lost = False
+        self.detections_run = 0
+
+    def _downscale(self, gray):
+        height, width = gray.shape[:2]
+        scale = min(1.0, self.detect_size / max(height, width))
+        if self.min_face_px:
+            # Large enough that a min_face_px face still fills the cascade window
+            scale = min(1.0, max(scale, CASCADE_WINDOW / self.min_face_px))
+        if scale < 1.0:
+            gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                              interpolation=cv2.INTER_AREA)
+        return gray, scale
+
+    def _detect_small(self, small, scale_factor=None):
+        short_side = min(small.shape[:2])
+        max_side = max(CASCADE_WINDOW, int(short_side * self.max_face))
+        faces = self.cascade.detectMultiScale(
+            small, scaleFactor=scale_factor or self.scale_factor, minNeighbors=self.min_neighbors,
+            maxSize=(max_side, max_side))
+        self.detections_run += 1
+        return [tuple(int(v) for v in face) for face in faces]
+
+    @staticmethod
+    def _to_full(boxes, scale):
+        if not boxes:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.round(np.array(boxes, dtype=np.float64) / scale).astype(np.int32)
+
+    def detect(self, gray, scale_factor=None):
+        """Face boxes (x, y, w, h) in gray's full-resolution coordinates
+
+        scale_factor overrides the detector's cascade scale step for this call.
+        """
+        with trace.span("faces.detect") as span:
+            small, scale = self._downscale(gray)
+            boxes = self._to_full(self._detect_small(small, scale_factor), scale)
+            span.set(faces=len(boxes))
+            return boxes
+
+    def update(self, gray):
+        """Face boxes for the next video frame: detect every N frames, track otherwise"""
+        small, scale = self._downscale(gray)
+        if self.frame_index % self.redetect_every == 0 or self.track_lost:
+            with trace.span("faces.detect", tracking=True):
+                boxes = self._detect_small(small)
+            self.tracks = [(box, self._template(small, box)) for box in boxes]
+            self.frame_index = 0
+            self.track_lost = False
+        elif self.tracks:
+            with trace.span("faces.track"):
+                tracks = [track for track in (self._track(small, box, template)
+                                              for box, template in self.tracks) if track]
+            # A face that slipped out of its track is looked for on the next frame
+            self.track_lost = len(tracks) < len(self.tracks)
+            self.tracks = tracks
+        self.frame_index += 1
+        return self._to_full([box for box, _ in self.tracks], scale)
+
+    @staticmethod
+    def _template(small, box):
+        x, y, w, h = box
+        return small[y:y + h, x:x + w].copy()
+
+    def _track(self, small, box, template):
+        # Search a window twice the face size around its last position
+        x, y, w, h = box
+        height, width = small.shape[:2]
+        left, top = max(0, x - w // 2), max(0, y - h // 2)
+        right, bottom = min(width, x + w + w // 2), min(height, y + h + h // 2)
+        window = small[top:bottom, left:right]
+        if window.shape[0] < h or window.shape[1] < w:
+            return None
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if best < self.track_threshold:
+            return None
+        new_box = (left + dx, top + dy, w, h)
+        return new_box, self._template(small, new_box)
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def benchmark(paths, detector=None, repeats=3):
+    """Compare FaceDetector with the old full-resolution detectMultiScale calls
+
+    Prints per-image timings and how many of the old boxes are found again
+    (IoU >= 0.5), and checks that each caller's scale step finds as many faces
+    as its old call did. Returns a list of result dicts.
+    """
+    detector = detector or FaceDetector()
+    cascade = detector.cascade
+    results = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"{path}: could not read image", file=sys.stderr)
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        def timed(func):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                boxes = func()
+                best = min(best, time.perf_counter() - start)
+            return boxes, best
+
+        # estimate_age and analyze_face used these two settings on the full image
+        old_boxes, old_time = timed(lambda: cascade.detectMultiScale(gray, AGE_SCALE_FACTOR, 5))
+        old_rating, old_time_13 = timed(
+            lambda: cascade.detectMultiScale(gray, RATING_SCALE_FACTOR, 5))
+        new_boxes, new_time = timed(lambda: detector.detect(gray, AGE_SCALE_FACTOR))
+        new_rating = detector.detect(gray, RATING_SCALE_FACTOR)
+
+        matched = sum(1 for old in old_boxes
+                      if any(box_iou(old, new) >= 0.5 for new in new_boxes))
+        result = {
+            "path": path,
+            "megapixels": gray.size / 1e6,
+            "old_ms": old_time * 1000,
+            "old_1_3_ms": old_time_13 * 1000,
+            "new_ms": new_time * 1000,
+            "old_faces": len(old_boxes),
+            "new_faces": len(new_boxes),
+            "old_rating_faces": len(old_rating),
+            "new_rating_faces": len(new_rating),
+            "matched": matched,
+        }
+        result["counts_match"] = (result["old_faces"] == result["new_faces"]
+                                  and result["old_rating_faces"] == result["new_rating_faces"])
+        results.append(result)
+        print(f"{os.path.basename(path)} ({result['megapixels']:.1f} MP): "
+              f"full-res {result['old_ms']:.0f} ms (1.3: {result['old_1_3_ms']:.0f} ms), "
+              f"downscaled {result['new_ms']:.0f} ms, "
+              f"faces {len(old_boxes)} -> {len(new_boxes)} "
+              f"(1.3: {len(old_rating)} -> {len(new_rating)}), matched {matched}"
+              + ("" if result["counts_match"] else "  COUNT MISMATCH"))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark downscaled face detection "
+                                                 "against full-resolution detection.")
+    parser.add_argument("images", nargs="*", help="images to test (default: images/*.jpg)")
+    parser.add_argument("--detect-size", type=int, default=DETECT_SIZE,
+                        help="longest side of the detection image (default: %(default)s)")
+    parser.add_argument("--min-face", type=int, default=None,
+                        help="smallest face to find in full-resolution pixels "
+                             "(default: the cascade window at the detection size)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    paths = args.images or sorted(glob.glob(os.path.join(os.path.dirname(__file__) or ".", "*.jpg"))
+                                  + glob.glob(os.path.join(os.path.dirname(__file__) or ".", "images", "*.jpg")))
+    results = benchmark(paths, FaceDetector(detect_size=args.detect_size, min_face_px=args.min_face),
+                        repeats=args.repeats)
+    # A detector change that finds more or fewer faces than the old calls fails
+    return 0 if all(result["counts_match"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,481 @@
+import random
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+import cartoonify_grading as grading
+import cartoonify_trace as trace
+
+# Headless versions of the effects shown in the GUI. Every filter takes a BGR
+# image (as returned by cv2.imread) and returns a new BGR image, so they can be
+# used from scripts, the batch CLI or the Tk app alike. Filters also accept an
+# optional ImageArtifacts for the same image (see cartoonify_artifacts) and
+# reuse its grayscale and masks instead of recomputing them.
+
+
+class RenderCancelled(Exception):
+    """Raised by a progress listener to abandon a render between stages"""
+
+
+# Stages each filter reports through report_stage, in order. Clone reports one
+# "clone" stage per copy it places, so it may finish with fewer than listed.
+FILTER_STAGES = {
+    "cartoon": ("grayscale", "median_blur", "adaptive_threshold", "bilateral", "mask"),
+    "sketch": ("grayscale", "adaptive_threshold", "to_bgr"),
+    "winxclub": ("to_hsv", "adjust", "to_bgr"),
+    "warm": ("grade",),
+    "noir": ("grade",),
+    "pastel": ("grade",),
+    "clone": ("grayscale", "canny", "morphology", "contours", "extract",
+              "clone", "clone", "clone", "clone", "clone"),
+}
+
+_listener = threading.local()
+
+
+@contextmanager
+def progress_listener(callback):
+    """Call callback(stage_name) after each filter stage run on this thread"""
+    previous = getattr(_listener, "callback", None)
+    _listener.callback = callback
+    try:
+        yield
+    finally:
+        _listener.callback = previous
+
+
+def report_stage(name):
+    if trace.enabled():
+        trace.stage_done(name)
+    callback = getattr(_listener, "callback", None)
+    if callback is not None:
+        callback(name)
+
+
+# Quality tiers for the colour-smoothing stage of cartoonify. The exact tier is
+# the original full-resolution bilateral filter (d=9, sigma 250/250). The cheaper
+# tiers run a smaller bilateral filter on an INTER_AREA-downsampled copy and
+# upsample the result bilinearly; the full-resolution adaptive-threshold edge
+# mask applied afterwards keeps outlines sharp, so the upsampling softness only
+# survives inside flat regions.
+#
+# Measured against exact with one OpenCV thread on the cartoonify_bench images
+# (the synthetic image and the CartoonFilter/SketchFilter photos). Speed-up is
+# for the whole cartoon filter, edge mask included; errors are the worst image's
+# mean / 99th percentile absolute difference of the final cartoon, 8-bit levels:
+#
+#   tier       scale  d   speed-up 12 MP  1080p    mean err 12 MP  1080p   p99 err 12 MP  1080p
+#   exact      1      9   1x              1x       0               0       0              0
+#   balanced   1/2    5   11-14x          10-14x   0.44            0.61    4              8
+#   fast       1/4    3   15-18x          12-17x   0.77            1.24    11             21
+#
+# The worst image is always the synthetic one, whose sensor noise and hard-edged
+# shapes suffer more from downsampling than the photos do (p99 <= 8 on those).
+QUALITY_TIERS = {
+    "exact": (1, 9),
+    "balanced": (2, 5),
+    "fast": (4, 3),
+}
+
+
+def smooth_colors(img, quality="exact"):
+    """Edge-preserving colour smoothing at the requested quality tier"""
+    try:
+        scale, d = QUALITY_TIERS[quality]
+    except KeyError:
+        raise ValueError(f"Unknown quality '{quality}'. Choose from: {', '.join(QUALITY_TIERS)}")
+
+    height, width = img.shape[:2]
+    small_width, small_height = -(-width // scale), -(-height // scale)
+    # Tiny images gain nothing from downsampling
+    if scale == 1 or min(small_width, small_height) < 32:
+        return cv2.bilateralFilter(img, d=9, sigmaColor=250, sigmaSpace=250)
+
+    # Pad to whole scale x scale blocks so each downsampled pixel averages the
+    # same source pixels whether the image is filtered whole or in tiles
+    pad_bottom, pad_right = small_height * scale - height, small_width * scale - width
+    if pad_bottom or pad_right:
+        img = cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_REPLICATE)
+    small = cv2.resize(img, (small_width, small_height), interpolation=cv2.INTER_AREA)
+    small = cv2.bilateralFilter(small, d=d, sigmaColor=250, sigmaSpace=250 / scale)
+    smooth = cv2.resize(small, (small_width * scale, small_height * scale),
+                        interpolation=cv2.INTER_LINEAR)
+    return smooth[:height, :width] if pad_bottom or pad_right else smooth
+
+
+def grayscale(img, artifacts=None):
+    if artifacts is not None:
+        return artifacts.gray
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def edge_mask(gray, report=report_stage):
+    """Outline mask for the cartoon effect: 0 on edges, 255 elsewhere
+
+    report(stage_name) follows each stage; None when built outside a render.
+    """
+    report = report or (lambda stage_name: None)
+    gray_blur = cv2.medianBlur(gray, 5)
+    report("median_blur")
+    edges = cv2.adaptiveThreshold(gray_blur, 255,
+                                  cv2.ADAPTIVE_THRESH_MEAN_C,
+                                  cv2.THRESH_BINARY, blockSize=9, C=2)
+    report("adaptive_threshold")
+    return edges
+
+
+def cartoonify(img, quality="exact", artifacts=None):
+    """Flat colours from a bilateral filter, outlined with adaptive-threshold edges"""
+    if artifacts is not None:
+        # Shared masks are built without reporting, so report their stages here
+        # whether this render built the mask or reused it
+        edges = artifacts.edge_mask
+        for stage_name in ("grayscale", "median_blur", "adaptive_threshold"):
+            report_stage(stage_name)
+    else:
+        gray = grayscale(img)
+        report_stage("grayscale")
+        edges = edge_mask(gray)
+    color = smooth_colors(img, quality)
+    report_stage("bilateral")
+    cartoon = cv2.bitwise_and(color, color, mask=edges)
+    report_stage("mask")
+    return cartoon
+
+
+def sketch_threshold(gray):
+    """Pencil lines of the sketch effect from a grayscale image"""
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                 cv2.THRESH_BINARY, 9, 10)
+
+
+def sketch(img, artifacts=None):
+    """Black and white pencil look from an adaptive threshold"""
+    img_gray = grayscale(img, artifacts)
+    report_stage("grayscale")
+    sketch_gray = sketch_threshold(img_gray)
+    report_stage("adaptive_threshold")
+    sketch_bgr = cv2.cvtColor(sketch_gray, cv2.COLOR_GRAY2BGR)
+    report_stage("to_bgr")
+    return sketch_bgr
+
+
+def winxclub(img, artifacts=None):
+    """Winx-style dreamy effect: saturation and value boosted in HSV"""
+    return grading.apply_grade(img, "winx", report=report_stage)
+
+
+def warm(img, artifacts=None):
+    """Golden-hour colour grade"""
+    return grading.apply_grade(img, "warm", report=report_stage)
+
+
+def noir(img, artifacts=None):
+    """High-contrast black and white"""
+    return grading.apply_grade(img, "noir", report=report_stage)
+
+
+def pastel(img, artifacts=None):
+    """Soft, desaturated colours with lifted shadows"""
+    return grading.apply_grade(img, "pastel", report=report_stage)
+
+
+def person_mask(gray, report=report_stage):
+    """Rough person mask from edge detection and morphology
+
+    report(stage_name) follows each stage; None when built outside a render.
+    """
+    report = report or (lambda stage_name: None)
+    height, width = gray.shape
+    mask = np.zeros(gray.shape, dtype=np.uint8)
+
+    edges = cv2.Canny(gray, 50, 150)
+    report("canny")
+
+    # Use morphological operations to create a person-like shape
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_DILATE, kernel, iterations=3)
+    report("morphology")
+
+    # Find the largest contour (assuming it's the person)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if contours:
+        largest_contour = max(contours, key=cv2.contourArea)
+        cv2.fillPoly(mask, [largest_contour], 255)
+        # Smooth the mask
+        mask = cv2.GaussianBlur(mask, (5, 5), 0)
+    else:
+        # Fallback: use center region as person
+        center_x, center_y = width // 2, height // 2
+        cv2.ellipse(mask, (center_x, center_y), (width//3, height//2), 0, 0, 360, 255, -1)
+    report("contours")
+    return mask
+
+
+def _div255(buf, scratch):
+    """In-place floor division by 255 of a uint16 buffer holding x <= 255 * 255
+
+    Uses (x + 1 + (x >> 8)) >> 8, which is exact over that range.
+    """
+    np.right_shift(buf, 8, out=scratch)
+    buf += scratch
+    buf += 1
+    buf >>= 8
+    return buf
+
+
+def _premultiply(src, alpha, work):
+    """src * alpha / 255 in uint16 fixed point, returned as a new uint8 image"""
+    height, width = alpha.shape
+    buf = work["blend"][:height, :width]
+    np.multiply(src, alpha[:, :, None], out=buf, dtype=np.uint16)
+    return _div255(buf, work["scratch"][:height, :width]).astype(np.uint8)
+
+
+def _blend_into(dst, src, alpha, work):
+    """dst = (dst * (255 - alpha) + src * alpha) / 255, in place
+
+    uint8 images and an 8-bit alpha, computed in preallocated uint16 scratch
+    buffers instead of float64 masks.
+    """
+    height, width = alpha.shape
+    buf = work["blend"][:height, :width]
+    scratch = work["scratch"][:height, :width]
+    inverse = work["inverse"][:height, :width]
+    np.subtract(255, alpha, out=inverse[:, :, 0], dtype=np.uint16)
+    np.multiply(dst, inverse, out=buf, dtype=np.uint16)
+    np.multiply(src, alpha[:, :, None], out=scratch, dtype=np.uint16)
+    buf += scratch
+    np.copyto(dst, _div255(buf, scratch), casting="unsafe")
+
+
+def _hsv_shift_lut(hue_shift, sat_mult):
+    """256x1x3 LUT equal to cv2.add on H and cv2.multiply on S, identity on V"""
+    levels = np.arange(256, dtype=np.float64)
+    lut = np.empty((256, 1, 3), dtype=np.uint8)
+    lut[:, 0, 0] = np.clip(levels + hue_shift, 0, 255)
+    lut[:, 0, 1] = np.clip(np.rint(levels * sat_mult), 0, 255)
+    lut[:, 0, 2] = levels
+    return lut
+
+
+def _shift_colors(src, inside, hue_shift, sat_mult, out):
+    """Hue/saturation variation applied to the masked pixels only
+
+    Unmasked pixels of a premultiplied clone are black, which an HSV round
+    trip leaves black, so only the flat indices in inside need converting.
+    When the mask covers most of the box a straight pass over it is cheaper
+    than gathering, and gives the same result.
+    """
+    lut = _hsv_shift_lut(hue_shift, sat_mult)
+    if inside is None:
+        hsv = cv2.cvtColor(src, cv2.COLOR_BGR2HSV)
+        cv2.LUT(hsv, lut, dst=hsv)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=out)
+    out[:] = 0
+    if len(inside):
+        flat_out = out.reshape(-1, 3)
+        pixels = src.reshape(-1, 3)[inside].reshape(1, -1, 3)
+        hsv = cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV)
+        cv2.LUT(hsv, lut, dst=hsv)
+        flat_out[inside] = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR).reshape(-1, 3)
+    return out
+
+
+def _scale_box(box_img, box_alpha, origin, fx, fy, frame_size):
+    """Bilinear resize of a box cut from a larger frame, as if the frame were resized
+
+    Returns the resized image and alpha with the box offset in the resized
+    frame. Everything outside the box is black with zero alpha.
+    """
+    box_x, box_y = origin
+    box_h, box_w = box_alpha.shape
+    left, top = int(box_x * fx), int(box_y * fy)
+    right = min(frame_size[0], int(np.ceil((box_x + box_w) * fx)) + 1)
+    bottom = min(frame_size[1], int(np.ceil((box_y + box_h) * fy)) + 1)
+    size = (max(1, right - left), max(1, bottom - top))
+    # Destination pixel u samples source (u + 0.5) / fx - 0.5, like cv2.resize
+    matrix = np.float32([[1 / fx, 0, (left + 0.5) / fx - 0.5 - box_x],
+                         [0, 1 / fy, (top + 0.5) / fy - 0.5 - box_y]])
+    flags = cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP
+    scaled_img = cv2.warpAffine(box_img, matrix, size, flags=flags,
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    scaled_alpha = cv2.warpAffine(box_alpha, matrix, size, flags=flags,
+                                  borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return scaled_img, scaled_alpha, left, top
+
+
+def clone(img, seed=None, scale=1.0, artifacts=None, out=None):
+    """Multiple colour-shifted copies of the person on a wider canvas
+
+    The same seed gives the same clone variations, and scale shrinks the fixed
+    pixel margins so a preview proxy lays out like the full-size render. Pass a
+    previously returned canvas as out to render into it without reallocating.
+    """
+    rng = random.Random(seed) if seed is not None else random
+    height, width = img.shape[:2]
+    margin = int(50 * scale)
+
+    # Create a larger canvas to fit multiple clones
+    canvas_width = int(width * 1.3)
+    canvas_height = int(height * 1.1)
+    if out is not None and out.shape == (canvas_height, canvas_width, 3) and out.dtype == np.uint8:
+        canvas = out
+    else:
+        canvas = np.empty((canvas_height, canvas_width, 3), dtype=np.uint8)
+    canvas[:] = [20, 20, 40]  # Dark blue background
+
+    if artifacts is not None:
+        mask = artifacts.person_mask
+        for stage_name in ("grayscale", "canny", "morphology", "contours"):
+            report_stage(stage_name)
+    else:
+        gray = grayscale(img)
+        report_stage("grayscale")
+        mask = person_mask(gray)
+
+    # All per-clone work happens inside the bounding box of the person mask
+    box_x, box_y, box_w, box_h = cv2.boundingRect(mask)
+    if box_w == 0 or box_h == 0:
+        for stage_name in FILTER_STAGES["clone"][4:]:
+            report_stage(stage_name)  # Nothing to extract or copy
+        return canvas
+    alpha = mask[box_y:box_y + box_h, box_x:box_x + box_w]
+
+    # Scratch buffers sized for the largest (1.1x) scaled clone, reused by every clone
+    max_h, max_w = int(box_h * 1.1) + 2, int(box_w * 1.1) + 2
+    work = {
+        "blend": np.empty((max_h, max_w, 3), dtype=np.uint16),
+        "scratch": np.empty((max_h, max_w, 3), dtype=np.uint16),
+        "inverse": np.empty((max_h, max_w, 1), dtype=np.uint16),
+        "shifted": np.empty((box_h, box_w, 3), dtype=np.uint8),
+    }
+
+    # Extract the person using the mask
+    person = _premultiply(img[box_y:box_y + box_h, box_x:box_x + box_w], alpha, work)
+    # Pixels that colour variations need to touch, found once for all clones
+    inside = np.flatnonzero(alpha)
+    if len(inside) > alpha.size // 2:
+        inside = None
+    report_stage("extract")
+
+    # Define positions for clones
+    clone_positions = [
+        (canvas_width//2 - width//2, canvas_height//2 - height//2),  # Center (original)
+        (margin, canvas_height//2 - height//2),                     # Left
+        (canvas_width - width - margin, canvas_height//2 - height//2),  # Right
+    ]
+
+    # Add some variation to clone positions
+    if canvas_height > height + 2 * margin:
+        clone_positions.extend([
+            (canvas_width//4 - width//4, int(20 * scale)),          # Top left
+            (3*canvas_width//4 - width//4, int(20 * scale)),        # Top right
+        ])
+
+    placed = 0
+    for i, (x, y) in enumerate(clone_positions):
+        if not (x >= 0 and y >= 0 and x + width <= canvas_width and y + height <= canvas_height):
+            continue
+
+        clone_img = person
+        clone_alpha = alpha
+        offset_x, offset_y = box_x, box_y
+        width_to_use = width
+        height_to_use = height
+
+        if i > 0:  # Don't modify the center/original
+            # Add slight color variations
+            hue_shift = rng.randint(-20, 20)
+            sat_mult = rng.uniform(0.8, 1.2)
+            clone_img = _shift_colors(person, inside, hue_shift, sat_mult, work["shifted"])
+
+            # Slightly scale some clones
+            if i % 2 == 0:
+                scale_factor = rng.uniform(0.9, 1.1)
+                width_to_use = int(width * scale_factor)
+                height_to_use = int(height * scale_factor)
+
+                # Resize only the person box, sampling exactly where a resize of
+                # the whole frame would, so the clone lands in the same place
+                clone_img, clone_alpha, offset_x, offset_y = _scale_box(
+                    clone_img, alpha, (box_x, box_y), width_to_use / width, height_to_use / height,
+                    (width_to_use, height_to_use))
+
+                # Adjust position to center the scaled clone
+                x += (width - width_to_use) // 2
+                y += (height - height_to_use) // 2
+
+        # Ensure clone fits in canvas
+        x = max(x, 0)
+        y = max(y, 0)
+        end_x = min(canvas_width, x + width_to_use)
+        end_y = min(canvas_height, y + height_to_use)
+
+        # Clip the person box against the visible part of the clone frame
+        left, top = x + offset_x, y + offset_y
+        right = min(end_x, left + clone_img.shape[1])
+        bottom = min(end_y, top + clone_img.shape[0])
+        if right <= left or bottom <= top:
+            continue
+
+        clip_h, clip_w = bottom - top, right - left
+        _blend_into(canvas[top:bottom, left:right], clone_img[:clip_h, :clip_w],
+                    clone_alpha[:clip_h, :clip_w], work)
+        placed += 1
+        report_stage("clone")
+
+    # One stage per clone slot, placed or not, so progress ends at the last one
+    for _ in range(FILTER_STAGES["clone"].count("clone") - placed):
+        report_stage("clone")
+    return canvas
+
+
+def make_proxy(img, size=250):
+    """Downsample img so it still covers a size x size panel
+
+    Returns the proxy and the scale factor relative to img. Images that are
+    already small enough are returned unchanged.
+    """
+    height, width = img.shape[:2]
+    scale = max(size / width, size / height)
+    if scale >= 1:
+        return img, 1.0
+    proxy_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, proxy_size, interpolation=cv2.INTER_AREA), scale
+
+
+# Filter name -> function, using the same names as CartoonifyApp.current_filter
+FILTERS = {
+    "cartoon": cartoonify,
+    "sketch": sketch,
+    "winxclub": winxclub,
+    "clone": clone,
+    "warm": warm,
+    "noir": noir,
+    "pastel": pastel,
+}
+
+# Filters that are a colour grade from cartoonify_grading, by preset name
+GRADED_FILTERS = {
+    "winxclub": "winx",
+    "warm": "warm",
+    "noir": "noir",
+    "pastel": "pastel",
+}
+
+
+def apply_filter(name, img, artifacts=None, **params):
+    """Run the filter registered under name on a BGR image"""
+    try:
+        filter_func = FILTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown filter '{name}'. Choose from: {', '.join(FILTERS)}")
+    with trace.span(f"filter.{name}", width=img.shape[1], height=img.shape[0]):
+        if trace.enabled():
+            trace.start_stages(f"stage.{name}")
+        return filter_func(img, artifacts=artifacts, **params)
@@ -1,39 +1,90 @@
+import cartoonify_startup as startup  # First, so startup timings include every import
 import tkinter as tk
 from tkinter import Button, Label, filedialog, messagebox, Frame, Toplevel
-import cv2
-from PIL import Image, ImageTk, ImageDraw, ImageFilter, ImageEnhance
+from PIL import Image, ImageTk, ImageFilter, ImageEnhance
 import os
 import urllib.parse
 import webbrowser
-import requests
-import numpy as np
 from tkinter import ttk
 import random
-import speech_recognition as sr
-import pyttsx3
 import threading
-from difflib import get_close_matches
+import time
+import cartoonify_assets as assets
+import cartoonify_trace as trace
+from cartoonify_commands import COMMANDS
+from cartoonify_speech import SpeechQueue, NORMAL, URGENT
+from cartoonify_voice import VoiceListener
+
+# OpenCV, numpy and requests load on first use, or on the warm-up thread while
+# the splash shows, so the window appears before they are imported
+cv2 = startup.lazy_import("cv2")
+filters = startup.lazy_import("cartoonify_filters")
+pipeline = startup.lazy_import("cartoonify_pipeline")
+image_io = startup.lazy_import("cartoonify_io")
+FilterWorker = startup.lazy_import("cartoonify_worker", "FilterWorker")
+FilterCache = startup.lazy_import("cartoonify_cache", "FilterCache")
+image_digest = startup.lazy_import("cartoonify_cache", "image_digest")
+make_key = startup.lazy_import("cartoonify_cache", "make_key")
+ImageArtifacts = startup.lazy_import("cartoonify_artifacts", "ImageArtifacts")
+LivePreviewProcessor = startup.lazy_import("cartoonify_live", "LivePreviewProcessor")
+LivePreviewWorker = startup.lazy_import("cartoonify_live", "LivePreviewWorker")
+live_face_detector = startup.lazy_import("cartoonify_live", "live_face_detector")
+CameraStream = startup.lazy_import("cartoonify_camera", "CameraStream")
+FaceDetector = startup.lazy_import("cartoonify_faces", "FaceDetector")
+load_default_cascade = startup.lazy_import("cartoonify_faces", "load_default_cascade")
+face_detection = startup.lazy_import("cartoonify_faces")
+VideoPipeline = startup.lazy_import("cartoonify_video", "VideoPipeline")
+format_stats = startup.lazy_import("cartoonify_video", "format_stats")
+Uploader = startup.lazy_import("cartoonify_upload", "Uploader")
+
+# Needed before the main screen can show, in the order they are warmed
+CORE_MODULES = ("cartoonify_filters", "cartoonify_pipeline", "cartoonify_io", "cartoonify_cache",
+                "cartoonify_artifacts", "cartoonify_worker", "cartoonify_live")
+# Warmed after the main screen is up, before the user is likely to need them
+LATER_MODULES = ("cartoonify_camera", "cartoonify_upload", "cartoonify_video")
+
+# Screens: name -> (window title, width, height). Each is built once and
+# swapped in and out by show_screen
+SCREENS = {
+    "splash": ("Cartoonify", 400, 400),
+    "main": ("Cartoonify", 800, 600),
+    "camera": ("Camera", 680, 520),
+}
+TRANSITION_BUDGET = 0.1  # Seconds a screen switch may take before it is logged
+
+PANEL_SIZE = 250  # Side of the square original/cartoon preview panels
+FILTER_CACHE_BYTES = 512 * 1024 * 1024  # Memory cap for cached filter results
+LIVE_PREVIEW_FPS = 15  # Target frame rate of the filtered camera preview
+VOICE_ATTEMPTS = 3  # Tries at a voice question before going back to waiting for the wake word
+IMAGE_INTENTS = ("upload", "camera", "reset")
+FILTER_INTENTS = ("cartoon", "sketch", "winxclub", "clone", "warm", "noir", "pastel",
+                  "save", "share", "reset")
+EXPORT_TILE_BUDGET = 256 * 1024 * 1024  # Working memory for full-resolution renders of large images
+# Prompts rendered to audio ahead of time; others are cached once first spoken
+COMMON_PHRASES = (
+    "Voice assistant activated.",
+    "Voice assistant deactivated.",
+    "Hello! You can upload an image or capture one with the camera.",
+    "Say 'upload' to choose an image or 'camera' to take a photo.",
+    "Image uploaded. Which filter would you like to apply?",
+    "Image saved successfully! You can now share it on social media or via email.",
+)
 
 class CartoonifyApp:
-    def __init__(self, root):
+    def __init__(self, root, camera_source=0):
         self.root = root
         self.root.title("Cartoonify")
         self.root.geometry("800x600")
         self.root.configure(bg="#001839")  # Dark blue background
-        self.voice_lock = threading.Lock()
 
 
+        self.screens = {}  # name -> Frame, see SCREENS
+        self.current_screen = None
         self.voice_stop_flag = True
         self.is_mic_on = False
-
-        self.recognizer = sr.Recognizer()
-        self.voice_engine = pyttsx3.init()
-        self.set_south_african_voice()
-        self.voice_stop_flag = True
-        self.is_mic_on = False
-
-        self.recognizer.pause_threshold = 0.8
-        self.recognizer.energy_threshold = 300
+        # Speech and voice input start on first use (see the speech and voice properties)
+        self._speech = None
+        self._voice = None
      
         # Center the window
         screen_width = self.root.winfo_screenwidth()
@@ -43,40 +94,124 @@ class CartoonifyApp:
         self.root.geometry(f"800x600+{x}+{y}")
         
         self.original_image = None
-        self.cartoon_image = None
+        self.cartoon_image = None      # Full-resolution result, rendered on demand for export
+        self.preview_image = None      # Downsampled proxy of original_image sized for the panels
+        self.artifacts = None          # Shared intermediates of original_image (ImageArtifacts)
+        self.preview_artifacts = None  # Same for preview_image
+        self.preview_scale = 1.0
+        self.cartoon_preview = None    # Filter result on the proxy, shown in panel_cartoon
+        self.preview_mode = True       # Run filters on the proxy and defer full-resolution work
+        self.clone_seed = None         # One clone layout per image so results can be cached
+        self.image_digests = {}        # "preview"/"original" -> content hash, filled lazily
         self.current_filter = None
         self.selected_filter = None
-        self.cap = None  # Camera capture object
+        self.filter_quality = "exact"  # Bilateral tier for the cartoon effect: fast, balanced or exact
+        self.camera_stream = None  # CameraStream capturing on its own thread
+        self.last_frame_sequence = 0
+        self.camera_source = camera_source  # Webcam index or a video file to stand in for it
+        self.video_pipeline = None  # Video file being cartoonified in the background
+        self._uploader = None  # Pooled, retrying GoFile uploads, made on first share
+        self.share_format = "jpeg"  # Encoding for shared images, see image_io.SHARE_FORMATS
+        self.upload_task = None
+        self.render_job = None
+        self.export_job = None  # Full-resolution render for a save or share
         self.cartoon_image_path = ""
         self.uploaded_image_url = ""
         
-        # Load OpenCV's face detector
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        
-        # Start with splash screen
+        # Start with splash screen; OpenCV and the filters load behind it
         self.show_splash_screen()
-    
+
+    def init_core(self):
+        # Objects that need OpenCV, made once the warm-up thread has imported it
+        self.filter_cache = FilterCache(max_bytes=FILTER_CACHE_BYTES)
+        self.live_preview = LivePreviewProcessor(target_fps=LIVE_PREVIEW_FPS)
+        self.live_worker = LivePreviewWorker(self.live_preview)  # Filters camera frames off the Tk thread
+        self.preview_worker = FilterWorker()  # Filter clicks, newest click wins
+        self.export_worker = FilterWorker()   # Full-resolution renders for save/share
+        self.image_loader = image_io.ImageLoader()  # Full decodes after the quick preview
+        self.face_detector_future = None
+
+    def warm_up_later(self):
+        # Started once the main screen is up, so it doesn't slow the transition.
+        # OpenCV's face detector searches a downscaled copy of large images
+        self.face_detector_future = startup.warm_up(
+            "face_detector", lambda: FaceDetector(load_default_cascade()))
+        # The camera preview tracks faces with a detector of its own: tracks are
+        # per stream, and a cascade is not safe to share between threads
+        self.live_face_detector_future = startup.warm_up("live_face_detector", live_face_detector)
+        startup.preload(*LATER_MODULES)
+
+    @property
+    def face_detector(self):
+        return self.face_detector_future.result()
+
+    @property
+    def speech(self):
+        # Prompts are spoken on their own thread, which also imports and starts
+        # the TTS engine; speak() never blocks the UI
+        if self._speech is None:
+            self._speech = SpeechQueue(configure=self.set_south_african_voice, phrases=COMMON_PHRASES)
+        return self._speech
+
+    @property
+    def voice(self):
+        # One microphone stream for the session, calibrated once when it opens
+        if self._voice is None:
+            voice = VoiceListener()
+            voice.recognizer.pause_threshold = 0.8
+            voice.recognizer.energy_threshold = 300
+            self._voice = voice
+        return self._voice
+
+    @property
+    def uploader(self):
+        if self._uploader is None:
+            self._uploader = Uploader()
+        return self._uploader
+
+    def build_screen(self, name, build):
+        # Screens are built once; after that switching to one only packs its frame
+        if name not in self.screens:
+            with trace.span("ui.build", screen=name):
+                screen = Frame(self.root, bg="#001839")
+                build(screen)
+            self.screens[name] = screen
+        return self.screens[name]
+
+    def show_screen(self, name):
+        # Swap the visible screen: hide the current frame, resize and show the
+        # other. Widgets, panel images and filter state of both are kept.
+        if name == self.current_screen:
+            return
+        start = time.perf_counter()
+        previous = self.current_screen
+        if previous in self.screens:
+            self.screens[previous].pack_forget()
+        title, width, height = SCREENS[name]
+        self.root.title(title)
+        x = (self.root.winfo_screenwidth() - width) // 2
+        y = (self.root.winfo_screenheight() - height) // 2
+        self.root.geometry(f"{width}x{height}+{x}+{y}")
+        self.screens[name].pack(expand=True, fill="both")
+        self.current_screen = name
+        self.root.update_idletasks()
+        took = time.perf_counter() - start
+        trace.emit("ui.transition", took, {"from": previous or "", "to": name})
+        if took > TRANSITION_BUDGET:
+            print(f"Switching from {previous} to {name} took {took * 1000:.0f} ms")
+
     def show_splash_screen(self):
-        # Clear any existing widgets from root
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Configure the whole window as splash
-        self.root.geometry("400x400")
-        
-        # Center the splash window
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        x = (screen_width - 400) // 2
-        y = (screen_height - 400) // 2
-        self.root.geometry(f"400x400+{x}+{y}")
-        
-        # Create a frame for the splash content
-        splash_frame = Frame(self.root, bg="#001839")
-        splash_frame.pack(expand=True, fill="both")
-        
+        self.build_screen("splash", self.build_splash_screen)
+        self.show_screen("splash")
+
+        # First frame on screen; the main screen follows as soon as the
+        # filters it needs have been imported
+        startup.mark("splash shown")
+        # Icons first: cut from the prebuilt atlas this is a few milliseconds
+        startup.warm_up("icons", assets.preload)
+        self.poll_core_ready(startup.preload(*CORE_MODULES))
+
+    def build_splash_screen(self, splash_frame):
         # Try to load and display the logo
         try:
             logo_img = Image.open("images\\logo.png")
@@ -92,13 +227,28 @@ class CartoonifyApp:
             logo_label = Label(splash_frame, text="Cartoonify", font=("Arial", 30, "bold"), 
                               bg="#001839", fg="white")
             logo_label.pack(pady=(80, 20))
-        
-        # Schedule transition to main app after delay
-        self.root.after(3000, self.transition_to_main_app)
-    
+
+    def poll_core_ready(self, future):
+        if not future.done():
+            self.root.after(15, lambda: self.poll_core_ready(future))
+            return
+        future.result()  # Raises if an import failed
+        startup.mark("core imported")
+        self.init_core()
+        self.transition_to_main_app()
+
     def transition_to_main_app(self):
         # Animate the transition by gradually expanding the window
-        self.animate_transition(400, 400, 800, 600, steps=10, target_interface=self.init_main_interface)
+        def show_main():
+            self.init_main_interface()
+            startup.mark("main screen shown")
+            # Never shown again
+            self.screens.pop("splash").destroy()
+            self.logo_photo = None
+            self.warm_up_later()
+            if startup.report_requested():
+                print(startup.report())
+        self.animate_transition(400, 400, 800, 600, steps=10, target_interface=show_main)
     
     def animate_transition(self, start_width, start_height, end_width, end_height, steps=10, target_interface=None):
         def resize_step(current_step):
@@ -128,12 +278,12 @@ class CartoonifyApp:
         if self.voice_stop_flag:
             self.voice_stop_flag = False
             self.is_mic_on = True
-            self.speak("Voice assistant activated.")
+            self.speak("Voice assistant activated.", topic="voice", priority=URGENT)
             threading.Thread(target=self.run_voice_assistant, daemon=True).start()
         else:
             self.voice_stop_flag = True
             self.is_mic_on = False
-            self.speak("Voice assistant deactivated.")
+            self.speak("Voice assistant deactivated.", topic="voice", priority=URGENT)
 
     def start_voice_assistant(self):
     # Start your voice assistant thread if not already running
@@ -149,84 +299,125 @@ class CartoonifyApp:
 
     def run_voice_assistant(self):
         self.voice_stop_flag = False
-        self.speak("Welcome to Tooniepix. You can upload an image or capture one with the camera.")
+        self.speak("Welcome to Tooniepix. You can upload an image or capture one with the camera.", wait=True)
+        wake_phrases = COMMANDS.keywords(("wake",))
         while not self.voice_stop_flag:
-        # existing code here for listening...
             try:
-                with sr.Microphone() as source:
-                    self.recognizer.adjust_for_ambient_noise(source)
-                    audio = self.recognizer.listen(source, timeout=5)
-                    command = self.recognizer.recognize_google(audio).lower()
-                    print(f"Recognized: {command}")
-
-                    if self.is_match(command, ["hey pixie", "hey pics", "hey piss", "hey pixy"]):
-                        self.speak("Hello! You can upload an image or capture one with the camera.")
-                        self.wait_for_image_command()
-
-            # optionally add a short sleep here to prevent 100% CPU
-            except sr.WaitTimeoutError:
-                continue
-            except sr.UnknownValueError:
-                continue
+                utterance = self.voice.hear(wake_phrases)
+                if utterance is None:
+                    continue
+                print(f"Recognized: {utterance.text}")
+
+                if COMMANDS.intent(utterance.text, ("wake",)):
+                    self.voice.action_started(utterance, "wake")
+                    self.speak("Hello! You can upload an image or capture one with the camera.", wait=True)
+                    self.wait_for_image_command()
             except Exception as e:
                 print(f"Voice Error: {e}")
+        self.voice.close()
+        if self.voice.latency.latencies:
+            print(self.voice.latency.summary())
         print("Voice assistant stopped.")
 
-    def speak(self, text):
-        with self.voice_lock:
-            self.voice_engine.say(text)
-            self.voice_engine.runAndWait()
-
-    def is_match(self, command, keywords):
-        for keyword in keywords:
-            if keyword in command:
-                return keyword
-        matches = get_close_matches(command, keywords, n=1, cutoff=0.6)
-        return matches[0] if matches else None
+    def run_voice_action(self, utterance, name, action):
+        # Start action on the Tk thread, timing it from the end of the spoken command
+        def run():
+            self.voice.action_started(utterance, name)
+            action()
+        self.root.after(0, run)
+
+    def speak(self, text, wait=False, topic=None, priority=NORMAL):
+        # Queued for the speech thread. wait=True blocks until the prompt has been
+        # said, so the microphone does not hear it; only voice threads may wait.
+        # Prompts sharing a topic replace each other while waiting to be spoken.
+        prompt = self.speech.say(text, priority=priority, topic=topic)
+        if wait:
+            prompt.done.wait()
+
+    def voice_actions(self):
+        # Intent from cartoonify_commands -> (action on the Tk thread, spoken confirmation)
+        return {
+            "upload": (self.open_image, "Uploading image."),
+            "camera": (self.init_camera_interface, "Opening camera."),
+            "reset": (self.reset_app, "Resetting the app."),
+            "cartoon": (self.cartoonify_image, None),
+            "sketch": (self.sketch_filter, None),
+            "winxclub": (self.winxclub_filter, None),
+            "clone": (self.clone_filter, None),
+            "warm": (lambda: self.grade_filter("warm"), None),
+            "noir": (lambda: self.grade_filter("noir"), None),
+            "pastel": (lambda: self.grade_filter("pastel"), None),
+            "save": (self.save_image, None),
+            "share": (self.open_socials_window, None),
+        }
+
+    def ask_for_command(self, prompt, intents, retry_prompt):
+        # Voice thread: ask, then listen for one of intents a few times before
+        # giving up. Returns the intent acted on, or None.
+        self.speak(prompt, wait=True)
+        keywords = COMMANDS.keywords(intents)
+        for attempt in range(VOICE_ATTEMPTS):
+            if self.voice_stop_flag:
+                return None
+            try:
+                utterance = self.voice.hear(keywords, timeout=6)
+            except Exception as e:
+                print(f"Error while listening for a command: {e}")
+                self.speak("Something went wrong. Please try again.", wait=True)
+                continue
+            if utterance is not None:
+                print(f"Command: {utterance.text}")
+                intent = COMMANDS.intent(utterance.text, intents)
+                if intent is not None:
+                    action, confirmation = self.voice_actions()[intent]
+                    self.run_voice_action(utterance, intent, action)
+                    if confirmation:
+                        self.speak(confirmation)
+                    return intent
+            if attempt + 1 < VOICE_ATTEMPTS:
+                self.speak(retry_prompt, wait=True)
+        return None
 
 
 
 
-    def listen_command(self, timeout=5):
-        with self.voice_lock:
-            try:
-                with sr.Microphone() as source:
-                    self.recognizer.adjust_for_ambient_noise(source)
-                    audio = self.recognizer.listen(source, timeout=timeout)
-                return self.recognizer.recognize_google(audio).lower()
-            except sr.WaitTimeoutError:
-                print("Listening timed out.")
-            except sr.UnknownValueError:
-                print("Could not understand audio.")
-            except Exception as e:
-                print(f"Recognition error: {e}")
+    def listen_command(self, timeout=5, keywords=()):
+        try:
+            utterance = self.voice.hear(keywords, timeout=timeout)
+        except Exception as e:
+            print(f"Recognition error: {e}")
+            return None
+        if utterance is None:
+            print("Could not understand audio.")
             return None
+        return utterance.text
 
-    def set_south_african_voice(self):
-        voices = self.voice_engine.getProperty('voices')
+    def set_south_african_voice(self, engine):
+        # Runs on the speech thread, which owns the engine
+        voices = engine.getProperty('voices')
         for voice in voices:
             if "english" in voice.name.lower() and "south africa" in voice.name.lower():
-                self.voice_engine.setProperty('voice', voice.id)
+                engine.setProperty('voice', voice.id)
                 return
         for voice in voices:
             if "english" in voice.name.lower() and "female" in voice.name.lower():
-                self.voice_engine.setProperty('voice', voice.id)
+                engine.setProperty('voice', voice.id)
                 return
 
     def init_main_interface(self):
-        # Clear any existing widgets from root
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.build_screen("main", self.build_main_screen)
+        self.show_screen("main")
 
+    def build_main_screen(self, screen):
         # Title label
-        self.title_label = Label(self.root, text="🎨 Let's Cartoonify Your Image! 🎨", 
+        self.title_label = Label(screen, text="🎨 Let's Cartoonify Your Image! 🎨", 
                         font=("Segoe UI", 24, "bold"), 
                         bg="#001839", fg= "#FFD93D",
                         relief="flat", bd=0)
         self.title_label.pack(pady=(15,0))
 
         # Create image source buttons frame
-        self.source_frame = Frame(self.root, bg="#001839")
+        self.source_frame = Frame(screen, bg="#001839")
         self.source_frame.pack(pady=1)
 
         # Open Image Button
@@ -235,11 +426,9 @@ class CartoonifyApp:
                                  padx=10, pady=5, borderwidth=0)
         self.open_button.pack(side=tk.LEFT, padx=10)
 
-        # Try to load camera icon for the Camera Button
+        # Try to load camera icon for the Camera Button (decoded once, see cartoonify_assets)
         try:
-            camera_img = Image.open("images\\camera_icon.png")
-            camera_img = camera_img.resize((30, 30), Image.LANCZOS)
-            self.camera_photo = ImageTk.PhotoImage(camera_img)
+            self.camera_photo = assets.photo(self.root, "camera")
             
             self.camera_button = Button(self.source_frame, image=self.camera_photo, command=self.init_camera_interface,
                                       bg="#1976D2", fg="white", borderwidth=0, padx=10, pady=5)
@@ -251,9 +440,15 @@ class CartoonifyApp:
                                       padx=10, pady=5, borderwidth=0)
         
         self.camera_button.pack(side=tk.LEFT, padx=10)
+
+        # Video Button: streams a clip through the current filter
+        self.video_button = Button(self.source_frame, text="Video", command=self.cartoonify_video,
+                                   bg="#1976D2", fg="white", font=("Arial", 12),
+                                   padx=10, pady=5, borderwidth=0)
+        self.video_button.pack(side=tk.LEFT, padx=10)
         # Add mic toggle button
                 # Image display frame (side-by-side with arrow between)
-        self.image_frame = Frame(self.root, bg="#001839")
+        self.image_frame = Frame(screen, bg="#001839")
         self.image_frame.pack(pady=20)
 
 # .......... Estimate Age Button ..........
@@ -289,33 +484,13 @@ class CartoonifyApp:
         self.beauty_label.grid(row=1, column=0, columnspan=3, pady=10)
 
         # Filter buttons frame
-        self.filter_frame = Frame(self.root, bg="#001839")
+        self.filter_frame = Frame(screen, bg="#001839")
         self.filter_frame.pack(pady=10)
 
-        # Load filter icons
+        # Load filter icons, already resized and masked to circles
         try:
-            # Cartoon filter icon - create rounded appearance
-            cartoon_img = Image.open("images\\CartoonFilter.jpg")
-            cartoon_img = cartoon_img.resize((60, 60), Image.LANCZOS)
-            
-            # Create a circular mask
-            mask = Image.new("L", cartoon_img.size, 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, cartoon_img.size[0], cartoon_img.size[1]), fill=255)
-            
-            # Apply mask to create circular image
-            cartoon_circle = Image.new("RGBA", cartoon_img.size)
-            cartoon_circle.paste(cartoon_img, (0, 0), mask)
-            self.cartoon_photo = ImageTk.PhotoImage(cartoon_circle)
-            
-            # Sketch filter icon - create rounded appearance
-            sketch_img = Image.open("images\\SketchFilter.jpg")
-            sketch_img = sketch_img.resize((60, 60), Image.LANCZOS)
-            
-            # Apply same mask for consistency
-            sketch_circle = Image.new("RGBA", sketch_img.size)
-            sketch_circle.paste(sketch_img, (0, 0), mask)
-            self.sketch_photo = ImageTk.PhotoImage(sketch_circle)
+            self.cartoon_photo = assets.photo(self.root, "cartoon")
+            self.sketch_photo = assets.photo(self.root, "sketch")
         except Exception as e:
             # If images can't be loaded, create placeholder colors
             self.cartoon_photo = None
@@ -341,7 +516,9 @@ class CartoonifyApp:
         
         self.cartoon_icon.pack()
         self.cartoon_container.bind("<Button-1>", lambda e: self.cartoonify_image())
-        self.cartoon_icon.bind("<Button-1>", lambda e: self.show_loading_bar(self.cartoonify_image))
+        self.cartoon_icon.bind("<Button-1>", lambda e: self.cartoonify_image())
+        for widget in (self.cartoon_container, self.cartoon_icon):
+            widget.bind("<Shift-Button-1>", lambda e: self.chain_filter("cartoon", self.cartoon_container))
         
         self.cartoon_label = Label(self.cartoon_frame, text="Cartoon", bg="#001839", fg="white", font=("Arial", 10))
         self.cartoon_label.pack(pady=5)
@@ -365,7 +542,9 @@ class CartoonifyApp:
         
         self.sketch_icon.pack()
         self.sketch_container.bind("<Button-1>", lambda e: self.sketch_filter())
-        self.sketch_icon.bind("<Button-1>", lambda e: self.show_loading_bar(self.sketch_filter))
+        self.sketch_icon.bind("<Button-1>", lambda e: self.sketch_filter())
+        for widget in (self.sketch_container, self.sketch_icon):
+            widget.bind("<Shift-Button-1>", lambda e: self.chain_filter("sketch", self.sketch_container))
         
         self.sketch_label = Label(self.sketch_frame, text="Sketch", bg="#001839", fg="white", font=("Arial", 10))
         self.sketch_label.pack()
@@ -379,17 +558,7 @@ class CartoonifyApp:
         self.winx_container.pack(pady=5)
 
         try:
-            winx_img = Image.open("images\\WinxFilter.png")
-            winx_img = winx_img.resize((60, 60), Image.LANCZOS)
-
-            # Create circular mask
-            mask = Image.new("L", winx_img.size, 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, winx_img.size[0], winx_img.size[1]), fill=255)
-
-            winx_circle = Image.new("RGBA", winx_img.size)
-            winx_circle.paste(winx_img, (0, 0), mask)
-            self.winx_photo = ImageTk.PhotoImage(winx_circle)
+            self.winx_photo = assets.photo(self.root, "winx")
 
             self.winx_icon = Label(self.winx_container, image=self.winx_photo, bg="#001839", borderwidth=0)
         except Exception as e:
@@ -398,7 +567,9 @@ class CartoonifyApp:
 
         self.winx_icon.pack()
         self.winx_container.bind("<Button-1>", lambda e: self.winxclub_filter())
-        self.winx_icon.bind("<Button-1>", lambda e: self.show_loading_bar(self.winxclub_filter))
+        self.winx_icon.bind("<Button-1>", lambda e: self.winxclub_filter())
+        for widget in (self.winx_container, self.winx_icon):
+            widget.bind("<Shift-Button-1>", lambda e: self.chain_filter("winxclub", self.winx_container))
 
         self.winx_label = Label(self.winx_frame, text="Winx", bg="#001839", fg="white", font=("Arial", 10))
         self.winx_label.pack()
@@ -412,18 +583,7 @@ class CartoonifyApp:
         self.clone_container.pack(pady=5)
 
         try:
-            # Load Clone filter icon and create rounded appearance
-            clone_img = Image.open("images\\CloneFilter.jpg")
-            clone_img = clone_img.resize((60, 60), Image.LANCZOS)
-
-            # Reuse the circular mask from earlier
-            mask = Image.new("L", clone_img.size, 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, clone_img.size[0], clone_img.size[1]), fill=255)
-
-            clone_circle = Image.new("RGBA", clone_img.size)
-            clone_circle.paste(clone_img, (0, 0), mask)
-            self.clone_photo = ImageTk.PhotoImage(clone_circle)
+            self.clone_photo = assets.photo(self.root, "clone")
 
             self.clone_icon = Label(self.clone_container, image=self.clone_photo, bg="#001839", borderwidth=0)
         except Exception as e:
@@ -432,13 +592,35 @@ class CartoonifyApp:
 
         self.clone_icon.pack()
         self.clone_container.bind("<Button-1>", lambda e: self.clone_filter())
-        self.clone_icon.bind("<Button-1>", lambda e: self.show_loading_bar(self.clone_filter))
+        self.clone_icon.bind("<Button-1>", lambda e: self.clone_filter())
+        for widget in (self.clone_container, self.clone_icon):
+            widget.bind("<Shift-Button-1>", lambda e: self.chain_filter("clone", self.clone_container))
 
         self.clone_label = Label(self.clone_frame, text="Clone", bg="#001839", fg="white", font=("Arial", 10))
         self.clone_label.pack()
 
+        # Colour grade buttons: one-pass lookup-table looks, smaller than the
+        # effect icons. Labels rather than Buttons so Shift-click can chain
+        # without also firing a plain click.
+        self.grade_frame = Frame(screen, bg="#001839")
+        self.grade_frame.pack(pady=(0, 10))
+        self.grade_containers = {}
+        for column, (filter_name, text) in enumerate((("warm", "Warm"), ("noir", "Noir"),
+                                                      ("pastel", "Pastel"))):
+            container = Frame(self.grade_frame, bg="#001839",
+                              highlightbackground="#001839", highlightthickness=2, bd=0)
+            container.grid(row=0, column=column, padx=10)
+            label = Label(container, text=text, bg="#1976D2", fg="white", font=("Arial", 10),
+                          padx=12, pady=3, cursor="hand2")
+            label.pack()
+            for widget in (container, label):
+                widget.bind("<Button-1>", lambda e, name=filter_name: self.grade_filter(name))
+                widget.bind("<Shift-Button-1>", lambda e, name=filter_name, box=container:
+                            self.chain_filter(name, box))
+            self.grade_containers[filter_name] = container
+
         # Action buttons frame
-        self.action_frame = Frame(self.root, bg="#001839")
+        self.action_frame = Frame(screen, bg="#001839")
         self.action_frame.pack(pady=0)
  
         # Add progress bar (initially hidden)
@@ -460,6 +642,12 @@ class CartoonifyApp:
                                  padx=15, pady=5, borderwidth=0, state='disabled')
         self.share_button.grid(row=0, column=2, padx=10,pady=(0, 20))
 
+        # Format shared images are encoded in; lossy and far smaller than a PNG
+        self.share_format_var = tk.StringVar(value=self.share_format)
+        share_menu = ttk.OptionMenu(self.action_frame, self.share_format_var, self.share_format,
+                                    *image_io.SHARE_FORMATS, command=self.set_share_format)
+        share_menu.grid(row=0, column=3, padx=10, pady=(0, 20))
+
 
         style = ttk.Style(self.root)
         style.theme_use('default')
@@ -473,8 +661,9 @@ class CartoonifyApp:
                 darkcolor='#4caf50')
 
 # Create progress bar
-        self.progress_bar = ttk.Progressbar(self.root,
-                                    mode='indeterminate',
+        self.progress_bar = ttk.Progressbar(screen,
+                                    mode='determinate',
+                                    maximum=100,
                                     length=300,
                                     style="Custom.Horizontal.TProgressbar")
 
@@ -482,69 +671,52 @@ class CartoonifyApp:
 
 
        
-    def show_loading_bar(self, after_callback=None):
+    def show_loading_bar(self):
+        self.progress_bar['value'] = 0
         self.progress_bar.place(relx=0.5, rely=0.95, anchor='center')
-        self.progress_bar.start(10)
-        if after_callback:
-            self.root.after(3000, lambda: [self.hide_loading_bar(), after_callback()])
-        else:
-            self.root.after(3000, self.hide_loading_bar)
+
     def on_filter_selected(self, filter_name):
         self.selected_filter = filter_name
-        self.show_loading_bar()
-        # After 3 seconds, apply the filter
-        self.root.after(3000, self.apply_selected_filter)
+        self.apply_selected_filter()
  
-    def hide_loading_bar(self):
-        self.progress_bar.stop()
-        self.progress_bar.place_forget()
-
     def apply_selected_filter(self):
-        self.hide_loading_bar()
-
         if self.original_image is None or self.selected_filter is None:
             return
 
-        if self.selected_filter == 'cartoon':
-            filtered = self.cartoonify_image(process_only=True)
-        elif self.selected_filter == 'sketch':
-            filtered = self.sketch_filter(process_only=True)
-        elif self.selected_filter == 'winxclub':
-            filtered = self.winxclub_filter(process_only=True)
-        elif self.selected_filter == 'clone':
-            filtered = self.clone_filter(process_only=True)
-        else:
+        if self.selected_filter not in filters.FILTERS:
             return
 
         # Show filtered image on panel_cartoon
-        self.display_filtered_image(filtered)
+        self.render_filter(self.selected_filter)
 
     def hide_loading_bar(self):
-        self.progress_bar.stop()
         self.progress_bar.place_forget()
 
     def init_camera_interface(self):
-        # First animate closing the main interface
-        self.animate_transition(800, 600, 680, 520, steps=10, target_interface=self.show_camera_interface)
-    
-    def show_camera_interface(self):
-        # Clear any existing widgets from root
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Configure camera window
-        self.root.title("Camera")
-        
+        self.build_screen("camera", self.build_camera_screen)
+        self.show_camera_interface()
+
+    def build_camera_screen(self, screen):
         # Add a title
-        title_label = Label(self.root, text="Camera Preview", font=("Arial", 16), bg="#001839", fg="white")
+        title_label = Label(screen, text="Camera Preview", font=("Arial", 16), bg="#001839", fg="white")
         title_label.pack(pady=10)
         
         # Camera preview frame
-        self.camera_frame = Label(self.root, bg="black", width=640, height=480)
+        self.camera_frame = Label(screen, bg="black", width=640, height=480)
         self.camera_frame.pack(pady=10)
+
+        # Live filter choice and achieved frame rate / latency
+        live_frame = Frame(screen, bg="#001839")
+        live_frame.pack()
+        self.live_filter_var = tk.StringVar(value="none")
+        live_menu = ttk.OptionMenu(live_frame, self.live_filter_var, self.live_filter_var.get(),
+                                   "none", *filters.FILTERS, command=self.set_live_filter)
+        live_menu.pack(side=tk.LEFT, padx=10)
+        self.live_stats_label = Label(live_frame, text="", font=("Arial", 10), bg="#001839", fg="white")
+        self.live_stats_label.pack(side=tk.LEFT, padx=10)
         
         # Buttons frame
-        buttons_frame = Frame(self.root, bg="#001839")
+        buttons_frame = Frame(screen, bg="#001839")
         buttons_frame.pack(pady=10)
         
         # Capture button
@@ -558,124 +730,167 @@ class CartoonifyApp:
                                    bg="#757575", fg="white", font=("Arial", 12),
                                    padx=15, pady=5, borderwidth=0)
         self.cancel_button.pack(side=tk.LEFT, padx=10)
-        
-        # Initialize webcam
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+
+    def show_camera_interface(self):
+        if self.camera_stream is not None:
+            return  # Already showing it
+        # No frame from the previous visit while the camera starts
+        self.camera_frame.configure(image="")
+        self.camera_frame.image = None
+        self.live_stats_label.config(text="")
+        self.live_filter_var.set(self.live_preview.filter_name or "none")
+        if self.live_preview.face_detector is None:
+            self.live_preview.face_detector = self.live_face_detector_future.result()
+        self.live_worker.reset()  # Also restarts face tracking
+        self.show_screen("camera")
+
+        # Initialize webcam (or the recorded video standing in for it) at 640x480
+        self.camera_stream = CameraStream(self.camera_source, width=640, height=480)
+        if not self.camera_stream.start():
+            self.camera_stream = None
             messagebox.showerror("Error", "Could not open webcam. Please check your camera connection.")
             self.return_to_main()
             return
-            
-        # Set camera resolution
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
+        self.last_frame_sequence = 0
+
         # Start video feed
         self.update_cam()
     
+    def set_live_filter(self, filter_name):
+        self.live_preview.set_filter(None if filter_name == "none" else filter_name)
+
     def update_cam(self):
         # Check if we're still in camera mode
-        if not hasattr(self, 'camera_frame') or not self.cap or not self.cap.isOpened():
+        if self.camera_stream is None:
+            return
+        if not self.camera_stream.running:
+            # The capture thread gave up on a source that stopped delivering frames
+            if self.camera_stream.error:
+                messagebox.showerror("Error", f"Camera stopped: {self.camera_stream.error}")
+                self.return_to_main()
             return
             
-        # Get a frame from the webcam
-        ret, frame = self.cap.read()
-        if ret:
+        # Newest frame from the capture thread; never blocks on the camera
+        frame, _, sequence = self.camera_stream.read_latest()
+        if frame is not None and sequence != self.last_frame_sequence:
+            self.last_frame_sequence = sequence
+            # Filtered on the live worker; frames that arrive before the next
+            # one is due, or while the worker is busy, are dropped
+            self.live_worker.offer(frame)
+
+        shown = self.live_worker.take()
+        if shown is not None:
             # Convert frame to format tkinter can display
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            img_tk = ImageTk.PhotoImage(image=img)
-            
+            with trace.span("display.camera"):
+                frame_rgb = cv2.cvtColor(shown, cv2.COLOR_BGR2RGB)
+                img = Image.fromarray(frame_rgb)
+                img_tk = ImageTk.PhotoImage(image=img)
+
             # Update the label
             self.camera_frame.configure(image=img_tk)
             self.camera_frame.image = img_tk
-            
-            # Store the current frame
-            self.current_frame = frame
-            
-        # Schedule the next update
-        self.root.after(10, self.update_cam)
+            self.live_stats_label.config(text=self.live_preview.stats_text())
+
+        # Schedule the next update for when the next frame is due (sooner while
+        # one is being filtered), polling no faster than every 5 ms
+        delay = 5 if self.live_worker.busy else max(5, self.live_preview.delay_until_next_ms())
+        self.root.after(delay, self.update_cam)
     
     def capture_image(self):
-        # Capture the current frame
-        if hasattr(self, 'current_frame'):
-            # Save the frame as image
-            self.original_image = self.current_frame.copy()
+        # Capture the freshest frame; the capture thread never touches it again
+        frame = self.camera_stream.read_latest()[0] if self.camera_stream else None
+        if frame is not None:
+            # Save the frame as image; this also drops any file still decoding
+            self.set_original_image(frame)
             self.release_camera()  # Release camera resources
-            # Transition back to main interface
-            self.animate_transition(680, 520, 800, 600, steps=10, target_interface=self.return_to_main_with_image)
+            self.return_to_main_with_image()
     
     def return_to_main(self):
         self.release_camera()  # Release camera resources
-        # Transition back to main interface
-        self.animate_transition(680, 520, 800, 600, steps=10, target_interface=self.init_main_interface)
+        # Back to the main screen as it was left
+        self.init_main_interface()
     def process_voice_command(self, command):
-        if "reset" in command:
-            self.speak("Resetting the app.")
-            self.root.after(0, self.reset_app)
-    # add more commands here as needed
+        # Act on an already recognized command, whatever it asks for
+        intent = COMMANDS.intent(command)
+        if intent is None or intent == "wake":
+            return
+        action, confirmation = self.voice_actions()[intent]
+        if confirmation:
+            self.speak(confirmation)
+        self.root.after(0, action)
 
     def wait_for_image_command(self):
-        self.speak("Say 'upload' to choose an image or 'camera' to take a photo.")
-        try:
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source)
-                audio = self.recognizer.listen(source, timeout=6)
-                command = self.recognizer.recognize_google(audio).lower()
-                print(f"Image Command: {command}")
-
-                if "upload" in command:
-                    self.speak("Uploading image.")
-                    self.root.after(0, self.open_image)
-                elif "camera" in command:
-                    self.speak("Opening camera.")
-                    self.root.after(0, self.init_camera_interface)
-                elif "reset" in command:
-                    self.speak("Resetting the app.")
-                    self.root.after(0, self.reset_app)
-                else:
-                    self.speak("I didn’t catch that. Please say 'upload', 'camera', or 'reset'.")
-                    self.wait_for_image_command()
-        except Exception as e:
-            print(f"Error while listening for image command: {e}")
-            self.speak("Something went wrong. Please try again.")
-            self.wait_for_image_command()
+        self.ask_for_command("Say 'upload' to choose an image or 'camera' to take a photo.",
+                             IMAGE_INTENTS,
+                             "I didn’t catch that. Please say 'upload', 'camera', or 'reset'.")
+
+    def ask_for_filter(self, prompt):
+        # Scheduled on the Tk thread after an image arrives; listening happens off it
+        if getattr(self, 'is_mic_on', False):
+            threading.Thread(target=self.wait_for_filter_command, args=(prompt,), daemon=True).start()
+
+    def wait_for_filter_command(self, prompt):
+        self.ask_for_command(prompt, FILTER_INTENTS,
+                             "I didn’t catch a filter name. Say cartoon, sketch, winx or clone.")
 
     def return_to_main_with_image(self):
         self.init_main_interface()
-        self.show_image(self.original_image, is_original=True)
+        self.clear_filter_display()  # The result shown was for the previous image
+        self.show_image(self.preview_image, is_original=True)
         self.save_button.config(state='normal')
         self.share_button.config(state='normal')
         self.analyze_face()
 
         if getattr(self, 'is_mic_on', False):
         # Delay voice prompt to allow image to render first
-            self.root.after(800, lambda: self.speak("Image uploaded. Which filter would you like to apply? Choose between cartoon, sketch, winx, or clone."))
-            self.root.after(3000, self.ask_for_filter) 
+            self.root.after(800, lambda: self.ask_for_filter("Image uploaded. Which filter would you like to apply? Choose between cartoon, sketch, winx, or clone."))
 
 
     def release_camera(self):
-        # Release the webcam resources
-        if hasattr(self, 'cap') and self.cap and self.cap.isOpened():
-            self.cap.release()
-            self.cap = None
+        # Stop the capture thread, which releases the webcam
+        if self.camera_stream is not None:
+            self.camera_stream.stop()
+            self.camera_stream = None
 
     def open_image(self):
         file_path = filedialog.askopenfilename()
         if file_path:
-            image = cv2.imread(file_path)
-            self.original_image = image
-            self.show_image(image, is_original=True)
-            self.save_button.config(state='normal')
-            self.share_button.config(state='normal')
-            # Analyze the face for beauty rating
-            self.analyze_face()
+            try:
+                data = image_io.read_file(file_path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not open the image:\n{e}")
+                return
+            # Thumbnail or reduced decode first, so the panel fills in at once.
+            # Without one, the loader's full decode is the first and only one
+            with trace.span("image.preview_decode"):
+                preview = image_io.decode_preview(data, PANEL_SIZE)
+            self.set_original_image(None)
+            if preview is not None:
+                self.show_image(preview, is_original=True)
+            self.poll_image_load(self.image_loader.load(data))
+
+    def poll_image_load(self, future):
+        # Runs on the Tk thread: swap in the full decode once it is ready
+        if future is not self.image_loader.current:
+            return  # Superseded by another image or a camera capture
+        if not future.done():
+            self.root.after(30, lambda: self.poll_image_load(future))
+            return
+        image = future.result()
+        if image is None:
+            messagebox.showerror("Error", "Could not read the image.")
+            return
+        self.set_original_image(image)
+        self.show_image(self.preview_image, is_original=True)
+        self.save_button.config(state='normal')
+        self.share_button.config(state='normal')
+        # Analyze the face for beauty rating
+        self.analyze_face()
 
 
-            if getattr(self, 'is_mic_on', False):
-        # Delay voice prompt to allow image to render first
-                self.root.after(800, lambda: self.speak("Image uploaded. Which filter would you like to apply?"))
-                self.root.after(3000, self.ask_for_filter) 
+        if getattr(self, 'is_mic_on', False):
+    # Delay voice prompt to allow image to render first
+            self.root.after(800, lambda: self.ask_for_filter("Image uploaded. Which filter would you like to apply?"))
              #.................ESTIMATE AGE..........................
 
     def estimate_age(self):
@@ -684,12 +899,10 @@ class CartoonifyApp:
             print("No image loaded.")
             return
 
-        # Convert PIL image to OpenCV format
-        cv_image = cv2.cvtColor(np.array(self.original_image), cv2.COLOR_RGB2BGR)
+        cv_image = self.original_image
 
-        # Detect faces
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        # Faces are detected once per image and kept for the next estimate
+        faces = self.artifacts.faces_at(face_detection.AGE_SCALE_FACTOR)
         if getattr(self, 'is_mic_on', False):
             self.speak("Estimating age from the image.")
         if len(faces) == 0:
@@ -729,8 +942,9 @@ class CartoonifyApp:
         if self.original_image is None:
             return
         
-        gray = cv2.cvtColor(self.original_image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        gray = self.artifacts.gray
+        # The rating's own, coarser scale step: it finds the main face first
+        faces = self.artifacts.faces_at(face_detection.RATING_SCALE_FACTOR)
         
         if getattr(self, 'is_mic_on', False):
                 self.speak("Analyzing image for quality rating")
@@ -774,107 +988,216 @@ class CartoonifyApp:
             fg=color
         )
     
+    def set_original_image(self, image):
+        # New source image: rebuild the preview proxy and drop results of the old one.
+        # Work still running for the old image must not land on the new one
+        self.preview_worker.cancel()
+        self.render_job = None
+        self.cancel_export()
+        self.image_loader.cancel()
+        self.hide_loading_bar()
+        self.original_image = image
+        self.cartoon_image = None
+        self.cartoon_preview = None
+        self.current_filter = None
+        self.image_digests = {}
+        self.clone_seed = random.randrange(2**32)
+        if image is None:
+            self.preview_image = None
+            self.preview_scale = 1.0
+            self.artifacts = None
+            self.preview_artifacts = None
+        else:
+            self.preview_image, self.preview_scale = filters.make_proxy(image, PANEL_SIZE)
+            # Grayscale, face boxes and masks are computed on first use and shared
+            self.artifacts = ImageArtifacts(image, self.face_detector)
+            self.preview_artifacts = ImageArtifacts(self.preview_image)
+
     def show_image(self, cv_img, is_original=True):
-        img_rgb = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(img_rgb)
-        img_resized = img_pil.resize((250, 250))
-        img_tk = ImageTk.PhotoImage(img_resized)
+        with trace.span("display.panel", original=is_original):
+            img_rgb = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+            img_pil = Image.fromarray(img_rgb)
+            img_resized = img_pil.resize((PANEL_SIZE, PANEL_SIZE))
+            img_tk = ImageTk.PhotoImage(img_resized)
 
         if is_original:
-            self.panel_original.configure(image=img_tk, width=250, height=250)
+            self.panel_original.configure(image=img_tk, width=PANEL_SIZE, height=PANEL_SIZE)
             self.panel_original.image = img_tk
         else:
-            self.panel_cartoon.configure(image=img_tk, width=250, height=250)
+            self.panel_cartoon.configure(image=img_tk, width=PANEL_SIZE, height=PANEL_SIZE)
             self.panel_cartoon.image = img_tk
 
-    def cartoonify_image(self):
-        if self.original_image is None:
-            messagebox.showerror("Error", "No image loaded.")
+    def highlight_filter(self, container):
+        # Highlight the selected filter button and reset the others
+        self.clear_highlights()
+        container.config(highlightbackground="#4CAF50")  # Green highlight
+
+    def clear_highlights(self):
+        for filter_container in (self.cartoon_container, self.sketch_container,
+                                 self.winx_container, self.clone_container,
+                                 *self.grade_containers.values()):
+            filter_container.config(highlightbackground="#001839")
+
+    def clear_filter_display(self):
+        self.panel_cartoon.configure(image="", width=25, height=13)
+        self.panel_cartoon.image = None
+        self.clear_highlights()
+
+    def filter_params(self, filter_name, preview=False):
+        # Parameters for filters.apply_filter, identical for preview and export
+        # apart from the clone layout scale
+        if pipeline.is_pipeline(filter_name):
+            return {name: self.filter_params(name, preview) for name in pipeline.parse(filter_name)}
+        if filter_name == "cartoon":
+            return {"quality": self.filter_quality}
+        if filter_name == "clone":
+            return {"seed": self.clone_seed, "scale": self.preview_scale if preview else 1.0}
+        return {}
+
+    def render_filter(self, filter_name, announcement=None):
+        # Render on the preview proxy; the full-resolution image waits for export.
+        # A new click supersedes whatever render is still running.
+        full_resolution = not self.preview_mode
+        source = self.original_image if full_resolution else self.preview_image
+        artifacts = self.artifacts if full_resolution else self.preview_artifacts
+        params = self.filter_params(filter_name, preview=not full_resolution)
+        key = self.cache_key(filter_name, params, full_resolution)
+
+        def on_done(result):
+            self.filter_cache.put(key, result)
+            self.show_filter_result(result, filter_name, full_resolution=full_resolution)
+            if announcement and getattr(self, 'is_mic_on', False):
+                self.speak(announcement, topic="filter")
+
+        cached = self.filter_cache.get(key)
+        if cached is not None:
+            # Already rendered for this image: only the display needs updating
+            self.preview_worker.cancel()
+            self.render_job = None
+            if self.export_job is None:
+                self.hide_loading_bar()
+            on_done(cached)
+            return
+
+        self.render_job = self.preview_worker.submit(filter_name, source, params,
+                                                     artifacts=artifacts)
+        self.show_loading_bar()
+        self.poll_render(self.render_job, on_done)
+
+    def poll_render(self, job, on_done):
+        # Runs on the Tk thread: mirror the worker's stage progress until it finishes
+        if job.cancelled or job not in (self.render_job, self.export_job):
+            return  # Superseded by another click, or the image changed
+        self.progress_bar['value'] = job.progress * 100
+        if not job.future.done():
+            self.root.after(30, lambda: self.poll_render(job, on_done))
+            return
+        if job is self.render_job:
+            self.render_job = None
+        else:
+            self.export_job = None
+            self.set_export_buttons('normal')
+        if self.render_job is None and self.export_job is None:
+            self.hide_loading_bar()
+        try:
+            result = job.future.result()
+        except filters.RenderCancelled:
+            return
+        except Exception as e:
+            print(f"Error applying {job.filter_name} filter: {e}")
+            messagebox.showerror("Error", f"Could not apply the {job.filter_name} filter:\n{e}")
+            return
+        on_done(result)
+
+    def cache_key(self, filter_name, params, full_resolution):
+        # Hash each source image once; the original is only hashed when exported
+        which = "original" if full_resolution else "preview"
+        if which not in self.image_digests:
+            source = self.original_image if full_resolution else self.preview_image
+            self.image_digests[which] = image_digest(source)
+        return make_key(self.image_digests[which], filter_name, params)
+
+    def render_full_resolution(self, on_done):
+        # Render the current filter on original_image in the background if only
+        # the preview exists yet, then call on_done(image) on the Tk thread
+        if self.cartoon_image is not None:
+            on_done(self.cartoon_image)
+            return
+        if not self.current_filter or self.original_image is None:
+            return
+        filter_name = self.current_filter
+        params = self.filter_params(filter_name)
+        source = self.original_image
+        key = self.cache_key(filter_name, params, full_resolution=True)
+        cached = self.filter_cache.get(key)
+        if cached is not None:
+            self.cartoon_image = cached
+            on_done(cached)
             return
 
-        # Highlight the selected filter button
-        self.cartoon_container.config(highlightbackground="#4CAF50")  # Green highlight
-        self.sketch_container.config(highlightbackground="#001839")   # Reset sketch button
-        self.winx_container.config(highlightbackground="#001839")     # Reset winx button
-        self.clone_container.config(highlightbackground="#001839")     # Reset clone button
-
-        img = self.original_image.copy()
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray_blur = cv2.medianBlur(gray, 5)
-        edges = cv2.adaptiveThreshold(gray_blur, 255,
-                                      cv2.ADAPTIVE_THRESH_MEAN_C,
-                                      cv2.THRESH_BINARY, blockSize=9, C=2)
-        color = cv2.bilateralFilter(img, d=9, sigmaColor=250, sigmaSpace=250)
-        cartoon = cv2.bitwise_and(color, color, mask=edges)
+        def store(result):
+            self.filter_cache.put(key, result)
+            # Ignore the result if the user moved on to another filter or image
+            if (self.current_filter == filter_name and self.original_image is source
+                    and self.filter_params(filter_name) == params):
+                self.cartoon_image = result
+            on_done(result)
+
+        # A newer save or share supersedes an export still running
+        self.export_job = self.export_worker.submit(filter_name, source, params,
+                                                    artifacts=self.artifacts,
+                                                    tile_budget=EXPORT_TILE_BUDGET)
+        self.set_export_buttons('disabled')
+        self.show_loading_bar()
+        self.poll_render(self.export_job, store)
 
-        if getattr(self, 'is_mic_on', False):
-                self.speak("cartoon filter applied! You can now save or share your cartoon image.")
-        self.cartoon_image = cartoon
-        self.current_filter = "cartoon"
-        self.show_image(cartoon, is_original=False)
+    def cancel_export(self):
+        if self.export_job is None:
+            return
+        self.export_worker.cancel()
+        self.export_job = None
+        self.set_export_buttons('normal')
+        if self.render_job is None:
+            self.hide_loading_bar()
+
+    def set_export_buttons(self, state):
+        # Save and Share stay disabled while a full-resolution render is running
+        for button in (self.save_button, self.share_button):
+            if button.winfo_exists():
+                button.config(state=state)
+
+    def show_filter_result(self, result, filter_name, full_resolution=True):
+        self.cartoon_preview = result
+        self.cartoon_image = result if full_resolution else None
+        self.cartoon_image_path = ""  # Any earlier saved file shows a different result
+        self.current_filter = filter_name
+        self.show_image(result, is_original=False)
         self.save_button.config(state='normal')
         self.share_button.config(state='normal')
 
-    def sketch_filter(self):
+    def cartoonify_image(self):
         if self.original_image is None:
             messagebox.showerror("Error", "No image loaded.")
             return
 
-        # Highlight the selected filter button
-        self.sketch_container.config(highlightbackground="#4CAF50")   # Green highlight
-        self.cartoon_container.config(highlightbackground="#001839")  # Reset cartoon button
-        self.winx_container.config(highlightbackground="#001839")     # Reset winx button
-        self.clone_container.config(highlightbackground="#001839")     # Reset clone button
+        self.highlight_filter(self.cartoon_container)
+        self.render_filter("cartoon", announcement="cartoon filter applied! You can now save or share your cartoon image.")
 
-        img_gray = cv2.cvtColor(self.original_image.copy(), cv2.COLOR_BGR2GRAY)
-        sketch = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                    cv2.THRESH_BINARY, 9, 10)
-        sketch_bgr = cv2.cvtColor(sketch, cv2.COLOR_GRAY2BGR)
+    def sketch_filter(self):
+        if self.original_image is None:
+            messagebox.showerror("Error", "No image loaded.")
+            return
 
-        if getattr(self, 'is_mic_on', False):
-                self.speak("Sketch filter applied! You can now save or share your sketch image.")
-        self.cartoon_image = sketch_bgr
-        self.current_filter = "sketch"
-        self.show_image(sketch_bgr, is_original=False)
-        self.save_button.config(state='normal')
-        self.share_button.config(state='normal')
+        self.highlight_filter(self.sketch_container)
+        self.render_filter("sketch", announcement="Sketch filter applied! You can now save or share your sketch image.")
     
     def winxclub_filter(self):
         if self.original_image is None:
             messagebox.showerror("Error", "No image loaded.")
             return
 
-        # Highlight the selected filter button
-        self.winx_container.config(highlightbackground="#4CAF50")     # Green highlight
-        self.cartoon_container.config(highlightbackground="#001839")  # Reset cartoon button
-        self.sketch_container.config(highlightbackground="#001839")   # Reset sketch button
-        self.clone_container.config(highlightbackground="#001839")     # Reset clone button
-
-        # Convert to RGB if it's a NumPy array (OpenCV format)
-        if isinstance(self.original_image, np.ndarray):
-            img = self.original_image.copy()
-        else:
-            img = np.array(self.original_image)
-
-        # Apply a Winx-style dreamy effect using HSV adjustments
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        h, s, v = cv2.split(hsv)
-
-        # Boost saturation and value slightly
-        s = cv2.add(s, 30)
-        v = cv2.add(v, 20)
-
-        hsv_modified = cv2.merge([h, s, v])
-        winx_img = cv2.cvtColor(hsv_modified, cv2.COLOR_HSV2BGR)
-
-        if getattr(self, 'is_mic_on', False):
-                self.speak("Winxclub filter applied! You can now save or share your winxclub image.")
-        # Display the result
-        self.cartoon_image = winx_img
-        self.current_filter = "winxclub"
-        self.show_image(winx_img, is_original=False)
-        self.save_button.config(state='normal')
-        self.share_button.config(state='normal')
+        self.highlight_filter(self.winx_container)
+        self.render_filter("winxclub", announcement="Winxclub filter applied! You can now save or share your winxclub image.")
 
     def clone_filter(self):
         """Apply clone filter effect with multiple copies of the person"""
@@ -883,244 +1206,157 @@ class CartoonifyApp:
             return
         
         try:
-            # Highlight the selected filter button
-            self.clone_container.config(highlightbackground="#4CAF50")     # Green highlight
-            self.cartoon_container.config(highlightbackground="#001839")  # Reset cartoon button
-            self.sketch_container.config(highlightbackground="#001839")   # Reset sketch button
-            self.winx_container.config(highlightbackground="#001839")     # Reset winx button
-            
-            # Convert PIL to OpenCV format
-            if isinstance(self.original_image, np.ndarray):
-                cv_image = self.original_image.copy()
-            else:
-                cv_image = cv2.cvtColor(np.array(self.original_image), cv2.COLOR_RGB2BGR)
-            
-            height, width = cv_image.shape[:2]
-            
-            # Create a larger canvas to fit multiple clones
-            canvas_width = int(width * 1.3)
-            canvas_height = int(height * 1.1)
-            canvas = np.zeros((canvas_height, canvas_width, 3), dtype=np.uint8)
-            
-            # Fill canvas with a simple background color (you can modify this)
-            canvas[:] = [20, 20, 40]  # Dark blue background
-            
-            # Use simple background subtraction for person detection
-            # Convert to grayscale for processing
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            
-            # Create a simple mask by assuming the person is in the center area
-            # This is a simplified approach - for better results, you'd use ML models
-            mask = np.zeros(gray.shape, dtype=np.uint8)
-            
-            # Create a rough person mask using edge detection and morphology
-            edges = cv2.Canny(gray, 50, 150)
-            
-            # Use morphological operations to create a person-like shape
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-            edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
-            edges = cv2.morphologyEx(edges, cv2.MORPH_DILATE, kernel, iterations=3)
-            
-            # Find the largest contour (assuming it's the person)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            if contours:
-                # Get the largest contour
-                largest_contour = max(contours, key=cv2.contourArea)
-                
-                # Create mask from the largest contour
-                cv2.fillPoly(mask, [largest_contour], 255)
-                
-                # Smooth the mask
-                mask = cv2.GaussianBlur(mask, (5, 5), 0)
-            else:
-                # Fallback: use center region as person
-                center_x, center_y = width // 2, height // 2
-                cv2.ellipse(mask, (center_x, center_y), (width//3, height//2), 0, 0, 360, 255, -1)
-            
-            # Extract the person using the mask
-            person_masked = cv_image.copy()
-            mask_3channel = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR) / 255.0
-            person_masked = (person_masked * mask_3channel).astype(np.uint8)
-            
-            # Define positions for clones
-            clone_positions = [
-                (canvas_width//2 - width//2, canvas_height//2 - height//2),  # Center (original)
-                (50, canvas_height//2 - height//2),                         # Left
-                (canvas_width - width - 50, canvas_height//2 - height//2),  # Right
-            ]
-            
-            # Add some variation to clone positions
-            if canvas_height > height + 100:
-                clone_positions.extend([
-                    (canvas_width//4 - width//4, 20),                       # Top left
-                    (3*canvas_width//4 - width//4, 20),                     # Top right
-                ])
-            
-            # Place clones on canvas
-            for i, (x, y) in enumerate(clone_positions):
-                if x >= 0 and y >= 0 and x + width <= canvas_width and y + height <= canvas_height:
-                    
-                    # Create a slight variation for each clone
-                    clone_img = person_masked.copy()
-                    current_mask = mask.copy()  # Keep track of current mask
-                    
-                    if i > 0:  # Don't modify the center/original
-                        # Add slight color variations
-                        hsv = cv2.cvtColor(clone_img, cv2.COLOR_BGR2HSV)
-                        
-                        # Vary hue slightly
-                        hue_shift = random.randint(-20, 20)
-                        hsv[:, :, 0] = cv2.add(hsv[:, :, 0], hue_shift)
-                        
-                        # Vary saturation
-                        sat_mult = random.uniform(0.8, 1.2)
-                        hsv[:, :, 1] = cv2.multiply(hsv[:, :, 1], sat_mult)
-                        
-                        clone_img = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-                        
-                        # Slightly scale some clones
-                        if i % 2 == 0:
-                            scale_factor = random.uniform(0.9, 1.1)
-                            new_width = int(width * scale_factor)
-                            new_height = int(height * scale_factor)
-                            
-                            # Resize both the image and mask together
-                            clone_img = cv2.resize(clone_img, (new_width, new_height))
-                            current_mask = cv2.resize(current_mask, (new_width, new_height))
-                            
-                            # Adjust position to center the scaled clone
-                            x_offset = (width - new_width) // 2
-                            y_offset = (height - new_height) // 2
-                            x += x_offset
-                            y += y_offset
-                            
-                            # Update dimensions for placement
-                            width_to_use = new_width
-                            height_to_use = new_height
-                        else:
-                            width_to_use = width
-                            height_to_use = height
-                    else:
-                        width_to_use = width
-                        height_to_use = height
-                    
-                    # Ensure clone fits in canvas - fix boundary checking
-                    if x < 0:
-                        x = 0
-                    if y < 0:
-                        y = 0
-                        
-                    end_x = min(canvas_width, x + width_to_use)
-                    end_y = min(canvas_height, y + height_to_use)
-                    
-                    # Calculate actual dimensions that will fit
-                    actual_width = end_x - x
-                    actual_height = end_y - y
-                    
-                    if actual_width > 0 and actual_height > 0:
-                        # Get the regions that match in size
-                        canvas_region = canvas[y:end_y, x:end_x]
-                        clone_region = clone_img[:actual_height, :actual_width]
-                        mask_region = current_mask[:actual_height, :actual_width]
-                        
-                        # Ensure all regions have the same shape
-                        if (canvas_region.shape[:2] == clone_region.shape[:2] == mask_region.shape and
-                            canvas_region.shape[2] == clone_region.shape[2] == 3):
-                            
-                            # Create alpha mask for smooth blending
-                            clone_mask_3d = cv2.cvtColor(mask_region, cv2.COLOR_GRAY2BGR) / 255.0
-                            
-                            # Ensure mask dimensions match
-                            if clone_mask_3d.shape == canvas_region.shape:
-                                blended = canvas_region * (1 - clone_mask_3d) + clone_region * clone_mask_3d
-                                canvas[y:end_y, x:end_x] = blended.astype(np.uint8)
-                            else:
-                                print(f"Shape mismatch in blending: canvas {canvas_region.shape}, mask {clone_mask_3d.shape}")
-                        else:
-                            print(f"Shape mismatch: canvas {canvas_region.shape}, clone {clone_region.shape}, mask {mask_region.shape}")
-            if getattr(self, 'is_mic_on', False):
-                self.speak("Clone filter applied! You can now save or share your cloned image.")
-            # Store the result and display using your existing method
-            self.cartoon_image = canvas
-            self.current_filter = "clone"
-            self.show_image(canvas, is_original=False)
-            
-            # Enable save and share buttons
-            if hasattr(self, 'save_button'):
-                self.save_button.config(state='normal')
-            if hasattr(self, 'share_button'):
-                self.share_button.config(state='normal')
-                
-            print("Clone filter applied successfully!")
+            self.highlight_filter(self.clone_container)
+            self.render_filter("clone", announcement="Clone filter applied! You can now save or share your cloned image.")
             
         except Exception as e:
             print(f"Error applying clone filter: {e}")
             import traceback
             traceback.print_exc()
 
-    def save_image(self):
-        if self.cartoon_image is not None:
+    def grade_filter(self, filter_name):
+        if self.original_image is None:
+            messagebox.showerror("Error", "No image loaded.")
+            return
+
+        self.highlight_filter(self.grade_containers[filter_name])
+        self.render_filter(filter_name, announcement=f"{filter_name.capitalize()} look applied! "
+                                                     "You can now save or share your image.")
+
+    def chain_filter(self, filter_name, container):
+        # Shift-click: run filter_name on top of the current effect as one pipeline
+        if self.original_image is None:
+            messagebox.showerror("Error", "No image loaded.")
+            return
+        spec = filter_name
+        if self.current_filter:
+            spec = f"{self.current_filter}{pipeline.SEPARATOR}{filter_name}"
+        # Keep the earlier filters highlighted too
+        container.config(highlightbackground="#4CAF50")
+        self.render_filter(spec)
+
+    def save_image(self, on_saved=None):
+        if self.current_filter is not None:
             file_path = filedialog.asksaveasfilename(defaultextension=".png",
                                                     filetypes=[("PNG files", "*.png"), ("All files", "*.*")])
-            if file_path:
-                cv2.imwrite(file_path, self.cartoon_image)
+            if not file_path:
+                return  # User cancelled save
+
+            def write(image):
+                with trace.span("image.encode"):
+                    saved = image_io.save_image(file_path, image)
+                if not saved:
+                    messagebox.showerror("Error", f"Could not save the image to {file_path}")
+                    return
                 self.cartoon_image_path = file_path  # Store the path for sharing
                 messagebox.showinfo("Saved", "Image saved successfully!")
-            
-            if getattr(self, 'is_mic_on', False):  # This safely checks if mic is on
-                self.speak("Image saved successfully! You can now share it on social media or via email.")  
-
-    def upload_to_gofile(self, file_path):
-        try:
-            # Get upload servers
-            server_res = requests.get("https://api.gofile.io/servers")
-            if server_res.status_code != 200:
-                raise Exception(f"Failed to get server: {server_res.status_code}")
-
-            server_data = server_res.json()
-            servers = server_data.get("data", {}).get("servers", [])
-            server = servers[0]["name"] if servers else None
-            if not server:
-                raise Exception("No server available from GoFile")
-
-            # Upload image
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                upload_res = requests.post(f"https://{server}.gofile.io/uploadFile", files=files)
+                if getattr(self, 'is_mic_on', False):  # This safely checks if mic is on
+                    self.speak("Image saved successfully! You can now share it on social media or via email.")
+                if on_saved:
+                    on_saved()
+
+            # Full-resolution render happens here, not when the filter was clicked
+            self.render_full_resolution(write)
+
+    def cartoonify_video(self):
+        # Runs the current filter (cartoon if none yet) over every frame of a clip
+        input_path = filedialog.askopenfilename(
+            filetypes=[("Video files", "*.mp4 *.avi *.mov *.mkv *.m4v"), ("All files", "*.*")])
+        if not input_path:
+            return
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".mp4", filetypes=[("MP4 video", "*.mp4"), ("AVI video", "*.avi")])
+        if not output_path:
+            return
+        if self.video_pipeline is not None:
+            self.video_pipeline.cancel()
 
-            if upload_res.status_code != 200 or not upload_res.content:
-                raise Exception("Empty or bad response from upload endpoint")
+        filter_name = self.current_filter or "cartoon"
+        # Leave a core for the Tk loop
+        video = VideoPipeline(input_path, output_path, filter_name, self.filter_params(filter_name),
+                              workers=max(1, (os.cpu_count() or 2) - 1))
+        self.video_pipeline = video
+        outcome = {}
 
+        def run():
             try:
-                upload_data = upload_res.json()
-            except ValueError:
-                raise Exception("Could not decode upload response (not valid JSON)")
+                outcome["stats"] = video.run()
+            except Exception as e:
+                outcome["error"] = e
 
-            if upload_data.get("status") != "ok":
-                raise Exception(f"Upload failed: {upload_data.get('message')}")
+        thread = threading.Thread(target=run, name="cartoonify-video", daemon=True)
+        thread.start()
+        self.show_loading_bar()
+        self.poll_video(video, thread, outcome)
 
-            download_link = upload_data['data']['downloadPage']
-            return download_link
+    def poll_video(self, video, thread, outcome):
+        # Runs on the Tk thread: progress bar while the pipeline works, then a summary
+        if video is not self.video_pipeline:
+            return
+        showing = self.progress_bar.winfo_exists()
+        if thread.is_alive():
+            if showing:
+                self.progress_bar['value'] = video.progress * 100
+            self.root.after(200, lambda: self.poll_video(video, thread, outcome))
+            return
+        self.video_pipeline = None
+        if showing:
+            self.hide_loading_bar()
+        if "error" in outcome:
+            messagebox.showerror("Error", f"Could not cartoonify the video:\n{outcome['error']}")
+            return
+        stats = outcome["stats"]
+        print(f"Video: {format_stats(stats, video.total_frames, video.queue_size)}")
+        messagebox.showinfo("Video saved", f"Saved {stats['frames_written']} frames to {video.output_path} "
+                                           f"({stats['fps']:.1f} frames per second).")
+        if getattr(self, 'is_mic_on', False):
+            self.speak("Your video is ready.")
 
-        except Exception as e:
-            messagebox.showerror("Upload Error", f"Something went wrong:\n{e}")
-            return None
+    def set_share_format(self, fmt):
+        self.share_format = fmt
 
     def open_socials_window(self):
-        if not hasattr(self, 'cartoon_image_path') or not self.cartoon_image_path or not os.path.exists(self.cartoon_image_path):
-        # If no saved file, save it first
+        if self.current_filter is None:
+            messagebox.showerror("Error", "Apply a filter before sharing.")
             if getattr(self, 'is_mic_on', False):
-                self.speak("Please save your cartoon image first.")
-            self.save_image()
-            if not hasattr(self, 'cartoon_image_path') or not self.cartoon_image_path:
-                return  # User cancelled save
-
-    # Upload to GoFile and get URL
-        self.uploaded_image_url = self.upload_to_gofile(self.cartoon_image_path)
-        if not self.uploaded_image_url:
+                self.speak("Please choose a filter first.")
             return
+        # Full-resolution result, encoded in memory and uploaded: no save dialog
+        self.render_full_resolution(self.share_image)
+
+    def share_image(self, image):
+        # Upload to GoFile in the background; the socials window opens when it is done
+        if self.upload_task is not None:
+            self.upload_task.cancel()
+        name = "cartoonify_" + self.current_filter.replace(pipeline.SEPARATOR, "+")
+        self.upload_task = self.uploader.submit_image(image, name, self.share_format)
+        self.share_button.config(state='disabled')
+        self.show_loading_bar()
+        self.poll_upload(self.upload_task)
+
+    def poll_upload(self, task):
+        # Runs on the Tk thread: progress bar while the file streams, then the result
+        if task is not self.upload_task:
+            return  # Cancelled by a newer share or a reset
+        showing = self.progress_bar.winfo_exists()
+        if not task.done():
+            if showing:
+                self.progress_bar['value'] = task.progress * 100
+            self.root.after(100, lambda: self.poll_upload(task))
+            return
+        self.upload_task = None
+        if showing:
+            self.hide_loading_bar()
+        if self.share_button.winfo_exists():
+            self.share_button.config(state='normal')
+        try:
+            self.uploaded_image_url = task.result()
+        except Exception as e:
+            messagebox.showerror("Upload Error", f"Something went wrong:\n{e}")
+            return
+        self.show_socials_window()
 
+    def show_socials_window(self):
         socials = Toplevel(self.root)
         socials.title("Share on Socials")
         socials.geometry("400x280")
@@ -1179,26 +1415,17 @@ Created with CartoonifyApp"""
             webbrowser.open(f"mailto:?subject={subject}&body={body}")
           
     def reset_app(self):
-        self.original_image = None
-        self.cartoon_image = None
-        self.current_filter = None
+        if self.upload_task is not None:
+            self.upload_task.cancel()
+            self.upload_task = None
+        self.set_original_image(None)
         self.cartoon_image_path = ""
         self.uploaded_image_url = ""
 
-    # Clear image displays
+    # Clear image displays and filter button highlights
         self.panel_original.configure(image="", width=25, height=13)
-        self.panel_cartoon.configure(image="", width=25, height=13)
-    
-    # Reset image references
-        if hasattr(self.panel_original, 'image'):
-            self.panel_original.image = None
-        if hasattr(self.panel_cartoon, 'image'):
-            self.panel_cartoon.image = None
-        
-    # Reset filter button highlights - make them invisible again
-        self.cartoon_container.config(highlightbackground="#001839")
-        self.sketch_container.config(highlightbackground="#001839")
-        self.winx_container.config(highlightbackground="#001839")
+        self.panel_original.image = None
+        self.clear_filter_display()
         
     # Disable save and share buttons
         self.save_button.config(state='disabled')
@@ -1212,6 +1439,22 @@ Created with CartoonifyApp"""
             self.speak("The app has been reset. Please upload a new image or take a photo.")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Cartoonify your photos.")
+    parser.add_argument("--camera-source", default="0",
+                        help="webcam index or a video file to use as the camera (default: %(default)s)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print where the time to the main screen went "
+                             "(or set CARTOONIFY_STARTUP_REPORT=1)")
+    args = parser.parse_args()
+    camera_source = int(args.camera_source) if args.camera_source.isdigit() else args.camera_source
+    if args.startup_report:
+        os.environ["CARTOONIFY_STARTUP_REPORT"] = "1"
+
+    # CARTOONIFY_TRACE=session.jsonl (or .prom) records stage timings
+    trace.configure_from_env()
+    startup.mark("imports")
     root = tk.Tk()
-    app = CartoonifyApp(root)
+    startup.mark("window created")
+    app = CartoonifyApp(root, camera_source=camera_source)
     root.mainloop()
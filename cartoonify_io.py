@@ -0,0 +1,237 @@
+import io
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import cartoonify_trace as trace
+
+# Image file loading. Files are read into a byte buffer and decoded with
+# cv2.imdecode, which (unlike cv2.imread on Windows) works with non-ASCII paths.
+# For a quick first look, decode_preview avoids the full decode: it uses the
+# EXIF thumbnail a camera embedded in the JPEG if one is big enough, otherwise
+# a JPEG DCT-domain reduced decode (1/2, 1/4 or 1/8 size) that skips most of
+# the inverse transform work. ImageLoader then runs the full decode off the Tk
+# thread. Other formats (and JPEGs too small to reduce) have no cheaper decode
+# than the full one, so they get no preview and are decoded only by the loader.
+
+HEADER_BYTES = 256 * 1024  # Enough for the JPEG/PNG header and the EXIF segment
+
+# Formats for sharing: extension, quality flag and default quality. Lossy
+# encodes of a filtered image are several times smaller than a lossless PNG.
+SHARE_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, 85),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, 80),
+}
+SHARE_MAX_SIDE = 2048  # Social sites downscale anything larger anyway
+
+# Largest factor first: the smallest decode that still covers the target size
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# EXIF orientation -> operations making the stored pixels upright
+_ORIENTATION_FIXES = {
+    2: (("flip", 1),),
+    3: (("rotate", cv2.ROTATE_180),),
+    4: (("flip", 0),),
+    5: (("transpose", None),),
+    6: (("rotate", cv2.ROTATE_90_CLOCKWISE),),
+    7: (("transpose", None), ("rotate", cv2.ROTATE_180)),
+    8: (("rotate", cv2.ROTATE_90_COUNTERCLOCKWISE),),
+}
+
+
+def read_file(path):
+    """Raw bytes of path as a uint8 array, ready for cv2.imdecode"""
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def decode_image(data, flags=cv2.IMREAD_COLOR):
+    """BGR image from encoded bytes, or None like cv2.imread"""
+    if data is None or data.size == 0:
+        return None
+    return cv2.imdecode(data, flags)
+
+
+def load_image(path):
+    """cv2.imread replacement that also accepts non-ASCII paths"""
+    try:
+        data = read_file(path)
+    except OSError:
+        return None
+    return decode_image(data)
+
+
+def save_image(path, image, params=()):
+    """cv2.imwrite replacement that also accepts non-ASCII paths"""
+    ok, encoded = cv2.imencode(os.path.splitext(path)[1] or ".png", image, list(params))
+    if not ok:
+        return False
+    try:
+        encoded.tofile(path)
+    except OSError:
+        return False
+    return True
+
+
+def encode_for_sharing(image, fmt="jpeg", quality=None, max_side=SHARE_MAX_SIDE):
+    """(encoded bytes, extension) of image for uploading, without touching disk
+
+    Images with a longer side than max_side are downscaled first (None keeps
+    the full size).
+    """
+    try:
+        extension, quality_flag, default_quality = SHARE_FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown share format '{fmt}'. Choose from: {', '.join(SHARE_FORMATS)}")
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(extension, image, [quality_flag, quality or default_quality])
+    if not ok:
+        raise ValueError(f"could not encode the image as {fmt}")
+    return encoded.tobytes(), extension
+
+
+def _exif_segment(head):
+    """TIFF bytes of a JPEG's EXIF APP1 segment, or None"""
+    if head[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(head) and head[pos] == 0xFF:
+        marker = head[pos + 1]
+        length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and head[pos + 4:pos + 10] == b"Exif\x00\x00":
+            return head[pos + 10:pos + 2 + length]
+        if marker == 0xDA:  # Start of scan: no more metadata
+            break
+        pos += 2 + length
+    return None
+
+
+def _ifd_entries(tiff, offset, order):
+    """{tag: raw 4-byte value field} of the IFD at offset, plus the next IFD offset"""
+    count = struct.unpack(order + "H", tiff[offset:offset + 2])[0]
+    entries = {}
+    for i in range(count):
+        start = offset + 2 + 12 * i
+        tag, kind = struct.unpack(order + "HH", tiff[start:start + 4])
+        entries[tag] = (kind, tiff[start + 8:start + 12])
+    end = offset + 2 + 12 * count
+    next_offset = struct.unpack(order + "I", tiff[end:end + 4])[0] if end + 4 <= len(tiff) else 0
+    return entries, next_offset
+
+
+def _entry_int(entry, order):
+    kind, value = entry
+    # SHORT values sit in the first two bytes of the field, LONG use all four
+    return struct.unpack(order + ("H" if kind == 3 else "I"), value[:2 if kind == 3 else 4])[0]
+
+
+def exif_info(head):
+    """(orientation, thumbnail JPEG bytes or None) from the start of a JPEG file"""
+    tiff = _exif_segment(head)
+    if not tiff or len(tiff) < 8:
+        return 1, None
+    try:
+        order = {b"II": "<", b"MM": ">"}[bytes(tiff[:2])]
+        ifd0, ifd1_offset = _ifd_entries(tiff, struct.unpack(order + "I", tiff[4:8])[0], order)
+        orientation = _entry_int(ifd0[0x0112], order) if 0x0112 in ifd0 else 1
+        if not ifd1_offset:
+            return orientation, None
+        ifd1, _ = _ifd_entries(tiff, ifd1_offset, order)
+        if 0x0201 not in ifd1 or 0x0202 not in ifd1:
+            return orientation, None
+        start = _entry_int(ifd1[0x0201], order)
+        length = _entry_int(ifd1[0x0202], order)
+        thumbnail = tiff[start:start + length]
+        return orientation, (thumbnail if len(thumbnail) == length else None)
+    except (KeyError, struct.error):
+        # Malformed EXIF is common; the caller falls back to a real decode
+        return 1, None
+
+
+def apply_orientation(image, orientation):
+    for operation, arg in _ORIENTATION_FIXES.get(orientation, ()):
+        if operation == "flip":
+            image = cv2.flip(image, arg)
+        elif operation == "rotate":
+            image = cv2.rotate(image, arg)
+        else:
+            image = cv2.transpose(image)
+    return image
+
+
+def image_size(head):
+    """(format, width, height) from the file header without decoding pixels"""
+    try:
+        with Image.open(io.BytesIO(head)) as header:
+            return header.format, header.size[0], header.size[1]
+    except (OSError, SyntaxError, ValueError):
+        return None, 0, 0
+
+
+def decode_preview(data, size):
+    """Quick BGR image whose shorter side is at least size, or None
+
+    A usable EXIF thumbnail costs the same at any megapixel count. A reduced
+    decode still reads every coefficient but skips most of the inverse DCT and
+    colour conversion: about 2.5x faster than a full decode at 1/8 size.
+    Returns None when neither applies, so the full decode is the only one.
+    """
+    head = bytes(data[:HEADER_BYTES])
+    fmt, width, height = image_size(head)
+    if fmt != "JPEG":
+        return None  # No reduced decode; OpenCV would decode in full anyway
+
+    orientation, thumbnail = exif_info(head)
+    if thumbnail is not None:
+        thumb = decode_image(np.frombuffer(thumbnail, dtype=np.uint8))
+        # A soft thumbnail is fine for the moment until the full decode replaces
+        # it, but cameras letterbox them to 4:3; only use one with the image's shape
+        if thumb is not None and min(thumb.shape[:2]) * 3 >= size:
+            if abs(thumb.shape[1] / thumb.shape[0] - width / height) < 0.02:
+                return apply_orientation(thumb, orientation)
+
+    for factor, flags in REDUCED_DECODE_FLAGS:
+        if min(width, height) // factor >= size:
+            # imdecode applies the EXIF orientation for reduced decodes too
+            return decode_image(data, flags)
+    return None
+
+
+class ImageLoader:
+    """Full-resolution decodes on a background thread, newest request first"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cartoonify-decode")
+        self.current = None
+
+    def load(self, data):
+        """Future for the full decode of data; an older pending load is dropped"""
+        if self.current is not None:
+            self.current.cancel()
+        self.current = self.executor.submit(self._decode, data)
+        return self.current
+
+    @staticmethod
+    def _decode(data):
+        with trace.span("image.decode", bytes=int(data.size)):
+            return decode_image(data)
+
+    def cancel(self):
+        # The pending decode's result will be ignored by whoever polls it
+        if self.current is not None:
+            self.current.cancel()
+            self.current = None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
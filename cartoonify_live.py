@@ -0,0 +1,291 @@
+import argparse
+import collections
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+import cartoonify_filters as filters
+import cartoonify_trace as trace
+from cartoonify_faces import FaceDetector
+
+# Live filtered preview for the camera screen. The processor holds a target
+# frame rate by dropping frames that arrive before the next frame is due, and
+# by stepping down a ladder of processing resolutions and quality tiers when a
+# frame misses its deadline (and back up once there is headroom again).
+# LivePreviewWorker runs the processor on its own thread with room for one
+# frame, so a slow frame delays the preview, never the Tk event loop.
+#
+# With a FaceDetector the processor also follows faces from frame to frame
+# (full detection every few frames, template tracking in between) and outlines
+# them on the preview as a framing guide for the photo about to be taken.
+
+# (processing scale, cartoon quality tier), best first
+QUALITY_LADDER = (
+    (1.0, "exact"),
+    (1.0, "balanced"),
+    (0.75, "balanced"),
+    (0.5, "fast"),
+    (0.35, "fast"),
+    (0.25, "fast"),
+)
+
+
+FACE_BOX_COLOR = (80, 175, 76)  # BGR of the app's green highlight
+LIVE_FACE_DETECT_SIZE = 320     # Detection size for preview frames; faces there fill the frame
+
+
+def live_face_detector():
+    """FaceDetector sized for preview frames; give each stream its own (it keeps tracks)"""
+    return FaceDetector(detect_size=LIVE_FACE_DETECT_SIZE)
+
+
+class FrameRateMeter:
+    """Achieved frame rate and per-frame latency over a sliding window"""
+
+    def __init__(self, window=30):
+        self.timestamps = collections.deque(maxlen=window)
+        self.latencies = collections.deque(maxlen=window)
+
+    def record(self, timestamp, latency):
+        self.timestamps.append(timestamp)
+        self.latencies.append(latency)
+
+    @property
+    def fps(self):
+        if len(self.timestamps) < 2:
+            return 0.0
+        elapsed = self.timestamps[-1] - self.timestamps[0]
+        return (len(self.timestamps) - 1) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def mean_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def max_latency(self):
+        return max(self.latencies) if self.latencies else 0.0
+
+
+class LivePreviewProcessor:
+    """Applies a filter to camera frames within a per-frame time budget"""
+
+    def __init__(self, filter_name=None, target_fps=15, recover_after=15, clock=time.perf_counter,
+                 face_detector=None):
+        self.filter_name = filter_name
+        self.face_detector = face_detector  # cartoonify_faces.FaceDetector, tracked per frame
+        self.faces = ()
+        self.target_fps = target_fps
+        self.recover_after = recover_after  # Fast frames needed before stepping quality back up
+        self.clock = clock
+        self.level = 0
+        self.fast_streak = 0
+        self.next_due = 0.0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.deadline_misses = 0
+        self.meter = FrameRateMeter()
+
+    @property
+    def frame_interval(self):
+        return 1.0 / self.target_fps
+
+    def reset_tracking(self):
+        # Faces from an earlier stream would be tracked into the new one
+        self.faces = ()
+        if self.face_detector is not None:
+            self.face_detector.reset_tracking()
+
+    def set_filter(self, filter_name):
+        # A new effect starts again from the best quality
+        self.filter_name = filter_name
+        self.level = 0
+        self.fast_streak = 0
+
+    def should_process(self, now=None):
+        """False if a frame arriving now should be dropped to hold the target rate"""
+        now = self.clock() if now is None else now
+        if now < self.next_due:
+            self.frames_dropped += 1
+            return False
+        # Stay on the original schedule unless we have fallen a whole frame behind
+        self.next_due = max(self.next_due + self.frame_interval, now)
+        return True
+
+    def process(self, frame):
+        """Filter a frame at the current quality level; returns the frame to display"""
+        start = self.clock()
+        if self.face_detector is not None:
+            self.faces = self.face_detector.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        if self.filter_name:
+            with trace.span("live.frame", level=self.level):
+                result = self._render(frame)
+        else:
+            result = frame.copy()  # The camera's frame is shared; draw on a copy
+        if len(self.faces) and result.shape == frame.shape:
+            # Clone renders on a wider canvas where the boxes would not line up
+            for x, y, w, h in self.faces:
+                cv2.rectangle(result, (int(x), int(y)), (int(x + w), int(y + h)), FACE_BOX_COLOR, 2)
+        end = self.clock()
+        self._adapt(end - start)
+        self.frames_processed += 1
+        self.meter.record(end, end - start)
+        return result
+
+    def _render(self, frame):
+        scale, quality = QUALITY_LADDER[self.level]
+        height, width = frame.shape[:2]
+        small = frame
+        if scale < 1.0:
+            small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        params = {}
+        if self.filter_name == "cartoon":
+            params["quality"] = quality
+        elif self.filter_name == "clone":
+            params.update(seed=0, scale=scale)  # Keep clones from jumping around between frames
+        result = filters.apply_filter(self.filter_name, small, **params)
+        if scale < 1.0:
+            result_height, result_width = result.shape[:2]
+            result = cv2.resize(result, (int(result_width / scale), int(result_height / scale)),
+                                interpolation=cv2.INTER_LINEAR)
+        return result
+
+    def _adapt(self, latency):
+        budget = self.frame_interval
+        if latency > budget:
+            self.deadline_misses += 1
+            self.fast_streak = 0
+            if self.level < len(QUALITY_LADDER) - 1:
+                self.level += 1
+        elif latency < 0.5 * budget:
+            self.fast_streak += 1
+            if self.fast_streak >= self.recover_after and self.level > 0:
+                self.level -= 1
+                self.fast_streak = 0
+        else:
+            self.fast_streak = 0
+
+    def delay_until_next_ms(self, now=None):
+        """Milliseconds until the next frame is due, for root.after scheduling"""
+        now = self.clock() if now is None else now
+        return max(1, int((self.next_due - now) * 1000))
+
+    def stats(self):
+        scale, quality = QUALITY_LADDER[self.level]
+        return {
+            "fps": self.meter.fps,
+            "target_fps": self.target_fps,
+            "mean_latency_ms": self.meter.mean_latency * 1000,
+            "max_latency_ms": self.meter.max_latency * 1000,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "deadline_misses": self.deadline_misses,
+            "scale": scale,
+            "quality": quality,
+            "faces": len(self.faces),
+        }
+
+    def stats_text(self):
+        stats = self.stats()
+        return (f"{stats['fps']:.1f}/{stats['target_fps']} fps  "
+                f"{stats['mean_latency_ms']:.0f} ms/frame  "
+                f"scale {stats['scale']:.2f}  dropped {stats['frames_dropped']}"
+                + (f"  faces {stats['faces']}" if self.face_detector is not None else ""))
+
+
+class LivePreviewWorker:
+    """Runs a LivePreviewProcessor off the Tk thread, one frame at a time
+
+    offer() and take() are meant to be called from one thread (the Tk
+    thread); a frame offered while the previous one is still being
+    filtered is dropped.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cartoonify-live")
+        self.pending = None
+
+    @property
+    def busy(self):
+        return self.pending is not None and not self.pending.done()
+
+    def offer(self, frame):
+        """Start filtering frame if the worker is free and a frame is due; returns True if started"""
+        if self.busy:
+            self.processor.frames_dropped += 1
+            return False
+        if not self.processor.should_process():
+            return False
+        self.pending = self.executor.submit(self.processor.process, frame)
+        return True
+
+    def take(self):
+        """The filtered frame once it is ready (only once), otherwise None"""
+        if self.pending is None or not self.pending.done():
+            return None
+        future, self.pending = self.pending, None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Live preview error: {e}")
+            return None
+
+    def reset(self):
+        # Forget a frame still in flight, e.g. when the camera screen closes.
+        # Face tracks are cleared on the worker thread, after that frame, since
+        # the detector may still be inside update() for it
+        self.pending = None
+        self.executor.submit(self.processor.reset_tracking)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def open_source(source):
+    """VideoCapture for a camera index ("0") or a video file path"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def main(argv=None):
+    # Headless run of the live preview loop over a camera or recorded video
+    parser = argparse.ArgumentParser(description="Measure the live filtered preview without a display.")
+    parser.add_argument("source", help="camera index or video file")
+    parser.add_argument("-f", "--filter", default="cartoon", choices=sorted(filters.FILTERS))
+    parser.add_argument("--fps", type=float, default=15, help="target frame rate")
+    parser.add_argument("--frames", type=int, default=300, help="frames to read")
+    parser.add_argument("--faces", action="store_true", help="track and outline faces")
+    args = parser.parse_args(argv)
+
+    cap = open_source(args.source)
+    if not cap.isOpened():
+        print(f"Could not open {args.source}", file=sys.stderr)
+        return 1
+    processor = LivePreviewProcessor(args.filter, target_fps=args.fps,
+                                     face_detector=live_face_detector() if args.faces else None)
+    source_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30)
+    next_frame = time.perf_counter()
+    try:
+        for _ in range(args.frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if processor.should_process():
+                processor.process(frame)
+            # Pace file playback to its own frame rate so dropping behaves like a camera
+            next_frame += source_interval
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+    finally:
+        cap.release()
+
+    for key, value in processor.stats().items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import cv2
+
+import cartoonify_filters as filters
+import cartoonify_grading as grading
+import cartoonify_trace as trace
+
+# Chained effects. A pipeline spec names filters in order, separated by ">",
+# e.g. "cartoon>winxclub". compile_pipeline expands each filter into primitive
+# steps (colour conversions, per-channel lookup tables, or the filter itself)
+# and simplifies the sequence before anything runs:
+#
+#   - a conversion followed by its inverse is dropped (HSV->BGR->HSV between
+#     two HSV effects), unless the round trip goes through grayscale and so
+#     actually discards colour;
+#   - consecutive lookup tables (colour grade curves) are composed into one;
+#   - steps after the first write into buffers owned by the plan, reused in
+#     place, instead of allocating a new image per stage.
+#
+# Dropping an HSV round trip also skips its 8-bit rounding, so a fused chain
+# can differ from running the filters one after another by a level or two.
+
+SEPARATOR = ">"
+
+# Colour spaces of the primitive steps
+BGR, GRAY, HSV = "BGR", "GRAY", "HSV"
+
+_CONVERSIONS = {
+    (BGR, GRAY): (cv2.COLOR_BGR2GRAY, "grayscale"),
+    (GRAY, BGR): (cv2.COLOR_GRAY2BGR, "to_bgr"),
+    (BGR, HSV): (cv2.COLOR_BGR2HSV, "to_hsv"),
+    (HSV, BGR): (cv2.COLOR_HSV2BGR, "to_bgr"),
+}
+
+
+class Convert:
+    """cvtColor between two colour spaces"""
+
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+        self.code, self.name = _CONVERSIONS[(src, dst)]
+
+    def run(self, img, out=None, artifacts=None):
+        if self.dst == GRAY and artifacts is not None:
+            return artifacts.gray
+        return cv2.cvtColor(img, self.code, dst=out)
+
+
+class Lut:
+    """Per-channel 8-bit lookup table, applied in place when the input allows it"""
+
+    def __init__(self, lut, space, name):
+        self.lut = lut
+        self.src = self.dst = space
+        self.name = name
+
+    def run(self, img, out=None, artifacts=None):
+        return cv2.LUT(img, self.lut, dst=out)
+
+
+class Transform:
+    """3x3 colour matrix from a colour grade"""
+
+    def __init__(self, matrix, name):
+        self.matrix = matrix
+        self.src = self.dst = BGR
+        self.name = name
+
+    def run(self, img, out=None, artifacts=None):
+        return cv2.transform(img, self.matrix, dst=out)
+
+
+class Call:
+    """A whole filter that does not decompose further"""
+
+    def __init__(self, name, func, params, src=BGR, dst=BGR):
+        self.name = name
+        self.func = func
+        self.params = params
+        self.src = src
+        self.dst = dst
+
+    def run(self, img, out=None, artifacts=None):
+        if self.src == BGR:
+            return self.func(img, artifacts=artifacts, **self.params)
+        return self.func(img, **self.params)
+
+
+def _reports_own_stages(step):
+    return isinstance(step, Call) and step.name in filters.FILTER_STAGES
+
+
+def _expand(filter_name, params):
+    """Primitive steps of one filter, BGR in and BGR out"""
+    if filter_name == "sketch":
+        return [Convert(BGR, GRAY),
+                Call("adaptive_threshold", filters.sketch_threshold, {}, src=GRAY, dst=GRAY),
+                Convert(GRAY, BGR)]
+    if filter_name in filters.GRADED_FILTERS:
+        grade = grading.compile_preset(filters.GRADED_FILTERS[filter_name])
+        if grade.space == grading.HSV:
+            steps = [Convert(BGR, HSV), Convert(HSV, BGR)]
+            if grade.lut is not None:
+                steps.insert(1, Lut(grade.lut, HSV, "adjust"))
+            return steps
+        steps = []
+        if grade.matrix is not None:
+            steps.append(Transform(grade.matrix, "grade"))
+        if grade.lut is not None:
+            steps.append(Lut(grade.lut, BGR, "grade"))
+        return steps or [Call(filter_name, filters.FILTERS[filter_name], params)]
+    if filter_name not in filters.FILTERS:
+        raise ValueError(f"Unknown filter '{filter_name}'. Choose from: {', '.join(filters.FILTERS)}")
+    return [Call(filter_name, filters.FILTERS[filter_name], params)]
+
+
+def _simplify(steps):
+    result = []
+    for step in steps:
+        previous = result[-1] if result else None
+        if (isinstance(step, Convert) and isinstance(previous, Convert)
+                and (previous.src, previous.dst) == (step.dst, step.src) and previous.dst != GRAY):
+            result.pop()  # Round trip: back where we started
+        elif isinstance(step, Lut) and isinstance(previous, Lut) and previous.dst == step.src:
+            # Applying the second table to the first composes them
+            result[-1] = Lut(cv2.LUT(previous.lut, step.lut), step.dst, f"{previous.name}+{step.name}")
+        else:
+            result.append(step)
+    return result
+
+
+def is_pipeline(spec):
+    return SEPARATOR in spec
+
+
+def stages(spec, params=None):
+    """(filter name, params) of each filter in spec, which may be a single filter"""
+    params = params or {}
+    if not is_pipeline(spec):
+        parse(spec)
+        return [(spec, params)]
+    return [(name, params.get(name, {})) for name in parse(spec)]
+
+
+def stage_count(spec, params=None):
+    """Number of report_stage calls a render of spec makes"""
+    if not is_pipeline(spec):
+        return len(filters.FILTER_STAGES.get(spec, ()))
+    return compile_pipeline(spec, params).stage_count
+
+
+def parse(spec):
+    """Filter names of a pipeline spec, checked against the known filters"""
+    names = [name.strip() for name in spec.split(SEPARATOR)]
+    unknown = [name for name in names if name not in filters.FILTERS]
+    if unknown or not names:
+        raise ValueError(f"Unknown filter '{', '.join(unknown) or spec}'. "
+                         f"Choose from: {', '.join(filters.FILTERS)}")
+    return names
+
+
+class Plan:
+    """A compiled pipeline, reusable for any number of images"""
+
+    def __init__(self, spec, params=None):
+        self.spec = spec
+        self.filter_names = parse(spec)
+        params = params or {}
+        steps = []
+        for name in self.filter_names:
+            steps.extend(_expand(name, params.get(name, {})))
+        self.steps = _simplify(steps)
+
+    @property
+    def stage_count(self):
+        """Progress stages a run reports: a whole filter's own stages, one per other step"""
+        return sum(len(filters.FILTER_STAGES[step.name]) if _reports_own_stages(step) else 1
+                   for step in self.steps)
+
+    def describe(self):
+        return " -> ".join(step.name for step in self.steps)
+
+    def run(self, img, artifacts=None):
+        """Run every step on a BGR image; artifacts describe img and serve the first step only"""
+        with trace.span(f"pipeline.{self.spec}", width=img.shape[1], height=img.shape[0]):
+            if trace.enabled():
+                trace.start_stages(f"stage.{self.spec}")
+            current = img
+            owned = False  # Whether current is a plan buffer that may be overwritten
+            for index, step in enumerate(self.steps):
+                step_artifacts = artifacts if index == 0 else None
+                # Table lookups and same-size colour conversions work element-wise,
+                # so they can overwrite their input once it belongs to the plan
+                in_place = owned and (isinstance(step, (Lut, Transform)) or (
+                    isinstance(step, Convert) and GRAY not in (step.src, step.dst)))
+                result = step.run(current, out=current if in_place else None,
+                                  artifacts=step_artifacts)
+                # The caller's image and shared artifacts must never be written to
+                owned = result is not img and not (
+                    step_artifacts is not None and isinstance(step, Convert) and step.dst == GRAY)
+                current = result
+                if not _reports_own_stages(step):
+                    filters.report_stage(step.name)
+            return current
+
+
+def compile_pipeline(spec, params=None):
+    return Plan(spec, params)
+
+
+def stage_params(spec, filter_name, params):
+    """Params for spec that give filter_name the given parameters, wherever it appears"""
+    if not is_pipeline(spec):
+        return dict(params) if spec == filter_name else {}
+    return {filter_name: dict(params)} if filter_name in parse(spec) else {}
+
+
+def render(spec, img, artifacts=None, **params):
+    """apply_filter for a single filter name or a pipeline spec
+
+    A single filter takes its parameters as keywords, as apply_filter does. A
+    pipeline takes one keyword per filter name holding that filter's
+    parameters, e.g. render("cartoon>winxclub", img, cartoon={"quality": "fast"}).
+    """
+    if not is_pipeline(spec):
+        return filters.apply_filter(spec, img, artifacts=artifacts, **params)
+    return compile_pipeline(spec, params).run(img, artifacts=artifacts)
@@ -0,0 +1,168 @@
+import hashlib
+import itertools
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import cartoonify_startup as startup
+import cartoonify_trace as trace
+
+# Imported on the speech thread when it starts, not when this module loads
+pyttsx3 = startup.lazy_import("pyttsx3")
+
+try:
+    import winsound
+except ImportError:  # Not on Windows: cached phrases are spoken live instead
+    winsound = None
+
+# Spoken prompts, off the Tk thread. One worker thread owns the pyttsx3
+# engine (engines are not thread-safe) and speaks prompts from a priority
+# queue, so say() returns immediately wherever it is called from.
+#
+# Prompts are coalesced by topic: a newer prompt on the same topic (by default
+# the same text) supersedes any older one still waiting, and a prompt still
+# waiting after its max_age is dropped, so a burst of filter clicks announces
+# only the last filter instead of queueing a minute of speech.
+#
+# Phrases the app repeats are rendered to WAV files once, with the engine's
+# save_to_file, and played from the cache after that. A cache entry is keyed
+# by the phrase and the voice, and survives restarts. Rendering happens when
+# the queue is idle; playback needs winsound (Windows), elsewhere every phrase
+# is spoken live.
+
+URGENT, NORMAL, LOW = 0, 1, 2  # Priorities: lower is spoken first
+DEFAULT_MAX_AGE = 10.0         # Seconds a prompt may wait before it is stale
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "cartoonify-speech")
+
+
+class Prompt:
+    def __init__(self, text, priority, topic, max_age):
+        self.text = text
+        self.priority = priority
+        self.topic = topic if topic is not None else text
+        self.expires = time.monotonic() + max_age if max_age else None
+        self.done = threading.Event()  # Set once spoken or dropped
+        self.spoken = False
+
+
+class SpeechQueue:
+    """Text-to-speech worker with prompt coalescing and a rendered phrase cache"""
+
+    def __init__(self, configure=None, phrases=(), cache_dir=CACHE_DIR):
+        """configure(engine) runs on the worker thread, e.g. to pick a voice;
+        phrases are rendered into the cache in idle time"""
+        self.configure = configure
+        self.cache_dir = cache_dir
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.latest = {}  # topic -> sequence number of the newest prompt
+        self.to_render = list(dict.fromkeys(phrases)) if winsound is not None else []
+        self.engine = None
+        self.voice_id = ""
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="cartoonify-speech", daemon=True)
+        self.thread.start()
+
+    def say(self, text, priority=NORMAL, topic=None, max_age=DEFAULT_MAX_AGE):
+        """Queue text to be spoken; returns its Prompt (prompt.done.wait() to block)"""
+        prompt = Prompt(text, priority, topic, max_age)
+        sequence = next(self.counter)
+        with self.lock:
+            self.latest[prompt.topic] = sequence
+        self.queue.put((priority, sequence, prompt))
+        return prompt
+
+    def clear(self):
+        """Drop every prompt that has not started yet"""
+        with self.lock:
+            while True:
+                try:
+                    _, _, prompt = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if prompt is not None:
+                    self._drop(prompt)
+
+    def stop(self):
+        self.clear()
+        self.queue.put((-1, next(self.counter), None))
+
+    def _drop(self, prompt):
+        self.dropped += 1
+        prompt.done.set()
+
+    def _is_current(self, sequence, prompt):
+        if prompt.expires is not None and time.monotonic() > prompt.expires:
+            return False
+        with self.lock:
+            return self.latest.get(prompt.topic) == sequence
+
+    def _cache_path(self, text):
+        digest = hashlib.sha1(f"{self.voice_id}\0{text}".encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.cache_dir, digest + ".wav")
+
+    def _render(self, text):
+        # Written under a temporary name, so a half-rendered file is never played
+        path = self._cache_path(text)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with trace.span("speech.render"):
+            self.engine.save_to_file(text, partial)
+            self.engine.runAndWait()
+        if os.path.exists(partial):
+            os.replace(partial, path)
+
+    def _speak(self, text):
+        path = self._cache_path(text) if winsound is not None else None
+        with trace.span("speech.say", cached=bool(path and os.path.exists(path))):
+            if path and os.path.exists(path):
+                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_NODEFAULT)
+            else:
+                self.engine.say(text)
+                self.engine.runAndWait()
+                if winsound is not None:
+                    # Spoken once, so probably spoken again: render it when idle
+                    self.to_render.append(text)
+
+    def _run(self):
+        try:
+            self.engine = pyttsx3.init()
+            if self.configure is not None:
+                self.configure(self.engine)
+            self.voice_id = str(self.engine.getProperty("voice"))
+        except Exception as e:
+            # No speech at all, but nobody waiting on a prompt may hang
+            print(f"Speech unavailable: {e}")
+            while True:
+                _, _, prompt = self.queue.get()
+                if prompt is None:
+                    return
+                self._drop(prompt)
+        while True:
+            try:
+                # Render pending phrases only while nothing waits to be said
+                item = self.queue.get(timeout=None if not self.to_render else 0.05)
+            except queue.Empty:
+                try:
+                    self._render(self.to_render.pop(0))
+                except (OSError, RuntimeError) as e:
+                    print(f"Speech cache error: {e}")
+                continue
+            _, sequence, prompt = item
+            if prompt is None:
+                break
+            if not self._is_current(sequence, prompt):
+                self._drop(prompt)
+                continue
+            try:
+                self._speak(prompt.text)
+                prompt.spoken = True
+            except Exception as e:
+                print(f"Speech error: {e}")
+            finally:
+                prompt.done.set()
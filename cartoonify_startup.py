@@ -0,0 +1,158 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cartoonify_trace as trace
+
+# Cold start. The window should appear before anything slow happens, so the
+# GUI imports its heavy dependencies (OpenCV and numpy, requests, speech
+# recognition, text-to-speech) through lazy proxies that import on first use,
+# and warms the ones it will need soon on a background thread while the
+# splash is showing. Work the first screen doesn't need, like parsing the face
+# detector's cascade, is a warm-up task whose result the GUI collects later.
+#
+# Every phase is timed from the moment this module is imported, which is the
+# first thing the GUI does. The timings go to the trace sinks as
+# "startup.<phase>" records and, with CARTOONIFY_STARTUP_REPORT=1 or
+# --startup-report, are printed as a table once the main screen is up.
+
+_start = time.perf_counter()
+_marks = []  # (phase, seconds since start, thread name, duration or None)
+_lock = threading.Lock()
+_warmup = None
+
+
+def elapsed():
+    return time.perf_counter() - _start
+
+
+def mark(phase, duration=None):
+    """Record that phase has just finished (after duration seconds of its own work, if known)"""
+    now = elapsed()
+    with _lock:
+        _marks.append((phase, now, threading.current_thread().name, duration))
+    trace.emit(f"startup.{phase}", now, {"duration_ms": duration * 1000} if duration is not None else None)
+    return now
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            # import_module holds the module's import lock, so a warm-up thread
+            # and the Tk thread asking at once import it only once
+            start = time.perf_counter()
+            already = self._name in sys.modules
+            module = importlib.import_module(self._name)
+            if not already:
+                _record_import(self._name, time.perf_counter() - start)
+            self.__dict__["_module"] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__["_module"] is not None or self._name in sys.modules
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+class LazyAttribute:
+    """Stand-in for `from module import name`, resolved on first call or attribute access"""
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+
+    def resolve(self):
+        return getattr(self._module, self._name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+
+def lazy_import(module_name, name=None):
+    """LazyModule for module_name, or a LazyAttribute for one of its names"""
+    module = LazyModule(module_name)
+    return module if name is None else LazyAttribute(module, name)
+
+
+_imports = []  # (module name, seconds) of imports done through lazy proxies
+
+
+def _record_import(name, seconds):
+    with _lock:
+        _imports.append((name, seconds))
+
+
+def warm_up(phase, func, *args):
+    """Run func(*args) on the warm-up thread; returns its Future
+
+    Tasks run one after another in submission order, so submit what the user
+    is likely to need first first.
+    """
+    global _warmup
+    with _lock:
+        if _warmup is None:
+            _warmup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cartoonify-warmup")
+
+    def run():
+        start = time.perf_counter()
+        result = func(*args)
+        mark(f"warmup.{phase}", time.perf_counter() - start)
+        return result
+    return _warmup.submit(run)
+
+
+def preload(*module_names):
+    """Import modules on the warm-up thread; returns the Future of the last one"""
+    future = None
+    for name in module_names:
+        future = warm_up(f"import.{name}", importlib.import_module, name)
+    return future
+
+
+def report_requested():
+    return os.environ.get("CARTOONIFY_STARTUP_REPORT", "") not in ("", "0")
+
+
+def report():
+    """Startup timeline: phases in the order they finished, and import costs"""
+    with _lock:
+        marks = sorted(_marks, key=lambda entry: entry[1])
+        imports = list(_imports)
+    lines = ["Startup timeline (ms since launch):"]
+    previous = 0.0
+    for phase, at, thread, duration in marks:
+        # Main-thread phases show the gap since the previous one; background
+        # tasks show their own run time
+        if thread == "MainThread":
+            lines.append(f"  {at * 1000:8.1f}  +{(at - previous) * 1000:7.1f}  {phase}")
+            previous = at
+        else:
+            took = f"({duration * 1000:.1f} ms)" if duration is not None else ""
+            lines.append(f"  {at * 1000:8.1f}  {took:>9}  {phase} [{thread}]")
+    if imports:
+        lines.append("Imported on first use (ms, including dependencies):")
+        for name, seconds in sorted(imports, key=lambda entry: -entry[1]):
+            lines.append(f"  {seconds * 1000:8.1f}  {name}")
+    return "\n".join(lines)
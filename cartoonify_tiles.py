@@ -0,0 +1,177 @@
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import cartoonify_filters as filters
+import cartoonify_pipeline as pipeline
+
+# Tiled execution for images too large to filter in one piece. The image is
+# cut into tiles, each tile is filtered together with a halo of surrounding
+# pixels wide enough to cover every kernel the filter runs, and only the tile's
+# interior is copied into the output. Because every output pixel sees the same
+# neighbourhood it would see in a whole-image render, the stitched result has
+# no seams. Tile size comes from a memory budget, so peak working memory stays
+# fixed however large the image is; only the input and output are full-size.
+
+DEFAULT_TILE_BUDGET = 256 * 2**20  # Working memory for all tiles in flight
+MIN_TILE_SIDE = 256   # Keeps halo overhead small and the cartoon tiers' downsampling sane
+TILE_ALIGN = 16
+# OpenCV's vectorised HSV->BGR conversion works on each row in blocks of 64
+# pixels and rounds the leftover pixels at the end of a row slightly
+# differently. Tile columns start on that grid and end on it or at the image
+# edge, so every pixel takes the same path it takes in a whole-image render.
+ROW_BLOCK = 64
+
+# Approximate bytes of intermediate arrays per source pixel while a tile is
+# filtered, including the tile's own output
+WORKING_BYTES_PER_PIXEL = {
+    "cartoon": 16,   # gray, median, edges, bilateral + its padded copy, masked output
+    "sketch": 8,     # gray, threshold and its mean image, BGR output
+    "winxclub": 8,   # HSV image, adjusted and converted back in place
+    "warm": 6,       # Output, graded in place
+    "noir": 6,
+    "pastel": 6,
+}
+
+
+def filter_halo(filter_name, params=None):
+    """Context pixels each tile needs on every side, or None if the filter can't be tiled"""
+    params = params or {}
+    if pipeline.is_pipeline(filter_name):
+        # Each stage widens the neighbourhood the next one sees
+        halos = [filter_halo(name, stage_params)
+                 for name, stage_params in pipeline.stages(filter_name, params)]
+        return None if None in halos else sum(halos)
+    if filter_name == "cartoon":
+        # Median blur (radius 2) feeding a 9x9 adaptive threshold (radius 4)
+        edge_halo = 2 + 4
+        scale, d = filters.QUALITY_TIERS[params.get("quality", "exact")]
+        if scale == 1:
+            return max(edge_halo, 9 // 2)
+        # Bilateral radius plus a pixel each for the area downsample and the
+        # bilinear upsample, in downsampled pixels
+        return max(edge_halo, (d // 2 + 2) * scale)
+    if filter_name == "sketch":
+        return 9 // 2
+    if filter_name in filters.GRADED_FILTERS:
+        return 0  # Colour grades work pixel by pixel
+    # Clone lays out copies of one global mask on a larger canvas
+    return None
+
+
+def _spans(length, side):
+    """(start, end) ranges covering length in steps of side
+
+    A short leftover is merged into the last full span: a sliver of a tile
+    would be mostly halo, and too small for the cartoon tiers to downsample.
+    """
+    starts = list(range(0, length, side))
+    if len(starts) > 1 and length - starts[-1] < MIN_TILE_SIDE // 2:
+        starts.pop()
+    return list(zip(starts, starts[1:] + [length]))
+
+
+class TilePlan:
+    """How one filter render is split into tiles"""
+
+    def __init__(self, filter_name, params, shape, tile_side, halo, workers):
+        self.filter_name = filter_name
+        self.params = params
+        self.shape = shape
+        self.tile_side = tile_side
+        self.halo = halo
+        self.workers = workers
+        height, width = shape[:2]
+        # (x0, y0, x1, y1) of each tile's interior
+        self.tiles = [(x0, y0, x1, y1)
+                      for y0, y1 in _spans(height, tile_side)
+                      for x0, x1 in _spans(width, tile_side)]
+
+    def __len__(self):
+        return len(self.tiles)
+
+
+def plan_tiles(filter_name, shape, params=None, budget=DEFAULT_TILE_BUDGET, workers=None):
+    """TilePlan for rendering an image of shape within budget bytes
+
+    Returns None when the filter cannot be tiled or the whole image already
+    fits in the budget, in which case a plain render is the cheaper choice.
+    """
+    params = params or {}
+    halo = filter_halo(filter_name, params)
+    if halo is None:
+        return None
+    height, width = shape[:2]
+    chain = pipeline.stages(filter_name, params)
+    # Cartoon's cheaper tiers downsample; tiles and halos on the same block
+    # grid as the whole image keep the downsampled pixels identical
+    scale = max([filters.QUALITY_TIERS[stage_params.get("quality", "exact")][0]
+                 for name, stage_params in chain if name == "cartoon"], default=1)
+    halo = -(-halo // scale) * scale
+    bytes_per_pixel = max(WORKING_BYTES_PER_PIXEL[name] for name, _ in chain)
+    if height * width * bytes_per_pixel <= budget:
+        return None
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    # Each tile in flight gets an equal share of the budget, halo included
+    padding = 2 * halo + ROW_BLOCK
+    side = math.isqrt(budget // (workers * bytes_per_pixel)) - padding
+    if side < MIN_TILE_SIDE:
+        # Too many workers for the budget: run fewer, bigger tiles instead
+        workers = max(1, budget // (bytes_per_pixel * (MIN_TILE_SIDE + padding) ** 2))
+        side = MIN_TILE_SIDE
+    align = TILE_ALIGN * scale
+    side = max(align, side // align * align)
+    return TilePlan(filter_name, params, shape, side, halo, workers)
+
+
+def _render_tile(plan, img, tile):
+    x0, y0, x1, y1 = tile
+    height, width = img.shape[:2]
+    left = max(0, (x0 - plan.halo) // ROW_BLOCK * ROW_BLOCK)
+    right = min(width, -(-(x1 + plan.halo) // ROW_BLOCK) * ROW_BLOCK)
+    top, bottom = max(0, y0 - plan.halo), min(height, y1 + plan.halo)
+    result = pipeline.render(plan.filter_name, img[top:bottom, left:right], **plan.params)
+    return tile, result[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+def run_plan(plan, img, out=None):
+    """Render img tile by tile into out (allocated if None)
+
+    Reports a "tile" stage on the calling thread after each tile is stitched,
+    so a progress listener can follow along or cancel between tiles. At most
+    plan.workers tiles are in flight at once.
+    """
+    if out is None:
+        out = np.empty(img.shape[:2] + (3,), dtype=np.uint8)
+    pending = iter(plan.tiles)
+    executor = ThreadPoolExecutor(max_workers=plan.workers, thread_name_prefix="cartoonify-tile")
+    try:
+        in_flight = set()
+        for tile in pending:
+            in_flight.add(executor.submit(_render_tile, plan, img, tile))
+            if len(in_flight) >= plan.workers:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                (x0, y0, x1, y1), result = future.result()
+                out[y0:y1, x0:x1] = result
+                filters.report_stage("tile")
+                next_tile = next(pending, None)
+                if next_tile is not None:
+                    in_flight.add(executor.submit(_render_tile, plan, img, next_tile))
+    finally:
+        # On cancellation or error, drop queued tiles and let running ones finish
+        executor.shutdown(wait=True, cancel_futures=True)
+    return out
+
+
+def apply_tiled(filter_name, img, budget=DEFAULT_TILE_BUDGET, workers=None, **params):
+    """pipeline.render with working memory bounded by budget bytes"""
+    plan = plan_tiles(filter_name, img.shape, params, budget, workers)
+    if plan is None:
+        return pipeline.render(filter_name, img, **params)
+    return run_plan(plan, img)
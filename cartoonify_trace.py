@@ -0,0 +1,211 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Lightweight tracing for filter stages, face detection, decode/encode and
+# display. Code marks work with `with trace.span("name"):`; nothing is timed or
+# allocated unless a sink is installed, so leaving the hooks in costs one
+# global lookup. Sinks receive one record per finished span.
+#
+# Enable with the CARTOONIFY_TRACE environment variable (or --trace on the
+# command-line tools): a path ending in .prom gets Prometheus text-format
+# counters, anything else gets JSON lines.
+
+_sinks = []
+_stage_marks = threading.local()
+
+
+def enabled():
+    return bool(_sinks)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        # Attach values only known once the work is done (e.g. face count)
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        emit(self.name, duration, self.attrs)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing the enclosed block as name"""
+    if not _sinks:
+        return _NOOP_SPAN
+    return _Span(name, attrs)
+
+
+def emit(name, duration, attrs=None):
+    record = {
+        "name": name,
+        "time": time.time(),
+        "duration_ms": duration * 1000,
+        "thread": threading.current_thread().name,
+    }
+    if attrs:
+        record["attrs"] = attrs
+    for sink in list(_sinks):
+        sink.write(record)
+
+
+def start_stages(prefix):
+    """Begin timing consecutive stages on this thread, named prefix.stage"""
+    _stage_marks.prefix = prefix
+    _stage_marks.last = time.perf_counter()
+
+
+def stage_done(name):
+    """Emit the time since the previous stage (or start_stages) on this thread"""
+    now = time.perf_counter()
+    last = getattr(_stage_marks, "last", None)
+    _stage_marks.last = now
+    if last is not None:
+        emit(f"{_stage_marks.prefix}.{name}", now - last)
+
+
+class JsonLinesSink:
+    """Appends each span as one JSON object per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", buffering=1, encoding="utf-8")
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class PrometheusTextSink:
+    """Aggregates spans into count/sum/max per name, written in Prometheus text format
+
+    The file is rewritten atomically every flush_every records and on close,
+    so a node exporter textfile collector can scrape it at any time.
+    """
+
+    def __init__(self, path, flush_every=50):
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.metrics = {}  # name -> [count, sum seconds, max seconds]
+        self.pending = 0
+
+    def write(self, record):
+        seconds = record["duration_ms"] / 1000
+        with self.lock:
+            metric = self.metrics.setdefault(record["name"], [0, 0.0, 0.0])
+            metric[0] += 1
+            metric[1] += seconds
+            metric[2] = max(metric[2], seconds)
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        lines = [
+            "# HELP cartoonify_span_seconds Time spent in traced Cartoonify operations.",
+            "# TYPE cartoonify_span_seconds summary",
+        ]
+        for name, (count, total, _) in sorted(self.metrics.items()):
+            lines.append(f'cartoonify_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'cartoonify_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append("# HELP cartoonify_span_max_seconds Slowest traced occurrence.")
+        lines.append("# TYPE cartoonify_span_max_seconds gauge")
+        for name, (_, _, longest) in sorted(self.metrics.items()):
+            lines.append(f'cartoonify_span_max_seconds{{span="{name}"}} {longest:.6f}')
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+        self.pending = 0
+
+    def flush(self):
+        with self.lock:
+            if self.pending:
+                self._flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+
+
+def add_sink(sink):
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+    sink.close()
+
+
+def flush_all():
+    """Push buffered records out; pool workers exit without running atexit"""
+    for sink in list(_sinks):
+        sink.flush()
+
+
+def close_all():
+    for sink in list(_sinks):
+        remove_sink(sink)
+
+
+atexit.register(close_all)
+
+
+def configure(path, per_process=False):
+    """Install the sink matching path's extension; per_process adds the pid to .prom files"""
+    if not path:
+        return None
+    if path.endswith(".prom"):
+        if per_process:
+            path = f"{path[:-len('.prom')]}.{os.getpid()}.prom"
+        return add_sink(PrometheusTextSink(path))
+    return add_sink(JsonLinesSink(path))
+
+
+def configure_from_env(per_process=False):
+    return configure(os.environ.get("CARTOONIFY_TRACE"), per_process=per_process)
@@ -0,0 +1,333 @@
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cartoonify_io as image_io
+import cartoonify_trace as trace
+
+# Uploads results to GoFile for sharing, off the Tk thread. One pooled
+# requests.Session serves every upload, so the TLS connection to the API is
+# reused instead of renegotiated per request. Every request has a connect and
+# a read timeout, and failures that are worth repeating (connection errors,
+# timeouts, 429 and 5xx responses) are retried with exponential backoff and
+# jitter. The file is streamed as multipart/form-data in small chunks, never
+# read into memory whole, and each chunk updates the upload's progress.
+# Images can also be shared straight from memory: submit_image encodes them
+# as JPEG or WebP on the upload thread, with no file or save dialog involved.
+#
+# The API location comes from CARTOONIFY_UPLOAD_URL or the base_url argument,
+# so the uploader can be pointed at a local stand-in server that implements
+# GET /servers and POST /uploadFile.
+
+DEFAULT_BASE_URL = "https://api.gofile.io"
+# GoFile uploads go to the storage server /servers names, not the API host
+DEFAULT_UPLOAD_URL = "https://{server}.gofile.io/uploadFile"
+
+CONNECT_TIMEOUT = 5    # Seconds to establish a connection
+READ_TIMEOUT = 60      # Seconds of silence from the server before giving up
+DEFAULT_RETRIES = 3    # Extra attempts after the first
+DEFAULT_BACKOFF = 0.5  # Seconds before the first retry, doubled each time
+SERVER_TTL = 300       # Seconds a looked-up upload server is reused
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """An upload failed for good, after any retries"""
+
+
+class UploadCancelled(UploadError):
+    pass
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"server answered {response.status_code}")
+        self.response = response
+
+
+class MultipartBody:
+    """multipart/form-data body for one file or bytes buffer, read in chunks by requests
+
+    requests streams any object with read() and takes the Content-Length
+    from len(), so a file is never loaded whole.
+    """
+
+    def __init__(self, source, filename, field="file", progress=None, cancel_event=None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        filename = filename.replace('"', "")
+        self._head = (f"--{boundary}\r\n"
+                      f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                      f"Content-Type: application/octet-stream\r\n\r\n").encode("utf-8")
+        self._tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._file = io.BytesIO(source)
+            self._file_size = len(source)
+        else:
+            self._file = open(source, "rb")
+            self._file_size = os.fstat(self._file.fileno()).st_size
+        self._part = 0  # 0: head, 1: file, 2: tail, 3: done
+        self._offset = 0
+        self.sent = 0
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def read(self, size=-1):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise UploadCancelled("upload cancelled")
+        size = CHUNK_SIZE if size is None or size < 0 else size
+        chunk = b""
+        while len(chunk) < size and self._part < 3:
+            if self._part == 1:
+                data = self._file.read(size - len(chunk))
+            else:
+                part = self._head if self._part == 0 else self._tail
+                data = part[self._offset:self._offset + size - len(chunk)]
+                self._offset += len(data)
+            if not data:
+                self._part += 1
+                self._offset = 0
+                continue
+            chunk += data
+        self.sent += len(chunk)
+        if self.progress is not None and chunk:
+            self.progress(self.sent, len(self))
+        return chunk
+
+    def close(self):
+        self._file.close()
+
+
+class UploadTask:
+    """One upload in flight: its future, progress and a way to stop it"""
+
+    def __init__(self, filename, source=None, prepare=None):
+        self.filename = filename  # Name the server stores
+        self.source = source      # File path or encoded bytes
+        self.prepare = prepare    # Builds (bytes, extension) on the upload thread if source is None
+        self.future = None
+        self.sent = 0
+        self.total = 0
+        self.attempts = 0
+        self.cancel_event = threading.Event()
+
+    @property
+    def progress(self):
+        """Fraction of the current attempt's bytes sent"""
+        return self.sent / self.total if self.total else 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        """Download page URL; raises UploadError if the upload failed"""
+        return self.future.result(timeout)
+
+    def _update(self, sent, total):
+        self.sent, self.total = sent, total
+
+
+class Uploader:
+    """Pooled, retrying GoFile client running uploads on its own threads"""
+
+    def __init__(self, base_url=None, upload_url=None, workers=2, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        base_url = base_url or os.environ.get("CARTOONIFY_UPLOAD_URL") or DEFAULT_BASE_URL
+        self.base_url = base_url.rstrip("/")
+        if upload_url is None:
+            # A stand-in server takes the uploads itself
+            upload_url = (DEFAULT_UPLOAD_URL if self.base_url == DEFAULT_BASE_URL
+                          else self.base_url + "/uploadFile")
+        self.upload_url = upload_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries happen in _request, where a streamed body can be rebuilt
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(2, workers), max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cartoonify-upload")
+        self._server_lock = threading.Lock()
+        self._server = None
+        self._server_time = 0.0
+
+    def _start(self, task):
+        task.future = self.executor.submit(self._upload, task)
+        return task
+
+    def submit(self, path):
+        """Start uploading path in the background; returns its UploadTask"""
+        return self._start(UploadTask(os.path.basename(path), path))
+
+    def submit_bytes(self, data, filename):
+        """Start uploading an in-memory file"""
+        return self._start(UploadTask(filename, bytes(data)))
+
+    def submit_image(self, image, name="cartoon", fmt="jpeg", quality=None,
+                     max_side=image_io.SHARE_MAX_SIDE):
+        """Start uploading a BGR image, encoded in memory as fmt (see image_io.encode_for_sharing)"""
+        return self._start(UploadTask(name, prepare=lambda: image_io.encode_for_sharing(
+            image, fmt, quality, max_side)))
+
+    def upload_many(self, paths):
+        """UploadTasks for several files, uploaded concurrently"""
+        return [self.submit(path) for path in paths]
+
+    def upload(self, path):
+        """Blocking upload of path; returns the download page URL"""
+        return self.submit(path).result()
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.session.close()
+
+    def _server_name(self, task, refresh=False):
+        with self._server_lock:
+            if not refresh and self._server and time.monotonic() - self._server_time < SERVER_TTL:
+                return self._server
+        response = self._request(task, "GET", f"{self.base_url}/servers")
+        try:
+            servers = response.json().get("data", {}).get("servers", [])
+        except ValueError:
+            raise UploadError("could not decode the server list (not valid JSON)")
+        if not servers:
+            raise UploadError("no upload server available")
+        with self._server_lock:
+            self._server = servers[0]["name"]
+            self._server_time = time.monotonic()
+            return self._server
+
+    def _request(self, task, method, url, make_body=None, **kwargs):
+        """session.request with timeouts and retries; make_body() builds a fresh body per attempt"""
+        attempt = 0
+        while True:
+            if task.cancel_event.is_set():
+                raise UploadCancelled("upload cancelled")
+            body = make_body() if make_body else None
+            try:
+                if body is not None:
+                    kwargs["data"] = body
+                    kwargs["headers"] = {"Content-Type": body.content_type}
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if response.status_code in RETRY_STATUSES:
+                    raise _RetryableStatus(response)
+                if response.status_code != 200:
+                    raise UploadError(f"{method} {url} failed: {response.status_code}")
+                return response
+            except (requests.ConnectionError, requests.Timeout, _RetryableStatus) as e:
+                if isinstance(e.__context__, UploadCancelled) or task.cancel_event.is_set():
+                    raise UploadCancelled("upload cancelled")
+                if attempt >= self.retries:
+                    raise UploadError(f"{method} {url} failed after {attempt + 1} attempts: {e}")
+                delay = self.backoff * 2 ** attempt
+                # Jitter keeps concurrent uploads from retrying in lockstep
+                task.cancel_event.wait(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+            finally:
+                if body is not None:
+                    body.close()
+
+    def _upload(self, task):
+        if task.source is None:
+            with trace.span("image.encode_share"):
+                task.source, extension = task.prepare()
+            task.filename += extension
+        if isinstance(task.source, bytes):
+            size = len(task.source)
+        else:
+            size = os.path.getsize(task.source)
+        with trace.span("upload", bytes=size):
+            server = self._server_name(task)
+            url = self.upload_url.format(server=server)
+
+            def make_body():
+                task.attempts += 1
+                return MultipartBody(task.source, task.filename, progress=task._update,
+                                     cancel_event=task.cancel_event)
+
+            try:
+                response = self._request(task, "POST", url, make_body)
+            except UploadCancelled:
+                raise
+            except UploadError:
+                # The server may have gone away; look it up again next time
+                with self._server_lock:
+                    self._server = None
+                raise
+            try:
+                data = response.json()
+            except ValueError:
+                raise UploadError("could not decode the upload response (not valid JSON)")
+            if data.get("status") != "ok":
+                raise UploadError(f"upload failed: {data.get('message') or data.get('status')}")
+            return data["data"]["downloadPage"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload images to GoFile and print their links.")
+    parser.add_argument("files", nargs="+", help="files to upload")
+    parser.add_argument("--base-url", default=None,
+                        help="API location, e.g. a local stand-in server "
+                             "(default: $CARTOONIFY_UPLOAD_URL or %s)" % DEFAULT_BASE_URL)
+    parser.add_argument("-j", "--workers", type=int, default=2, help="concurrent uploads (default: 2)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="retries per request (default: %(default)s)")
+    parser.add_argument("--format", choices=list(image_io.SHARE_FORMATS), default=None,
+                        help="re-encode images in memory before uploading (default: upload files as they are)")
+    parser.add_argument("--quality", type=int, default=None,
+                        help="encoder quality for --format, 1-100 (default: per format)")
+    parser.add_argument("--max-side", type=int, default=image_io.SHARE_MAX_SIDE,
+                        help="downscale re-encoded images to this longest side, 0 for full size "
+                             "(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    uploader = Uploader(args.base_url, workers=args.workers, retries=args.retries)
+    failed = 0
+    try:
+        tasks = []
+        for path in args.files:
+            if args.format is None:
+                tasks.append((path, uploader.submit(path)))
+                continue
+            image = image_io.load_image(path)
+            if image is None:
+                print(f"{path}: could not read the image", file=sys.stderr)
+                failed += 1
+                continue
+            name = os.path.splitext(os.path.basename(path))[0]
+            tasks.append((path, uploader.submit_image(image, name, args.format, args.quality,
+                                                      args.max_side)))
+        for path, task in tasks:
+            try:
+                print(f"{path}: {task.result()}")
+            except (UploadError, OSError, ValueError) as e:
+                failed += 1
+                print(f"{path}: {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        uploader.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+import cartoonify_filters as filters
+import cartoonify_pipeline as pipeline
+import cartoonify_trace as trace
+from cartoonify_faces import FaceDetector
+
+# Streams a video file through a filter into a new video. Decoding, filtering
+# and encoding run as separate stages: a decode thread reads frames and hands
+# each to a pool of filter threads, and an encode thread writes the results in
+# their original order. Between the stages sits a bounded FIFO of pending
+# frames (futures), so a slow stage makes the others wait instead of letting
+# frames pile up: memory stays the same for a ten-second clip and a film.
+# Audio is not copied to the output.
+#
+# Given a FaceDetector, the decode thread also follows faces through the clip
+# (update(): full detection every few frames, template tracking in between;
+# it must see frames in order, so it can't run in the filter pool) and the
+# stats report how many frames show a face.
+
+FOURCC_BY_EXTENSION = {
+    ".mp4": "mp4v",
+    ".m4v": "mp4v",
+    ".mov": "mp4v",
+    ".avi": "MJPG",
+    ".mkv": "XVID",
+}
+
+_END = object()  # Queue marker: no more frames
+
+
+class VideoStats:
+    """Counters shared by the pipeline stages, read by the reporter"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.frames_decoded = 0
+        self.frames_written = 0
+        self.decode_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.decode_blocked_seconds = 0.0   # Decoder waiting for room in the queue
+        self.encode_waiting_seconds = 0.0   # Encoder waiting for the next frame's filter
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+        self.frames_with_faces = None  # Counted only when faces are tracked
+
+    def sample_queue(self, depth):
+        with self.lock:
+            self.queue_samples += 1
+            self.queue_total += depth
+            self.queue_max = max(self.queue_max, depth)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.perf_counter() - self.start
+            return {
+                "frames_decoded": self.frames_decoded,
+                "frames_written": self.frames_written,
+                "elapsed_s": elapsed,
+                "fps": self.frames_written / elapsed if elapsed else 0.0,
+                "queue_mean": self.queue_total / self.queue_samples if self.queue_samples else 0.0,
+                "queue_max": self.queue_max,
+                "decode_s": self.decode_seconds,
+                "encode_s": self.encode_seconds,
+                "decode_blocked_s": self.decode_blocked_seconds,
+                "encode_waiting_s": self.encode_waiting_seconds,
+                "frames_with_faces": self.frames_with_faces,
+            }
+
+
+def format_stats(stats, total_frames=0, queue_size=0):
+    progress = f"{stats['frames_written']}"
+    if total_frames:
+        progress += f"/{total_frames}"
+    return (f"{progress} frames, {stats['fps']:.1f} fps, queue {stats['queue_mean']:.1f} avg "
+            f"{stats['queue_max']}/{queue_size} max, decoder blocked "
+            f"{stats['decode_blocked_s']:.1f} s, encoder waiting {stats['encode_waiting_s']:.1f} s"
+            + (f", faces in {stats['frames_with_faces']} frames"
+               if stats.get("frames_with_faces") is not None else ""))
+
+
+class VideoPipeline:
+    """Decode -> filter pool -> encode for one video file"""
+
+    def __init__(self, input_path, output_path, filter_name="cartoon", params=None,
+                 workers=None, queue_size=None, face_detector=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.filter_name = filter_name
+        self.params = dict(params or {})
+        for name, stage_params in pipeline.stages(filter_name, self.params):
+            if name == "clone" and "seed" not in stage_params:
+                # Same clone variations on every frame, or the copies flicker
+                self.params.update(pipeline.stage_params(filter_name, "clone",
+                                                         dict(stage_params, seed=0)))
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Enough frames in flight to keep every worker busy while the encoder drains
+        self.queue_size = queue_size or 2 * self.workers
+        self.pending = queue.Queue(maxsize=self.queue_size)
+        self.stats = VideoStats()
+        self.cancel_event = threading.Event()
+        self.total_frames = 0
+        self.error = None
+        self.face_detector = face_detector  # cartoonify_faces.FaceDetector, or None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def progress(self):
+        """Fraction of frames written, if the container reports a frame count"""
+        if not self.total_frames:
+            return 0.0
+        return min(1.0, self.stats.frames_written / self.total_frames)
+
+    def _put(self, item):
+        # Blocks while the queue is full, but keeps checking for cancellation
+        start = time.perf_counter()
+        while not self.cancel_event.is_set():
+            try:
+                self.pending.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with self.stats.lock:
+            self.stats.decode_blocked_seconds += time.perf_counter() - start
+
+    def _filter_frame(self, frame):
+        return pipeline.render(self.filter_name, frame, **self.params)
+
+    def _decode(self, cap, pool):
+        try:
+            while not self.cancel_event.is_set():
+                start = time.perf_counter()
+                with trace.span("video.decode"):
+                    ok, frame = cap.read()
+                if not ok:
+                    break
+                with self.stats.lock:
+                    self.stats.decode_seconds += time.perf_counter() - start
+                    self.stats.frames_decoded += 1
+                if self.face_detector is not None:
+                    faces = self.face_detector.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                    with self.stats.lock:
+                        self.stats.frames_with_faces += 1 if len(faces) else 0
+                self._put(pool.submit(self._filter_frame, frame))
+        except Exception as e:
+            self.error = e
+            self.cancel_event.set()
+        finally:
+            # The encoder drains the queue until it sees this, even after an error
+            self.pending.put(_END)
+
+    def _open_writer(self, frame, fps):
+        extension = os.path.splitext(self.output_path)[1].lower()
+        fourcc = cv2.VideoWriter_fourcc(*FOURCC_BY_EXTENSION.get(extension, "mp4v"))
+        height, width = frame.shape[:2]
+        writer = cv2.VideoWriter(self.output_path, fourcc, fps, (width, height))
+        if not writer.isOpened():
+            raise OSError(f"could not open {self.output_path} for writing")
+        return writer
+
+    def _encode(self, fps):
+        writer = None
+        try:
+            while True:
+                self.stats.sample_queue(self.pending.qsize())
+                item = self.pending.get()
+                if item is _END:
+                    break
+                if self.cancel_event.is_set():
+                    item.cancel()
+                    continue
+                start = time.perf_counter()
+                frame = item.result()
+                waited = time.perf_counter() - start
+                start = time.perf_counter()
+                with trace.span("video.encode"):
+                    if writer is None:
+                        # Clone renders on a wider canvas, so size comes from the first result
+                        writer = self._open_writer(frame, fps)
+                    writer.write(frame)
+                with self.stats.lock:
+                    self.stats.encode_waiting_seconds += waited
+                    self.stats.encode_seconds += time.perf_counter() - start
+                    self.stats.frames_written += 1
+        except Exception as e:
+            self.error = e
+            self.cancel_event.set()
+            # Unblock the decoder; it ends the queue on its way out
+            while self.pending.get() is not _END:
+                pass
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def run(self, report=None, report_every=1.0):
+        """Process the whole video; report(stats) is called about every report_every seconds
+
+        Returns the final stats dict. Raises the first stage error, if any.
+        """
+        cap = cv2.VideoCapture(self.input_path)
+        if not cap.isOpened():
+            raise OSError(f"could not open video {self.input_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.total_frames = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.stats = VideoStats()
+        if self.face_detector is not None:
+            self.face_detector.reset_tracking()
+            self.stats.frames_with_faces = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cartoonify-video")
+        decoder = threading.Thread(target=self._decode, args=(cap, pool),
+                                   name="cartoonify-video-decode", daemon=True)
+        encoder = threading.Thread(target=self._encode, args=(fps,),
+                                   name="cartoonify-video-encode", daemon=True)
+        try:
+            decoder.start()
+            encoder.start()
+            while encoder.is_alive():
+                encoder.join(report_every)
+                if report is not None:
+                    report(self.stats.snapshot())
+            decoder.join()
+        finally:
+            self.cancel_event.set()
+            decoder.join()
+            encoder.join()
+            pool.shutdown(wait=True, cancel_futures=True)
+            cap.release()
+        if self.error is not None:
+            raise self.error
+        return self.stats.snapshot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cartoonify a video file frame by frame.")
+    parser.add_argument("input", help="video file to read")
+    parser.add_argument("output", help="video file to write (.mp4, .avi, ...)")
+    parser.add_argument("-f", "--filter", default="cartoon",
+                        help=f"effect to apply, or several chained with '>' "
+                             f"(one of: {', '.join(sorted(filters.FILTERS))}; default: %(default)s)")
+    parser.add_argument("-q", "--quality", default="balanced", choices=list(filters.QUALITY_TIERS),
+                        help="bilateral-filter quality tier for the cartoon effect "
+                             "(default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="filter threads (default: all cores)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="frames allowed between decode and encode (default: 2 per worker)")
+    parser.add_argument("--faces", action="store_true",
+                        help="track faces through the clip and report how many frames show one")
+    args = parser.parse_args(argv)
+
+    # The worker threads already use every core; OpenCV's own threads would fight them
+    cv2.setNumThreads(1)
+    params = pipeline.stage_params(args.filter, "cartoon", {"quality": args.quality})
+    try:
+        video = VideoPipeline(args.input, args.output, args.filter, params,
+                              workers=args.workers, queue_size=args.queue_size,
+                              face_detector=FaceDetector() if args.faces else None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def report(stats):
+        print(format_stats(stats, video.total_frames, video.queue_size), flush=True)
+
+    try:
+        stats = video.run(report)
+    except KeyboardInterrupt:
+        video.cancel()
+        return 130
+    except (OSError, cv2.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {args.output}: {format_stats(stats, video.total_frames, video.queue_size)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
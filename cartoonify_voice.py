@@ -0,0 +1,189 @@
+import collections
+import importlib.util
+import threading
+import time
+
+import cartoonify_startup as startup
+import cartoonify_trace as trace
+
+# Imported when the first VoiceListener is made, not when this module loads
+sr = startup.lazy_import("speech_recognition")
+
+# Voice input for the assistant. One microphone stream stays open for the
+# whole session and is calibrated against room noise once, when it opens;
+# after that the recognizer's dynamic energy threshold follows slow changes
+# in the background noise, so listening starts immediately instead of
+# spending a second on calibration before every utterance.
+#
+# Utterances are first matched offline by a keyword spotter (PocketSphinx's
+# keyword search, when the pocketsphinx package is installed) against the
+# small fixed vocabulary the app understands: the wake phrase and the command
+# words. Only if that finds nothing, or the spotter fails, does the audio go
+# to the optional online recognizer.
+#
+# Wake-to-action latency runs from the end of the spoken phrase to the moment
+# the Tk thread starts the matching action. Each measurement goes to the
+# trace sinks as "voice.latency" and into a rolling window for reporting; a
+# miss of LATENCY_BUDGET is logged. The budget is only measured against: a
+# slow online answer is still acted on rather than cut off.
+
+CALIBRATION_SECONDS = 1.0
+LATENCY_BUDGET = 1.5          # Seconds from end of speech to the action starting
+PHRASE_TIME_LIMIT = 4         # Longest utterance recorded, in seconds
+KEYWORD_SENSITIVITY = 0.8     # PocketSphinx keyword threshold, 0 (strict) to 1 (lenient)
+
+
+class Utterance:
+    """What was heard, how it was recognized and when the speaker stopped"""
+
+    def __init__(self, text, source, spoken_end, recognized_at):
+        self.text = text
+        self.source = source            # "keywords" or "online"
+        self.spoken_end = spoken_end    # perf_counter() when the phrase ended
+        self.recognized_at = recognized_at
+
+    @property
+    def recognition_latency(self):
+        return self.recognized_at - self.spoken_end
+
+
+class LatencyStats:
+    """Wake-to-action latencies over a sliding window"""
+
+    def __init__(self, budget=LATENCY_BUDGET, window=50):
+        self.budget = budget
+        self.latencies = collections.deque(maxlen=window)
+        self.over_budget = 0
+
+    def record(self, latency):
+        self.latencies.append(latency)
+        if latency > self.budget:
+            self.over_budget += 1
+
+    @property
+    def mean(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def p95(self):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def summary(self):
+        return (f"voice latency {self.mean * 1000:.0f} ms avg, {self.p95 * 1000:.0f} ms p95, "
+                f"{self.over_budget} of {len(self.latencies)} over {self.budget * 1000:.0f} ms")
+
+
+def keyword_spotting_available():
+    # recognize_sphinx imports pocketsphinx itself; only check it is installed
+    return importlib.util.find_spec("pocketsphinx") is not None
+
+
+class VoiceListener:
+    """Persistent, once-calibrated microphone with offline keyword spotting first"""
+
+    def __init__(self, recognizer=None, use_online=True, budget=LATENCY_BUDGET,
+                 device_index=None, calibration_seconds=CALIBRATION_SECONDS):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.use_online = use_online
+        self.device_index = device_index
+        self.calibration_seconds = calibration_seconds
+        self.spotting = keyword_spotting_available()
+        self.latency = LatencyStats(budget)
+        self.lock = threading.Lock()  # One listener on the stream at a time
+        self.microphone = None
+        self.source = None
+
+    def open(self):
+        """Open the microphone stream and calibrate once; safe to call again"""
+        with self.lock:
+            if self.source is not None:
+                return
+            self.microphone = sr.Microphone(device_index=self.device_index)
+            self.source = self.microphone.__enter__()
+            with trace.span("voice.calibrate"):
+                self.recognizer.adjust_for_ambient_noise(self.source, duration=self.calibration_seconds)
+            # Track slow changes in room noise from here on without recalibrating
+            self.recognizer.dynamic_energy_threshold = True
+
+    def close(self):
+        with self.lock:
+            if self.source is not None:
+                self.microphone.__exit__(None, None, None)
+                self.microphone = self.source = None
+
+    def recalibrate(self):
+        """Measure the room noise again, e.g. after moving somewhere louder"""
+        with self.lock:
+            if self.source is not None:
+                self.recognizer.adjust_for_ambient_noise(self.source, duration=self.calibration_seconds)
+
+    def listen(self, timeout=5, phrase_time_limit=PHRASE_TIME_LIMIT):
+        """(AudioData, end time) of the next phrase, or (None, None) if nobody spoke"""
+        self.open()
+        with self.lock:
+            try:
+                with trace.span("voice.listen"):
+                    audio = self.recognizer.listen(self.source, timeout=timeout,
+                                                   phrase_time_limit=phrase_time_limit)
+            except sr.WaitTimeoutError:
+                return None, None
+        return audio, time.perf_counter()
+
+    def spot_keywords(self, audio, keywords):
+        """Keywords heard in audio (offline), or None if nothing matched or no spotter"""
+        if not self.spotting or not keywords:
+            return None
+        entries = [(keyword, KEYWORD_SENSITIVITY) for keyword in keywords]
+        try:
+            with trace.span("voice.spot"):
+                text = self.recognizer.recognize_sphinx(audio, keyword_entries=entries)
+        except sr.UnknownValueError:
+            return None
+        except Exception as e:
+            # Missing models, bad keyword entries and the like: the online
+            # recognizer takes over
+            print(f"Keyword spotting failed: {e}")
+            return None
+        return text.strip().lower() or None
+
+    def recognize_online(self, audio):
+        """Full transcription from the online recognizer, or None"""
+        if not self.use_online:
+            return None
+        try:
+            with trace.span("voice.recognize"):
+                return self.recognizer.recognize_google(audio).lower()
+        except (sr.UnknownValueError, sr.RequestError):
+            return None
+
+    def hear(self, keywords=(), timeout=5, phrase_time_limit=PHRASE_TIME_LIMIT):
+        """Utterance for the next phrase, or None if nothing usable was said
+
+        keywords is the vocabulary expected right now; the spotter looks for
+        those, and the online recognizer is asked only when it finds none.
+        """
+        audio, spoken_end = self.listen(timeout, phrase_time_limit)
+        if audio is None:
+            return None
+        text = self.spot_keywords(audio, keywords)
+        source = "keywords"
+        if text is None:
+            text = self.recognize_online(audio)
+            source = "online"
+        if text is None:
+            return None
+        return Utterance(text, source, spoken_end, time.perf_counter())
+
+    def action_started(self, utterance, action=""):
+        """Record the wake-to-action latency of utterance; call as the action begins"""
+        latency = time.perf_counter() - utterance.spoken_end
+        self.latency.record(latency)
+        trace.emit("voice.latency", latency, {"action": action, "source": utterance.source,
+                                              "recognition_ms": utterance.recognition_latency * 1000})
+        if latency > self.latency.budget:
+            print(f"Voice: '{utterance.text}' took {latency * 1000:.0f} ms to act on "
+                  f"(budget {self.latency.budget * 1000:.0f} ms, {utterance.source})")
+        return latency
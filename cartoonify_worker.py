@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cartoonify_filters as filters
+import cartoonify_pipeline as pipeline
+import cartoonify_tiles as tiles
+
+# Runs filters off the Tk thread. OpenCV releases the GIL inside its kernels,
+# so worker threads keep the UI responsive without the cost of pickling
+# full-size images to another process.
+
+
+class RenderJob:
+    """A single filter render submitted to a FilterWorker"""
+
+    def __init__(self, filter_name, image, params, artifacts=None, tile_budget=None):
+        self.filter_name = filter_name
+        self.image = image
+        self.params = params
+        self.artifacts = artifacts
+        # Large images render tile by tile within tile_budget bytes, if given
+        self.tile_plan = None
+        if tile_budget:
+            self.tile_plan = tiles.plan_tiles(filter_name, image.shape, params, tile_budget)
+        self.stages_done = 0
+        if self.tile_plan is not None:
+            self.total_stages = len(self.tile_plan)
+        else:
+            self.total_stages = pipeline.stage_count(filter_name, params) or 1
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def progress(self):
+        """Fraction of stages completed, between 0 and 1"""
+        if self.future is not None and self.future.done():
+            return 1.0
+        return min(1.0, self.stages_done / self.total_stages)
+
+    def cancel(self):
+        # Stops the render at its next stage boundary
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _on_stage(self, stage_name):
+        if self.cancel_event.is_set():
+            raise filters.RenderCancelled(self.filter_name)
+        self.stages_done += 1
+
+    def run(self):
+        if self.cancel_event.is_set():
+            raise filters.RenderCancelled(self.filter_name)
+        with filters.progress_listener(self._on_stage):
+            if self.tile_plan is not None:
+                return tiles.run_plan(self.tile_plan, self.image)
+            return pipeline.render(self.filter_name, self.image,
+                                   artifacts=self.artifacts, **self.params)
+
+
+class FilterWorker:
+    """Executor for filter renders where each submit supersedes the last
+
+    Two threads let a new render start straight away while a superseded one
+    finishes the OpenCV call it is in and then stops.
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="cartoonify-filter")
+        self.current_job = None
+        self.lock = threading.Lock()
+
+    def submit(self, filter_name, image, params=None, supersede=True, artifacts=None,
+               tile_budget=None):
+        job = RenderJob(filter_name, image, params or {}, artifacts, tile_budget)
+        with self.lock:
+            if supersede and self.current_job is not None:
+                self.current_job.cancel()
+            self.current_job = job
+            job.future = self.executor.submit(job.run)
+        return job
+
+    def cancel(self):
+        with self.lock:
+            if self.current_job is not None:
+                self.current_job.cancel()
+                self.current_job = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,35 @@
+import pytest
+
+import cartoonify_commands as commands
+
+
+@pytest.mark.parametrize("heard, expected", commands.MISHEARINGS)
+def test_mishearings_resolve_to_the_intent_meant(heard, expected):
+    assert commands.COMMANDS.intent(heard) == expected
+
+
+@pytest.mark.parametrize("heard", ["sure", "keep going", "clean up", "sore", "safety first"])
+def test_everyday_words_do_not_fire_careful_intents(heard):
+    assert commands.COMMANDS.intent(heard) not in commands.CAREFUL_INTENTS
+
+
+def test_it_is_part_of_the_phrase():
+    assert "it" not in commands.FILLER_WORDS
+    assert commands.COMMANDS.intent("keep it") == "save"
+    assert commands.COMMANDS.intent("keep") is None
+
+
+def test_ambiguous_key_resolves_when_intents_are_narrowed():
+    # Both phrases share the Soundex code R163, and "raubart" is no typo of either
+    index = commands.CommandIndex({"first": ("rupert",), "second": ("robert",)})
+    assert index.intent("raubart") is None
+    assert index.intent("raubart", intents={"second"}) == "second"
+
+
+def test_expected_intents_limit_the_match():
+    assert commands.COMMANDS.intent("save it", intents={"share", "reset"}) is None
+
+
+def test_soundex():
+    assert commands.soundex("robert") == commands.soundex("rupert") == "R163"
+    assert commands.soundex("wings") == commands.soundex("winx")
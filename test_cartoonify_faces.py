@@ -0,0 +1,77 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import cartoonify_faces as faces
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class StubCascade:
+    """Returns the given boxes from every detectMultiScale call, and counts the calls"""
+
+    def __init__(self, boxes=()):
+        self.boxes = list(boxes)
+        self.calls = 0
+
+    def detectMultiScale(self, image, scaleFactor, minNeighbors, maxSize):
+        self.calls += 1
+        return np.array(self.boxes, dtype=np.int32).reshape(-1, 4)
+
+
+def textured_frame(seed):
+    return np.random.default_rng(seed).integers(0, 255, (240, 320), dtype=np.uint8)
+
+
+def test_faceless_frames_keep_the_redetect_cadence():
+    cascade = StubCascade()
+    detector = faces.FaceDetector(cascade, redetect_every=10)
+    for index in range(30):
+        assert len(detector.update(textured_frame(index))) == 0
+    assert cascade.calls == detector.detections_run == 3
+
+
+def test_real_cascade_on_empty_frames():
+    detector = faces.FaceDetector(detect_size=320, redetect_every=10)
+    for _ in range(30):
+        detector.update(np.zeros((240, 320), dtype=np.uint8))
+    assert detector.detections_run == 3
+
+
+def test_lost_track_is_redetected_on_the_next_frame_only():
+    cascade = StubCascade([(100, 80, 40, 40)])
+    detector = faces.FaceDetector(cascade, redetect_every=10)
+    frame = textured_frame(0)
+    assert len(detector.update(frame)) == 1
+    assert len(detector.update(frame)) == 1  # Tracked, no detection
+    assert cascade.calls == 1
+
+    cascade.boxes = []
+    detector.update(textured_frame(1))  # Noise: the template no longer matches
+    assert cascade.calls == 1
+    detector.update(textured_frame(2))  # First frame after the loss
+    assert cascade.calls == 2
+    for index in range(3, 8):
+        detector.update(textured_frame(index))
+    assert cascade.calls == 2
+
+
+def test_scale_factor_can_be_chosen_per_call():
+    cascade = StubCascade()
+    seen = []
+    cascade.detectMultiScale = lambda image, scaleFactor, minNeighbors, maxSize: seen.append(
+        scaleFactor) or np.empty((0, 4), dtype=np.int32)
+    detector = faces.FaceDetector(cascade)
+    detector.detect(textured_frame(0))
+    detector.detect(textured_frame(0), faces.RATING_SCALE_FACTOR)
+    assert seen == [faces.AGE_SCALE_FACTOR, faces.RATING_SCALE_FACTOR]
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(HERE, "*.jpg"))
+                                        + glob.glob(os.path.join(HERE, "images", "*.jpg"))))
+def test_face_counts_match_the_full_resolution_calls(path):
+    (result,) = faces.benchmark([path], repeats=1)
+    assert (result["new_faces"], result["new_rating_faces"]) == (
+        result["old_faces"], result["old_rating_faces"])
@@ -0,0 +1,61 @@
+import threading
+
+import numpy as np
+
+from cartoonify_live import LivePreviewProcessor, LivePreviewWorker
+
+
+class SlowDetector:
+    """Records update() and reset_tracking() calls; update() waits until released"""
+
+    def __init__(self):
+        self.events = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def update(self, gray):
+        self.events.append("update start")
+        self.entered.set()
+        self.release.wait(5)
+        self.events.append("update end")
+        return np.empty((0, 4), dtype=np.int32)
+
+    def reset_tracking(self):
+        self.events.append("reset")
+
+
+def test_reset_waits_for_the_frame_in_flight():
+    detector = SlowDetector()
+    worker = LivePreviewWorker(LivePreviewProcessor(face_detector=detector))
+    try:
+        assert worker.offer(np.zeros((48, 64, 3), dtype=np.uint8))
+        assert detector.entered.wait(5)
+        worker.reset()
+        assert worker.take() is None  # The old frame is forgotten
+        assert detector.events == ["update start"]
+        detector.release.set()
+        worker.executor.submit(lambda: None).result(5)
+        assert detector.events == ["update start", "update end", "reset"]
+    finally:
+        detector.release.set()
+        worker.shutdown()
+
+
+def test_offer_drops_frames_while_busy():
+    detector = SlowDetector()
+    processor = LivePreviewProcessor(face_detector=detector, target_fps=1000)
+    worker = LivePreviewWorker(processor)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    try:
+        assert worker.offer(frame)
+        assert detector.entered.wait(5)
+        assert not worker.offer(frame)
+        assert processor.frames_dropped == 1
+        detector.release.set()
+        worker.pending.result(5)
+        result = worker.take()
+        assert result.shape == frame.shape and result is not frame
+        assert worker.take() is None
+    finally:
+        detector.release.set()
+        worker.shutdown()
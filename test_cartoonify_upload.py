@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import cartoonify_upload as upload
+
+
+class StandIn(ThreadingHTTPServer):
+    """Local GoFile stand-in: GET /servers and POST /uploadFile"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.failures = 0        # Upload requests still to answer with failure_status
+        self.failure_status = 503
+        self.uploads = []        # (perf_counter, body) of every upload request
+        self.server_lookups = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/servers":
+            return self._reply(404, {"status": "error-notFound"})
+        with self.server.lock:
+            self.server.server_lookups += 1
+        self._reply(200, {"status": "ok", "data": {"servers": [{"name": "store1"}]}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.uploads.append((time.perf_counter(), body))
+            count = len(self.server.uploads)
+            failing = self.server.failures > 0
+            if failing:
+                self.server.failures -= 1
+        if self.path != "/uploadFile":
+            return self._reply(404, {"status": "error-notFound"})
+        if failing:
+            return self._reply(self.server.failure_status, {"status": "error"})
+        self._reply(200, {"status": "ok", "data": {"downloadPage": f"https://gofile.io/d/{count}"}})
+
+
+@pytest.fixture
+def server():
+    stand_in = StandIn()
+    thread = threading.Thread(target=stand_in.serve_forever, daemon=True)
+    thread.start()
+    yield stand_in
+    stand_in.shutdown()
+    stand_in.server_close()
+
+
+@pytest.fixture
+def uploader(server):
+    client = upload.Uploader(server.url, retries=3, backoff=0.1)
+    yield client
+    client.shutdown()
+
+
+def test_upload_streams_the_file_and_reports_progress(server, uploader):
+    data = bytes(range(256)) * 4096  # 1 MiB, many chunks
+    task = uploader.submit_bytes(data, "result.png")
+    assert task.result(timeout=10) == "https://gofile.io/d/1"
+    assert task.attempts == 1
+    assert task.progress == 1.0
+    assert task.sent == task.total == len(server.uploads[0][1])
+    body = server.uploads[0][1]
+    assert b'filename="result.png"' in body
+    assert data in body
+
+
+def test_retryable_status_is_retried_with_backoff(server, uploader):
+    server.failures = 2
+    task = uploader.submit_bytes(b"image", "result.png")
+    assert task.result(timeout=10) == "https://gofile.io/d/3"
+    assert task.attempts == 3
+    times = [when for when, _ in server.uploads]
+    # Exponential backoff with jitter: at least half of 0.1 s, then of 0.2 s
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 0.1
+
+
+def test_gives_up_after_the_last_retry(server, uploader):
+    server.failures = 10
+    task = uploader.submit_bytes(b"image", "result.png")
+    with pytest.raises(upload.UploadError, match="after 4 attempts"):
+        task.result(timeout=10)
+    assert len(server.uploads) == 4
+
+
+def test_client_errors_are_not_retried(server, uploader):
+    server.failures = 1
+    server.failure_status = 400
+    task = uploader.submit_bytes(b"image", "result.png")
+    with pytest.raises(upload.UploadError, match="400"):
+        task.result(timeout=10)
+    assert len(server.uploads) == 1
+
+
+def test_cancel_stops_waiting_for_a_retry(server):
+    client = upload.Uploader(server.url, retries=3, backoff=30)
+    try:
+        server.failures = 10
+        task = client.submit_bytes(b"image", "result.png")
+        while not server.uploads:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        task.cancel()
+        with pytest.raises(upload.UploadCancelled):
+            task.future.result(timeout=5)
+        assert time.perf_counter() - start < 5
+        assert len(server.uploads) == 1
+    finally:
+        client.shutdown()
+
+
+def test_upload_server_is_reused(server, uploader):
+    uploader.submit_bytes(b"image", "first.png").result(timeout=10)
+    tasks = [uploader.submit_bytes(b"image", f"result{n}.png") for n in range(2)]
+    assert sorted(task.result(timeout=10) for task in tasks) == [
+        "https://gofile.io/d/2", "https://gofile.io/d/3"]
+    assert server.server_lookups == 1
+
+
+def test_submit_image_encodes_in_memory(server, uploader):
+    image = np.zeros((64, 48, 3), np.uint8)
+    task = uploader.submit_image(image, "cartoonify_sketch", "jpeg")
+    task.result(timeout=10)
+    assert task.filename == "cartoonify_sketch.jpg"
+    assert b"\xff\xd8" in server.uploads[0][1]  # JPEG start of image
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import cartoonify_filters as filters
+from cartoonify_artifacts import ImageArtifacts
+from cartoonify_worker import FilterWorker, RenderJob
+
+SPECS = list(filters.FILTERS) + ["cartoon>winxclub", "sketch>noir", "clone>warm", "noir>cartoon"]
+IMAGES = {
+    "noise": np.random.default_rng(0).integers(0, 255, (120, 160, 3), dtype=np.uint8),
+    "blank": np.zeros((300, 200, 3), dtype=np.uint8),  # No person mask, no room for top clones
+}
+
+
+@pytest.mark.parametrize("image_name", IMAGES)
+@pytest.mark.parametrize("artifacts", [None, "fresh", "reused"])
+@pytest.mark.parametrize("spec", SPECS)
+def test_progress_counts_every_stage(spec, artifacts, image_name):
+    image = IMAGES[image_name]
+    shared = ImageArtifacts(image) if artifacts else None
+    if artifacts == "reused":
+        shared.edge_mask, shared.person_mask
+    job = RenderJob(spec, image, {}, artifacts=shared)
+    job.run()
+    assert job.stages_done == job.total_stages
+
+
+def test_worker_supersedes_the_previous_job():
+    worker = FilterWorker()
+    try:
+        image = IMAGES["noise"]
+        first = worker.submit("cartoon", image)
+        second = worker.submit("sketch", image)
+        assert first.cancelled and not second.cancelled
+        assert second.future.result(10).shape == image.shape
+        assert second.progress == 1.0
+    finally:
+        worker.shutdown()